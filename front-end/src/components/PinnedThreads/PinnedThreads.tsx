@@ -167,7 +167,7 @@ const PinnedThreads: React.FC = () => {
                 <div className="pinned-thread-stats">
                   <span className="stat-item">
                     <span className="stat-icon">💬</span>
-                    {thread.posts.length} {t('forum.threadList.posts')}
+                    {thread.post_count} {t('forum.threadList.posts')}
                   </span>
                   <span className="stat-item">
                     <span className="stat-icon">🔥</span>
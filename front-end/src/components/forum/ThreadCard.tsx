@@ -216,7 +216,7 @@ const ThreadCard: React.FC<ThreadCardProps> = ({ thread, onVoteUpdate, onThreadD
           <div className="thread-action">
             <span className="thread-action-icon">💬</span>
             <span>
-              {thread.posts.length} {thread.posts.length === 1
+              {thread.post_count} {thread.post_count === 1
                 ? t('forum.threadList.post')
                 : t('forum.threadList.posts')}
             </span>
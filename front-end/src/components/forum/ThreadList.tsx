@@ -342,6 +342,7 @@ const ThreadList: React.FC<ThreadListProps> = ({
                 <option value="-activity">{t('forum.filter.sort.latestActivity')}</option>
                 <option value="-created">{t('forum.filter.sort.newest')}</option>
                 <option value="created">{t('forum.filter.sort.oldest')}</option>
+                <option value="-hot">{t('forum.filter.sort.trending')}</option>
                 <option value="-votes">{t('forum.filter.sort.mostVotes')}</option>
                 <option value="-posts">{t('forum.filter.sort.mostPosts')}</option>
                 <option value="title">{t('forum.filter.sort.title')}</option>
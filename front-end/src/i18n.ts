@@ -154,6 +154,7 @@ const resources = {
       "forum.filter.sort.newest": "Newest first",
       "forum.filter.sort.oldest": "Oldest first",
       "forum.filter.sort.mostVotes": "Most votes",
+      "forum.filter.sort.trending": "Trending",
       "forum.filter.sort.mostPosts": "Most posts",
       "forum.filter.sort.title": "Title (A-Z)",
       
@@ -842,6 +843,7 @@ const resources = {
       "forum.filter.sort.newest": "Najnowsze",
       "forum.filter.sort.oldest": "Najstarsze",
       "forum.filter.sort.mostVotes": "Najwięcej głosów",
+      "forum.filter.sort.trending": "Na czasie",
       "forum.filter.sort.mostPosts": "Najwięcej postów",
       "forum.filter.sort.title": "Tytuł (A-Z)",
       
@@ -32,7 +32,8 @@ export interface Thread {
   can_be_answered: boolean;
   last_activity_date: string; // ISO datetime string
   date: string; // Thread creation date
-  posts: Post[]; // Related posts
+  posts: Post[]; // Related posts (only returned by the thread detail endpoint)
+  post_count: number; // Number of posts in the thread
   user?: number | null; // User ID of the thread author
   is_anonymous: boolean;
   author_display_name: string; // Display name (either user's name or nickname)
@@ -7,6 +7,9 @@ To run:
     
 Or headless:
     locust -f locustfile.py --host=http://localhost:8000 --headless -u 10000 -r 100 -t 5m
+
+To measure the vote write-behind buffer, run the same load with
+FORUM_VOTE_WRITE_BEHIND = False and True and compare "Forum: Vote on thread".
 """
 
 import random
@@ -188,6 +191,24 @@ class PoliConnectUser(HttpUser):
             else:
                 response.failure(f"Got status code {response.status_code}")
     
+    @task(4)
+    def vote_on_thread(self):
+        """Upvote a thread (compare runs with FORUM_VOTE_WRITE_BEHIND off and on)"""
+        thread_id = random.randint(1, 100)
+        
+        with self.client.post(
+            f"/api/v1/threads/{thread_id}/vote/",
+            json={"vote_type": random.choice(["upvote", "downvote"])},
+            name="Forum: Vote on thread",
+            catch_response=True
+        ) as response:
+            if response.status_code == 200:
+                response.success()
+            elif response.status_code in (400, 404):
+                response.success()  # Own threads and random missing IDs
+            else:
+                response.failure(f"Got status code {response.status_code}")
+    
     @task(3)
     def view_user_profile(self):
         """View user profile"""
@@ -237,6 +258,7 @@ class MobileAppUser(HttpUser):
         endpoints = [
             "/api/v1/events/",  # Check calendar
             "/api/v1/threads/?limit=10",  # Recent threads
+            "/api/v1/threads/pinned/unread/",  # Unread replies in pinned threads
             "/api/noticeboard/advertisements/?limit=5",  # Recent ads
         ]
         
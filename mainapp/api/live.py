@@ -0,0 +1,110 @@
+import json
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from mainapp.facets import sees_only_teacher_threads
+from mainapp.post import PinnedThread, Thread
+from mainapp.live import Subscription, get_broadcaster, thread_topic, user_topic
+
+HEARTBEAT_SECONDS = 15
+
+
+def format_event(event, data):
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+@sync_to_async
+def authenticate(request):
+    """Authenticate with the usual bearer token or, for EventSource clients, ?access_token=."""
+    auth = JWTAuthentication()
+    header = auth.get_header(request)
+    raw_token = auth.get_raw_token(header) if header else request.GET.get('access_token')
+    if not raw_token:
+        return None
+    try:
+        return auth.get_user(auth.get_validated_token(raw_token))
+    except (InvalidToken, TokenError):
+        return None
+
+
+@sync_to_async
+def get_unread_counts(user):
+    pins = PinnedThread.objects.filter(user=user)
+    if sees_only_teacher_threads(user):
+        pins = pins.filter(thread__visible_for_teachers=True)
+    return dict(pins.values_list('thread_id', 'unread_posts'))
+
+
+@sync_to_async
+def get_visible_thread_ids(user, thread_ids):
+    """The given threads the user may see, filtered like the thread list."""
+    threads = Thread.objects.filter(id__in=thread_ids)
+    if sees_only_teacher_threads(user):
+        threads = threads.filter(visible_for_teachers=True)
+    return set(threads.values_list('id', flat=True))
+
+
+async def live_updates(request):
+    """
+    Stream forum updates to the client as server-sent events.
+
+    The client is subscribed to the threads listed in ``?threads=1,2,3``,
+    to every thread it pinned and to its own user topic. The stream opens
+    with the unread counts of all pinned threads and then carries ``post``,
+    ``vote``, ``pin`` and ``unread`` events as they happen. Threads the
+    user cannot see in the thread list are answered with 404. Requires an
+    ASGI server.
+    """
+    user = await authenticate(request)
+    if user is None:
+        return JsonResponse({'error': 'Authentication required'}, status=401)
+
+    try:
+        thread_ids = {int(pk) for pk in request.GET.get('threads', '').split(',') if pk}
+    except ValueError:
+        return JsonResponse({'error': 'threads must be a comma separated list of ids'}, status=400)
+    if thread_ids and await get_visible_thread_ids(user, thread_ids) != thread_ids:
+        return JsonResponse({'error': 'Thread not found'}, status=404)
+
+    unread = await get_unread_counts(user)
+    subscription = Subscription(
+        get_broadcaster(),
+        [user_topic(user.id)] + [thread_topic(pk) for pk in thread_ids | set(unread)],
+    )
+
+    async def stream():
+        try:
+            yield format_event('unread', {'unread_counts': unread})
+            while True:
+                item = await subscription.get(timeout=HEARTBEAT_SECONDS)
+                if item is None:
+                    yield ': keepalive\n\n'
+                    continue
+                _, message = item
+                yield format_event(message['type'], message)
+
+                thread_id = message.get('thread')
+                if message['type'] == 'post' and message['action'] == 'created' and thread_id in unread:
+                    unread[thread_id] += 1
+                    yield format_event('unread', {'thread': thread_id, 'unread_count': unread[thread_id]})
+                elif message['type'] == 'unread':
+                    unread[thread_id] = message['unread_count']
+                elif message['type'] == 'pin':
+                    if message['pinned'] and not await get_visible_thread_ids(user, {thread_id}):
+                        continue
+                    if message['pinned']:
+                        unread[thread_id] = 0
+                        subscription.add_topics([thread_topic(thread_id)])
+                    else:
+                        unread.pop(thread_id, None)
+                        if thread_id not in thread_ids:
+                            subscription.remove_topics([thread_topic(thread_id)])
+        finally:
+            subscription.close()
+
+    return StreamingHttpResponse(
+        stream(),
+        content_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
@@ -3,7 +3,10 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.db import IntegrityError
-from mainapp.post import Thread, PinnedThread
+from mainapp.post import Thread, PinnedThread, pinned_threads_with_unread_counts
+from mainapp.vote_state import VoteStateResolver
+from mainapp.author_cards import AuthorCardResolver
+from mainapp.live import publish, user_topic
 from mainapp.serializers import PinnedThreadSerializer, PinThreadSerializer
 
 
@@ -23,11 +26,13 @@ def pin_thread(request):
         pinned = PinnedThread.objects.get(user=request.user, thread=thread)
         # If already pinned, unpin it
         pinned.delete()
+        publish(user_topic(request.user.id), {'type': 'pin', 'thread': thread.id, 'pinned': False})
         return Response({'status': 'unpinned', 'message': 'Thread unpinned successfully'})
     except PinnedThread.DoesNotExist:
         # Pin the thread
         try:
             pinned = PinnedThread.objects.create(user=request.user, thread=thread)
+            publish(user_topic(request.user.id), {'type': 'pin', 'thread': thread.id, 'pinned': True})
             serializer = PinnedThreadSerializer(pinned)
             return Response({
                 'status': 'pinned',
@@ -45,11 +50,29 @@ def pin_thread(request):
 @permission_classes([permissions.IsAuthenticated])
 def get_pinned_threads(request):
     """Get all pinned threads for the authenticated user with unread counts."""
-    pinned_threads = PinnedThread.objects.filter(user=request.user).select_related('thread')
-    serializer = PinnedThreadSerializer(pinned_threads, many=True, context={'request': request})
+    pinned_threads = list(pinned_threads_with_unread_counts(request.user))
+    threads = [pinned.thread for pinned in pinned_threads]
+    vote_state = VoteStateResolver(request.user)
+    vote_state.add(threads)
+    author_cards = AuthorCardResolver(request)
+    author_cards.add(threads)
+    serializer = PinnedThreadSerializer(
+        pinned_threads, many=True,
+        context={'request': request, 'vote_state': vote_state, 'author_cards': author_cards}
+    )
     return Response(serializer.data)
 
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def get_unread_counts(request):
+    """Get the unread post counts of the user's pinned threads, keyed by thread id."""
+    counts = dict(
+        PinnedThread.objects.filter(user=request.user).values_list('thread_id', 'unread_posts')
+    )
+    return Response({'unread_counts': counts, 'total': sum(counts.values())})
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def mark_thread_as_viewed(request, thread_id):
@@ -57,6 +80,7 @@ def mark_thread_as_viewed(request, thread_id):
     try:
         pinned = PinnedThread.objects.get(user=request.user, thread_id=thread_id)
         pinned.mark_as_viewed()
+        publish(user_topic(request.user.id), {'type': 'unread', 'thread': pinned.thread_id, 'unread_count': 0})
         return Response({'message': 'Thread marked as viewed'})
     except PinnedThread.DoesNotExist:
         return Response(
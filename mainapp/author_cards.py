@@ -0,0 +1,168 @@
+"""
+Author cards for forum serializers.
+
+An author card is the compact part of a user that forum serializers show
+next to threads and posts: display name, role and the storage URLs of the
+profile picture and thumbnail. Cards are cached per user and dropped when
+the user is saved, so serializing a page costs at most one query for the
+authors that are not cached, instead of joining every row to its full
+user and building its avatar URLs one by one.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from analytics.cache_service import CacheService
+
+# Avatars are always served through the backend host, as in the accounts
+# serializers
+AVATAR_HOST = 'localhost:8000'
+AUTHOR_CARD_FIELDS = ('id', 'first_name', 'last_name', 'login', 'role', 'profile_picture', 'profile_thumbnail')
+
+
+def author_card_key(user_id):
+    return CacheService.make_key(CacheService.PREFIX_USER, user_id, 'author_card')
+
+
+def invalidate_author_card(user_id):
+    cache.delete(author_card_key(user_id))
+
+
+def build_author_card(user):
+    if user.role == 'student':
+        display_name = f"{user.first_name} {user.last_name} {user.login}"
+    else:
+        display_name = f"{user.first_name} {user.last_name}"
+    return {
+        'display_name': display_name,
+        'role': user.role,
+        'picture': user.profile_picture.url if user.profile_picture else None,
+        'thumbnail': user.profile_thumbnail.url if user.profile_thumbnail else None,
+    }
+
+
+def get_author_cards(user_ids):
+    """Return {user id: card}, loading the users missing from the cache in one query."""
+    keys = {author_card_key(pk): pk for pk in user_ids if pk is not None}
+    if not keys:
+        return {}
+    cards = {keys[key]: card for key, card in cache.get_many(list(keys)).items()}
+    missing = set(keys.values()) - set(cards)
+    if missing:
+        users = get_user_model().objects.filter(id__in=missing).only(*AUTHOR_CARD_FIELDS)
+        loaded = {user.id: build_author_card(user) for user in users}
+        cache.set_many(
+            {author_card_key(pk): card for pk, card in loaded.items()}, CacheService.TIMEOUT_DAY
+        )
+        cards.update(loaded)
+    return cards
+
+
+def author_card_of(obj, field):
+    """Card of the user in ``obj.<field>``, built from the loaded user if it is at hand."""
+    user_id = getattr(obj, f'{field}_id')
+    if user_id is None:
+        return None
+    if obj._meta.get_field(field).is_cached(obj):
+        return build_author_card(getattr(obj, field))
+    return get_author_cards([user_id]).get(user_id)
+
+
+class AuthorCardResolver:
+    """
+    Resolve the author cards of many threads and posts.
+
+    Objects are registered with ``add`` before serialization; the first
+    lookup loads the cards of every registered author at once. Serializers
+    read from the resolver through ``context['author_cards']``. Objects
+    with an author snapshot are served from it. Authors of objects that
+    were never registered are built from the loaded user if it is at hand,
+    or loaded on their own otherwise.
+    """
+
+    def __init__(self, request=None):
+        scheme = request.scheme if request is not None else 'http'
+        self.base_url = f'{scheme}://{AVATAR_HOST}'
+        self._user_ids = set()
+        self._cards = {}
+        self._loaded = set()
+
+    def add(self, objects, include_posts=False):
+        """Register a Thread, a Post or an iterable of them."""
+        if hasattr(objects, '_meta'):
+            objects = [objects]
+        for obj in objects:
+            model_name = obj._meta.model_name
+            # Content carrying an author snapshot needs no card
+            if model_name == 'thread':
+                if not obj.author_snapshot:
+                    self._user_ids.add(obj.author_id)
+                # Posts are only registered when already prefetched
+                if include_posts and 'posts' in getattr(obj, '_prefetched_objects_cache', {}):
+                    self._user_ids.update(post.user_id for post in obj.posts.all() if not post.author_snapshot)
+            elif model_name == 'post' and not obj.author_snapshot:
+                self._user_ids.add(obj.user_id)
+        self._user_ids.discard(None)
+
+    def card(self, obj, field):
+        """Card of the user in ``obj.<field>``, or None for anonymous or authorless content."""
+        # Registered authors are loaded together on the first lookup, even
+        # from anonymous content, so a page always costs the same queries
+        self._load(self._user_ids)
+        user_id = getattr(obj, f'{field}_id')
+        if obj.is_anonymous or user_id is None:
+            return None
+        if obj.author_snapshot:
+            return obj.author_snapshot
+        if user_id not in self._loaded:
+            if obj._meta.get_field(field).is_cached(obj):
+                self._cards[user_id] = build_author_card(getattr(obj, field))
+                self._loaded.add(user_id)
+            else:
+                self._load({user_id})
+        return self._cards.get(user_id)
+
+    def _load(self, user_ids):
+        pending = user_ids - self._loaded
+        if pending:
+            self._cards.update(get_author_cards(pending))
+            self._loaded |= pending
+
+    def avatar_url(self, obj, field, size):
+        """Absolute URL of the author's 'picture' or 'thumbnail', or None."""
+        card = self.card(obj, field)
+        url = card and card[size]
+        if not url or '://' in url:
+            return url
+        return self.base_url + url
+
+
+def get_author_card_resolver(context):
+    """The resolver of a serializer context, created on first use if the view has none."""
+    if 'author_cards' not in context:
+        context['author_cards'] = AuthorCardResolver(context.get('request'))
+    return context['author_cards']
+
+
+class AuthorCardMixin:
+    """
+    Provide a per-request ``AuthorCardResolver`` to serializers.
+
+    Every instance passed to ``get_serializer`` is registered with the
+    resolver. Set ``author_cards_include_posts`` on views whose serializer
+    nests the posts of each thread.
+    """
+    author_cards_include_posts = False
+
+    def get_author_cards(self):
+        if not hasattr(self, '_author_cards'):
+            self._author_cards = AuthorCardResolver(self.request)
+        return self._author_cards
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['author_cards'] = self.get_author_cards()
+        return context
+
+    def get_serializer(self, *args, **kwargs):
+        if args and args[0] is not None:
+            self.get_author_cards().add(args[0], include_posts=self.author_cards_include_posts)
+        return super().get_serializer(*args, **kwargs)
@@ -0,0 +1,124 @@
+"""
+Denormalized author snapshots of threads and posts.
+
+``Thread.author_snapshot`` and ``Post.author_snapshot`` hold a copy of the
+author card (see ``mainapp.author_cards``) of their user. Serializers use
+the snapshot when it is set, so rendering threads and posts needs neither
+a join to the users table nor a card lookup.
+
+New threads and posts take the snapshot of their author when they are
+created. When a user is saved, the user is queued in ``AuthorSnapshotSync``
+and a background worker rewrites the snapshots of all their threads and
+posts with two bulk UPDATEs once the change is committed. The
+``sync_author_snapshots`` command drains the queue as well, e.g. after a
+restart, and queues every user with ``--all`` to fill in the snapshots of
+existing content.
+
+The sync lag is the age of the oldest queued change; ``get_sync_lag``
+reports it and every sync logs the lag of the users it processed.
+Snapshots are optional: content without one falls back to author cards.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Min
+from django.utils import timezone
+from .author_cards import AUTHOR_CARD_FIELDS, build_author_card, author_card_of
+from .post import Thread, Post, AuthorSnapshotSync
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='author-snapshots')
+
+# Saves of only these user fields leave the author card unchanged
+UNRELATED_USER_FIELDS = {'last_login', 'password', 'blacklist', 'is_active'}
+
+
+def take_snapshot(instance, field):
+    """Set the author snapshot of a thread or post that is being created."""
+    if instance.author_snapshot is None:
+        instance.author_snapshot = author_card_of(instance, field)
+
+
+def request_sync(user_ids):
+    """Queue the given users, keeping the time of their earliest unsynced change."""
+    user_ids = sorted(set(user_ids))
+    table = connection.ops.quote_name(AuthorSnapshotSync._meta.db_table)
+    now = timezone.now()
+    for start in range(0, len(user_ids), 1000):
+        chunk = user_ids[start:start + 1000]
+        rows = ', '.join(['(%s, %s, 1)'] * len(chunk))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} (user_id, requested_at, version) VALUES {rows} '
+                f'ON CONFLICT (user_id) DO UPDATE SET version = {table}.version + 1',
+                [value for user_id in chunk for value in (user_id, now)],
+            )
+
+
+def user_changed(user, update_fields=None):
+    """Queue a saved user and sync their snapshots in the background after commit."""
+    if update_fields and set(update_fields) <= UNRELATED_USER_FIELDS:
+        return
+    request_sync([user.id])
+    transaction.on_commit(lambda: _executor.submit(_run_sync))
+
+
+def _run_sync():
+    try:
+        sync_author_snapshots()
+    except Exception:
+        logger.exception('Author snapshot sync failed')
+    finally:
+        close_old_connections()
+
+
+def sync_author_snapshots(batch_size=100):
+    """
+    Rewrite the snapshots of all queued users, oldest request first.
+
+    Returns ``{'users', 'rows', 'max_lag'}`` where ``max_lag`` is the
+    largest delay in seconds between a change and its sync.
+    """
+    totals = {'users': 0, 'rows': 0, 'max_lag': 0.0}
+    while True:
+        queued = list(AuthorSnapshotSync.objects.order_by('requested_at')[:batch_size])
+        if not queued:
+            return totals
+        users = get_user_model().objects.filter(id__in=[item.user_id for item in queued]).only(*AUTHOR_CARD_FIELDS)
+        cards = {user.id: build_author_card(user) for user in users}
+
+        for item in queued:
+            card = cards.get(item.user_id)
+            with transaction.atomic():
+                if card is not None:
+                    # Rows already holding the card are left alone
+                    now = timezone.now()
+                    totals['rows'] += Thread.objects.filter(author_id=item.user_id).exclude(
+                        author_snapshot=card
+                    ).update(author_snapshot=card, author_snapshot_updated=now)
+                    totals['rows'] += Post.objects.filter(user_id=item.user_id).exclude(
+                        author_snapshot=card
+                    ).update(author_snapshot=card, author_snapshot_updated=now)
+                # A change saved meanwhile bumped the version and stays queued
+                AuthorSnapshotSync.objects.filter(user_id=item.user_id, version=item.version).delete()
+
+            lag = (timezone.now() - item.requested_at).total_seconds()
+            totals['max_lag'] = max(totals['max_lag'], lag)
+            totals['users'] += 1
+            logger.info('Synced author snapshots of user %s after %.1fs', item.user_id, lag)
+
+
+def get_sync_lag():
+    """Seconds since the oldest change still waiting to be synced, or 0."""
+    oldest = AuthorSnapshotSync.objects.aggregate(oldest=Min('requested_at'))['oldest']
+    return (timezone.now() - oldest).total_seconds() if oldest else 0.0
+
+
+def request_full_sync():
+    """Queue every user that authored a thread or post."""
+    user_ids = set(Thread.objects.filter(author__isnull=False).values_list('author_id', flat=True).distinct())
+    user_ids |= set(Post.objects.filter(user__isnull=False).values_list('user_id', flat=True).distinct())
+    request_sync(user_ids)
+    return len(user_ids)
@@ -0,0 +1,53 @@
+import json
+from functools import lru_cache
+from django.db.models import Q
+from .post import Thread
+
+
+def get_user_blacklist(user):
+    """Return the user's blacklist as a tuple of phrases."""
+    blacklist = getattr(user, 'blacklist', None) or []
+    if isinstance(blacklist, str):
+        try:
+            blacklist = json.loads(blacklist)
+        except Exception:
+            blacklist = []
+    return tuple(blacklist)
+
+
+def _escape(phrase):
+    # Backslash before a non-alphanumeric character is a literal in both
+    # PostgreSQL AREs and Python regexes, so phrases always match verbatim.
+    return ''.join(ch if ch.isalnum() else '\\' + ch for ch in phrase)
+
+
+@lru_cache(maxsize=1024)
+def compile_blacklist(phrases):
+    """
+    Compile a tuple of phrases into one case-insensitive regex alternation.
+
+    The result is memoized on the phrase tuple itself, so it is reused until
+    the user's blacklist changes. Empty phrases are ignored; they would
+    otherwise hide every thread.
+    """
+    unique = sorted({phrase for phrase in phrases if phrase})
+    if not unique:
+        return None
+    return '|'.join(_escape(phrase) for phrase in unique)
+
+
+def exclude_blacklisted_threads(queryset, user):
+    """
+    Exclude threads whose title or content contains a blacklisted phrase.
+
+    Matching thread ids come from a single regex predicate that the trigram
+    indexes on title and content can answer, and are excluded with one
+    anti-join regardless of the number of phrases.
+    """
+    pattern = compile_blacklist(get_user_blacklist(user))
+    if pattern is None:
+        return queryset
+    matching = Thread.objects.filter(
+        Q(title__iregex=pattern) | Q(content__iregex=pattern)
+    ).values('id')
+    return queryset.exclude(id__in=matching)
@@ -0,0 +1,135 @@
+"""
+Diff-based sync of a user's calendar.
+
+The calendar UI autosaves by posting the whole calendar. Instead of
+deleting every event and saving the posted ones again row by row,
+``sync_calendar`` loads the stored events once, diffs them against the
+posted ones in memory and writes only the difference with one
+``bulk_create``, one ``bulk_update`` and one delete.
+
+Posted events are matched to stored ones by ``id``. Events without a
+known id are matched to unclaimed stored events with identical content,
+so clients that do not send ids yet still write nothing for unchanged
+events. New events may carry a ``client_id`` that is echoed back with
+their stored id.
+
+Every sync returns a revision token of the resulting calendar. Clients
+that send it back as ``revision`` get a 409 instead of overwriting a
+calendar that was changed elsewhere in the meantime.
+"""
+import hashlib
+from collections import defaultdict
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from .models import Event
+from .recurrence import invalidate_user_occurrences
+from .serializers import EventSerializer
+
+# Fields the calendar UI edits; color follows from the category
+SYNC_FIELDS = ('title', 'description', 'start_date', 'end_date', 'category', 'repeat_type', 'room', 'teacher')
+
+
+class RevisionConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'The calendar was changed since the given revision.'
+    default_code = 'revision_conflict'
+
+
+def content_key(values):
+    """Comparable content of an event, given as a mapping or an Event."""
+    get = values.get if isinstance(values, dict) else lambda field, default=None: getattr(values, field, default)
+    key = []
+    for field in SYNC_FIELDS:
+        value = get(field, Event._meta.get_field(field).get_default())
+        # Datetimes loaded from the database and parsed from a request
+        # carry different tzinfo objects
+        key.append(value.timestamp() if hasattr(value, 'timestamp') else value)
+    return tuple(key)
+
+
+def calendar_revision(events):
+    """Token identifying the content of a set of events."""
+    rows = sorted((event.id,) + content_key(event) for event in events)
+    return hashlib.sha1(repr(rows).encode()).hexdigest()
+
+
+def personal_events(user):
+    return Event.objects.filter(user=user, schedule_plan__isnull=True)
+
+
+def sync_calendar(user, rows, revision=None):
+    """
+    Make the user's personal calendar match ``rows``.
+
+    Returns ``{'revision', 'created', 'updated', 'deleted'}`` with the
+    serialized created and updated events and the ids of deleted ones.
+    Raises ``ValidationError`` for invalid rows and ``RevisionConflict``
+    for a stale ``revision``.
+    """
+    serializer = EventSerializer(data=rows, many=True)
+    serializer.is_valid(raise_exception=True)
+
+    with transaction.atomic():
+        # Serialize syncs of the same user without locking their events
+        list(get_user_model().objects.select_for_update().filter(id=user.id).values_list('id'))
+        stored = {event.id: event for event in personal_events(user)}
+        if revision is not None and revision != calendar_revision(stored.values()):
+            raise RevisionConflict()
+
+        claimed, updated, unmatched = set(), [], []
+        for row, data in zip(rows, serializer.validated_data):
+            data = {field: data[field] for field in SYNC_FIELDS if field in data}
+            event = stored.get(row.get('id'))
+            if event is None or event.id in claimed:
+                unmatched.append((row, data))
+                continue
+            claimed.add(event.id)
+            if content_key(data) != content_key(event):
+                for field in SYNC_FIELDS:
+                    setattr(event, field, data.get(field, Event._meta.get_field(field).get_default()))
+                event.prepare()
+                # bulk_update skips auto_now, which calendar feeds sync by
+                event.updated_at = timezone.now()
+                updated.append(event)
+
+        unclaimed = defaultdict(list)
+        for event in stored.values():
+            if event.id not in claimed:
+                unclaimed[content_key(event)].append(event)
+
+        created, client_ids = [], []
+        for row, data in unmatched:
+            same = unclaimed.get(content_key(data))
+            if same:
+                claimed.add(same.pop().id)
+                continue
+            event = Event(user=user, **data)
+            event.prepare()
+            created.append(event)
+            client_ids.append(row.get('client_id'))
+
+        deleted = sorted(set(stored) - claimed)
+        if deleted:
+            Event.objects.filter(id__in=deleted).delete()
+        if updated:
+            Event.objects.bulk_update(updated, SYNC_FIELDS + ('color', 'updated_at'), batch_size=500)
+        if created:
+            Event.objects.bulk_create(created, batch_size=500)
+
+    # Bulk writes send no model signals
+    invalidate_user_occurrences(user.id)
+
+    remaining = [event for pk, event in stored.items() if pk in claimed] + created
+    created_data = EventSerializer(created, many=True).data
+    for item, client_id in zip(created_data, client_ids):
+        if client_id is not None:
+            item['client_id'] = client_id
+    return {
+        'revision': calendar_revision(remaining),
+        'created': created_data,
+        'updated': EventSerializer(updated, many=True).data,
+        'deleted': deleted,
+    }
@@ -0,0 +1,153 @@
+"""
+Conditional GET support for the thread endpoints.
+
+Validators are computed from a few narrow columns (activity dates, post
+counts, vote counters, author snapshot times and the requester's own
+votes) without serializing anything. When the client's ``If-None-Match`` matches, the view answers
+304 Not Modified and skips building the payload.
+
+Every ETag includes the requesting user and the query string, and the
+responses are marked ``private``, so a validator or a cached body is
+never reused for another user. ``Last-Modified`` is sent for information
+only: vote counters change without touching any timestamp, so
+``If-Modified-Since`` alone is never answered with 304.
+"""
+import hashlib
+from django.db.models import F, Max, Q, Sum
+from django.utils.http import http_date, parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+from .post import Thread, Vote
+from . import vote_buffer
+
+
+def make_etag(*parts):
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+    return 'W/' + quote_etag(digest)
+
+
+def _user_key(user):
+    if not user.is_authenticated:
+        return None
+    return (user.id, user.role, tuple(getattr(user, 'blacklist', None) or ()))
+
+
+class ConditionalGetMixin:
+    """
+    Answer GET requests with 304 when the client's ETag is still current.
+
+    Views implement ``get_validators`` returning ``(etag, last_modified)``
+    or ``(None, None)`` to skip conditional handling. List validators that
+    already paginated store ``(paginator, page)`` in ``validated_page``;
+    the response then reuses that paginator and loads the full rows of the
+    page by id instead of filtering, counting and paginating again.
+    """
+    validated_page = None
+
+    def get_validators(self):
+        raise NotImplementedError
+
+    def paginate_queryset(self, queryset):
+        if self.validated_page is None:
+            return super().paginate_queryset(queryset)
+        self._paginator, page = self.validated_page
+        rows = {thread.id: thread for thread in queryset.filter(id__in=[row.id for row in page])}
+        return [rows[row.id] for row in page if row.id in rows]
+
+    def get(self, request, *args, **kwargs):
+        # Buffered votes are not visible in the database columns the
+        # validators are built from
+        if vote_buffer.is_enabled():
+            return super().get(request, *args, **kwargs)
+
+        etag, last_modified = self.get_validators()
+        if etag is None:
+            return super().get(request, *args, **kwargs)
+
+        headers = {
+            'ETag': etag,
+            'Cache-Control': 'private, no-cache',
+            'Vary': 'Authorization, Cookie',
+        }
+        if last_modified is not None:
+            headers['Last-Modified'] = http_date(last_modified.timestamp())
+
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            weak = etag.removeprefix('W/')
+            if any(tag == '*' or tag.removeprefix('W/') == weak for tag in parse_etags(if_none_match)):
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            for name, value in headers.items():
+                response[name] = value
+        return response
+
+
+def thread_list_validators(view):
+    """Validators of one page of the thread list, from the page's narrow columns."""
+    request = view.request
+    queryset = view.filter_queryset(view.get_queryset()).select_related(None).only(
+        'id', 'created_date', 'last_activity_date', 'vote_count_cache', 'post_count', 'hot_score',
+        'author_snapshot_updated',
+    )
+    # A fresh paginator of the same kind selects exactly the rows of the page
+    paginator = type(view.paginator)()
+    page = paginator.paginate_queryset(queryset, request, view=view)
+    if page is None:
+        return None, None
+    view.validated_page = (paginator, page)
+
+    rows = tuple(
+        (thread.id, thread.last_activity_date, thread.vote_count_cache, thread.post_count,
+         thread.author_snapshot_updated)
+        for thread in page
+    )
+    total = getattr(getattr(paginator, 'page', None), 'paginator', None)
+    user_votes = ()
+    if request.user.is_authenticated and rows:
+        user_votes = tuple(sorted(
+            Vote.objects.filter(user=request.user, thread_id__in=[row[0] for row in rows])
+            .values_list('thread_id', 'vote_type')
+        ))
+
+    etag = make_etag(
+        'threads', _user_key(request.user), request.get_full_path(),
+        total.count if total is not None else None, rows, user_votes,
+    )
+    last_modified = max((row[1] for row in rows), default=None)
+    return etag, last_modified
+
+
+def thread_detail_validators(view):
+    """Validators of a thread detail, from the thread and its posts' counters."""
+    request = view.request
+    lookup = view.kwargs[view.lookup_url_kwarg or view.lookup_field]
+    state = Thread.objects.filter(pk=lookup).values(
+        'id', 'last_activity_date', 'vote_count_cache', 'post_count', 'author_snapshot_updated'
+    ).annotate(
+        posts_updated=Max('posts__updated_date'),
+        # Author renames and avatar changes reach the snapshots of every post
+        post_authors_updated=Max('posts__author_snapshot_updated'),
+        last_post=Max('posts__id'),
+        # Weighted by id so that opposite changes on two posts do not cancel out
+        post_votes=Sum(F('posts__vote_count_cache') * F('posts__id')),
+    ).first()
+    if state is None:
+        return None, None
+
+    user_votes = ()
+    if request.user.is_authenticated:
+        user_votes = tuple(sorted(
+            Vote.objects.filter(Q(thread_id=state['id']) | Q(post__thread_id=state['id']), user=request.user)
+            .values_list('thread_id', 'post_id', 'vote_type'),
+            key=repr,
+        ))
+
+    etag = make_etag(
+        'thread', _user_key(request.user), request.get_full_path(),
+        tuple(sorted(state.items())), user_votes,
+    )
+    last_modified = max(filter(None, (state['last_activity_date'], state['posts_updated'])))
+    return etag, last_modified
@@ -0,0 +1,136 @@
+import threading
+from contextlib import contextmanager
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from .post import Thread, Post, Vote
+
+VOTE_VALUES = {'upvote': 1, 'downvote': -1}
+
+_local = threading.local()
+
+
+@contextmanager
+def manual_vote_counts():
+    """
+    Suspend the signal-driven counter updates in the current thread.
+
+    For bulk writers that apply the aggregated deltas themselves with
+    ``apply_vote_deltas``.
+    """
+    previous = getattr(_local, 'manual', False)
+    _local.manual = True
+    try:
+        yield
+    finally:
+        _local.manual = previous
+
+
+def signal_counting_enabled():
+    return not getattr(_local, 'manual', False)
+
+
+def vote_value(vote_type):
+    """Contribution of a single vote of the given type to a vote count."""
+    return VOTE_VALUES.get(vote_type, 0)
+
+
+def adjust_vote_count(thread_id=None, post_id=None, delta=0):
+    """
+    Apply a vote delta to the cached counter in one atomic UPDATE.
+
+    Concurrent votes on the same target each add their own delta, so no
+    recount and no read-modify-write cycle is needed.
+    """
+    if not delta:
+        return
+    if thread_id is not None:
+        Thread.objects.filter(id=thread_id).update(vote_count_cache=F('vote_count_cache') + delta)
+    if post_id is not None:
+        Post.objects.filter(id=post_id).update(vote_count_cache=F('vote_count_cache') + delta)
+
+
+def apply_vote_deltas(model, deltas):
+    """Apply {target id: delta} to ``model`` counters in one UPDATE."""
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    model.objects.filter(id__in=deltas).update(
+        vote_count_cache=F('vote_count_cache') + Case(
+            *[When(id=pk, then=Value(delta)) for pk, delta in deltas.items()],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+    )
+
+
+def actual_vote_count(target_field):
+    """Subquery computing the real net vote count of the outer Thread or Post."""
+    votes = Vote.objects.filter(**{target_field: OuterRef('pk')}).values(target_field).annotate(
+        total=Sum(Case(
+            When(vote_type='upvote', then=Value(1)),
+            When(vote_type='downvote', then=Value(-1)),
+            default=Value(0),
+            output_field=IntegerField(),
+        ))
+    ).values('total')
+    return Coalesce(Subquery(votes, output_field=IntegerField()), Value(0))
+
+
+def find_vote_drift(model, queryset=None):
+    """Return (id, cached, actual) rows whose cached vote count has drifted."""
+    target_field = 'thread' if model is Thread else 'post'
+    queryset = model.objects.all() if queryset is None else queryset
+    return list(
+        queryset.annotate(actual=actual_vote_count(target_field))
+        .exclude(vote_count_cache=F('actual'))
+        .values_list('id', 'vote_count_cache', 'actual')
+    )
+
+
+def reconcile_vote_counts(model, queryset=None):
+    """Repair drifted vote counters of ``model`` with one UPDATE. Returns the drift found."""
+    drift = find_vote_drift(model, queryset)
+    if drift:
+        target_field = 'thread' if model is Thread else 'post'
+        model.objects.filter(id__in=[row[0] for row in drift]).update(
+            vote_count_cache=actual_vote_count(target_field)
+        )
+    return drift
+
+
+def actual_post_count():
+    """Subquery computing the real number of posts of the outer Thread."""
+    posts = Post.objects.filter(thread=OuterRef('pk')).values('thread').annotate(
+        total=Count('id')
+    ).values('total')
+    return Coalesce(Subquery(posts, output_field=IntegerField()), Value(0))
+
+
+def counter_expressions(model):
+    """Map every cached counter field of ``model`` to the expression recomputing it."""
+    if model is Thread:
+        return {'vote_count_cache': actual_vote_count('thread'), 'post_count': actual_post_count()}
+    return {'vote_count_cache': actual_vote_count('post')}
+
+
+def rebuild_counter_chunk(model, low, high, dry_run=False):
+    """
+    Recompute the cached counters of ``model`` rows with ``low < id <= high``.
+
+    Drifted rows are found with one grouped statement and repaired with one
+    UPDATE. Returns (rows in the chunk, drifted rows).
+    """
+    queryset = model.objects.filter(id__gt=low, id__lte=high)
+    expressions = counter_expressions(model)
+
+    drifted = Q()
+    for field in expressions:
+        drifted |= ~Q(**{field: F(f'actual_{field}')})
+    drifted_ids = list(
+        queryset.annotate(**{f'actual_{field}': expression for field, expression in expressions.items()})
+        .filter(drifted)
+        .values_list('id', flat=True)
+    )
+    if drifted_ids and not dry_run:
+        model.objects.filter(id__in=drifted_ids).update(**counter_expressions(model))
+    return queryset.count(), len(drifted_ids)
@@ -0,0 +1,228 @@
+"""
+Import of forum threads from the forum mailbox.
+
+Messages are fetched by UID in batches of ``FORUM_EMAIL_BATCH_SIZE``, with
+one ``UID FETCH`` per batch instead of one round trip per message. While a
+worker pool parses a batch, the next batch is already being fetched, and
+every parsed batch is turned into threads in its own transaction.
+
+The highest UID of each imported batch is stored in an
+``EmailImportCheckpoint`` in the same transaction as its threads, so an
+interrupted import resumes after the last imported batch. Imported
+messages are then flagged ``\\Deleted`` with one ``UID STORE`` per batch
+and expunged at the end.
+
+The ``import_emails`` management command runs the import outside of any
+HTTP request. ``import_mailbox`` accepts any object with the ``imaplib``
+IMAP4 interface, so tests can run it against a local stand-in.
+"""
+import email
+import imaplib
+import logging
+import re
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from email.header import decode_header
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from .post import Thread, EmailImportCheckpoint
+from .facets import adjust_facet_counts
+
+logger = logging.getLogger(__name__)
+
+FETCH_UID = re.compile(rb'\bUID (\d+)')
+BODY_SEPARATOR = "_______________________________"
+ALLOWED_SENDER_SUFFIX = 'p.lodz.pl>'
+
+
+def get_batch_size():
+    return getattr(settings, 'FORUM_EMAIL_BATCH_SIZE', 50)
+
+
+def get_parse_workers():
+    return getattr(settings, 'FORUM_EMAIL_PARSE_WORKERS', 4)
+
+
+def connect():
+    """Log in to the forum mailbox configured with the FORUM_EMAIL_IMAP_* settings."""
+    user = getattr(settings, 'FORUM_EMAIL_IMAP_USER', '')
+    password = getattr(settings, 'FORUM_EMAIL_IMAP_PASSWORD', '')
+    if not user or not password:
+        raise ImproperlyConfigured(
+            'The forum mailbox is not configured: set the FORUM_EMAIL_IMAP_USER and '
+            'FORUM_EMAIL_IMAP_PASSWORD environment variables'
+        )
+    mail = imaplib.IMAP4_SSL(settings.FORUM_EMAIL_IMAP_HOST, getattr(settings, 'FORUM_EMAIL_IMAP_PORT', 993))
+    mail.login(user, password)
+    return mail
+
+
+def clean_email_body(body: str) -> str:
+    pos = body.find(BODY_SEPARATOR)
+    if pos != -1:
+        return body[:pos].strip()
+
+
+def parse_message(raw):
+    """Return the subject, sender and plain text body of an RFC822 message."""
+    msg = email.message_from_bytes(raw)
+    subject, encoding = decode_header(msg.get("Subject") or "")[0]
+    if isinstance(subject, bytes):
+        subject = subject.decode(encoding or "utf-8")
+
+    body = ""
+    if msg.is_multipart():
+        for part in msg.walk():
+            if part.get_content_type() == "text/plain" and part.get_payload(decode=True):
+                body = part.get_payload(decode=True).decode(errors="ignore")
+                break
+    else:
+        body = (msg.get_payload(decode=True) or b"").decode(errors="ignore")
+
+    return {"subject": subject, "from": msg.get("From"), "body": body.strip()}
+
+
+def uid_set(uids):
+    return ','.join(str(uid) for uid in uids)
+
+
+def search_uids(mail, after_uid=0):
+    """UIDs of the selected mailbox greater than ``after_uid``, in ascending order."""
+    status, data = mail.uid('SEARCH', None, f'UID {after_uid + 1}:*')
+    if status != 'OK':
+        raise imaplib.IMAP4.error(f'UID SEARCH failed: {data}')
+    # "n:*" always matches the highest UID, even when it is below n
+    return sorted(uid for uid in map(int, data[0].split()) if uid > after_uid)
+
+
+def fetch_batch(mail, uids):
+    """Fetch the given messages in one round trip. Returns [(uid, raw message)] by UID."""
+    status, data = mail.uid('FETCH', uid_set(uids), '(RFC822)')
+    if status != 'OK':
+        raise imaplib.IMAP4.error(f'UID FETCH failed: {data}')
+    messages = []
+    for item in data:
+        # Message parts are (envelope, literal) tuples, separated by b')'
+        if isinstance(item, tuple):
+            match = FETCH_UID.search(item[0])
+            if match:
+                messages.append((int(match.group(1)), item[1]))
+    return sorted(messages)
+
+
+def flag_deleted(mail, uids):
+    mail.uid('STORE', uid_set(uids), '+FLAGS', '(\\Deleted)')
+
+
+def _parse_or_skip(raw):
+    try:
+        return parse_message(raw)
+    except Exception:
+        logger.exception('Skipping an email that could not be parsed')
+        return None
+
+
+def create_threads_from_email_data(emails, user=None):
+    """
+    Create anonymous, non-answerable threads from parsed emails.
+
+    Only emails sent from university addresses are imported. Emails whose
+    fingerprint matches an imported thread or an earlier email of the batch
+    are skipped. The batch takes one IN lookup over fingerprints and one
+    bulk INSERT, whatever its size. Returns the created threads.
+    """
+    visible_for_teachers = not (user is not None and user.email and user.email[0].isdigit())
+    candidates = {}
+    for email_data in emails:
+        subject = email_data.get('subject')
+        body = clean_email_body(email_data.get('body') or '')
+        sender = email_data.get('from')
+        if not subject or not body or not sender:
+            continue
+        if not sender.endswith(ALLOWED_SENDER_SUFFIX):
+            continue
+
+        fingerprint = Thread.fingerprint(subject, body, sender)
+        candidates.setdefault(fingerprint, Thread(
+            title=subject,
+            content=body,
+            category="other",
+            nickname=sender,
+            visible_for_teachers=visible_for_teachers,
+            can_be_answered=False,
+            author=user,
+            is_anonymous=True,
+            content_hash=fingerprint,
+        ))
+    if not candidates:
+        return []
+
+    existing = set(
+        Thread.objects.filter(content_hash__in=candidates, is_anonymous=True)
+        .values_list('content_hash', flat=True)
+    )
+    threads = Thread.objects.bulk_create(
+        [thread for fingerprint, thread in candidates.items() if fingerprint not in existing]
+    )
+    # bulk_create skips the post_save signals that maintain the facet counts
+    adjust_facet_counts(Counter(thread.get_facet() for thread in threads))
+    return threads
+
+
+def import_mailbox(mail, mailbox='INBOX', user=None, batch_size=None, workers=None,
+                   delete=True, progress=None):
+    """
+    Import new messages of ``mailbox`` as threads, resuming from its checkpoint.
+
+    ``progress`` is called with the running totals after every batch.
+    Returns ``{'fetched', 'created', 'last_uid'}``.
+    """
+    batch_size = batch_size or get_batch_size()
+    status, data = mail.select(mailbox)
+    if status != 'OK':
+        raise imaplib.IMAP4.error(f'Cannot select {mailbox}: {data}')
+    uidvalidity = int(mail.response('UIDVALIDITY')[1][0])
+
+    checkpoint, _ = EmailImportCheckpoint.objects.get_or_create(
+        mailbox=mailbox, defaults={'uidvalidity': uidvalidity}
+    )
+    if checkpoint.uidvalidity != uidvalidity:
+        # The server renumbered the mailbox, so the stored UID means nothing;
+        # already imported threads are still skipped as duplicates
+        checkpoint.uidvalidity = uidvalidity
+        checkpoint.last_uid = 0
+
+    uids = search_uids(mail, checkpoint.last_uid)
+    batches = [uids[i:i + batch_size] for i in range(0, len(uids), batch_size)]
+    totals = {'fetched': 0, 'created': 0, 'last_uid': checkpoint.last_uid}
+
+    def import_batch(batch, parsing):
+        emails = [email_data for email_data in (future.result() for future in parsing) if email_data]
+        with transaction.atomic():
+            created = create_threads_from_email_data(emails, user)
+            checkpoint.last_uid = batch[-1]
+            checkpoint.save()
+        if delete:
+            flag_deleted(mail, batch)
+        totals['fetched'] += len(parsing)
+        totals['created'] += len(created)
+        totals['last_uid'] = checkpoint.last_uid
+        if progress:
+            progress(totals)
+
+    with ThreadPoolExecutor(max_workers=workers or get_parse_workers()) as pool:
+        pending = None
+        for batch in batches:
+            # Fetch this batch while the previous one is still being parsed
+            messages = fetch_batch(mail, batch)
+            parsing = [pool.submit(_parse_or_skip, raw) for _, raw in messages]
+            if pending:
+                import_batch(*pending)
+            pending = (batch, parsing)
+        if pending:
+            import_batch(*pending)
+
+    if delete and batches:
+        mail.expunge()
+    return totals
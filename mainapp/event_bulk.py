@@ -0,0 +1,63 @@
+"""
+Bulk ingestion of calendar events, e.g. schedule plan imports.
+
+All rows are validated first, the schedule plans they reference with one
+query for the whole batch instead of one per row. Valid rows get their
+derived fields and are written with a single ``bulk_create``. Invalid rows
+are reported in their place; by default they reject the whole batch, in
+partial mode the valid rows are inserted anyway.
+"""
+from rest_framework import serializers
+from .models import Event, SchedulePlan
+from .recurrence import invalidate_user_occurrences
+from .plan_overlay import invalidate_plan_events
+from .serializers import EventSerializer
+
+
+class EventRowSerializer(EventSerializer):
+    """Row validation without per-row lookups; plans are checked per batch."""
+    schedule_plan = serializers.IntegerField(required=False, allow_null=True)
+
+
+def bulk_insert_events(user, rows, partial=False, batch_size=500):
+    """
+    Insert ``rows`` as events of ``user``.
+
+    Returns a list aligned with ``rows`` holding the created Event, or
+    the validation errors of a rejected row as a dict. Without
+    ``partial``, nothing is inserted if any row is invalid and valid rows
+    are left as None.
+    """
+    validator = EventRowSerializer()
+    results, valid = [None] * len(rows), []
+    for index, row in enumerate(rows):
+        try:
+            valid.append((index, validator.run_validation(row)))
+        except serializers.ValidationError as exc:
+            results[index] = exc.detail
+
+    plan_ids = {data['schedule_plan'] for index, data in valid if data.get('schedule_plan') is not None}
+    known_plans = set(SchedulePlan.objects.filter(id__in=plan_ids).values_list('id', flat=True))
+
+    events = []
+    for index, data in valid:
+        plan_id = data.pop('schedule_plan', None)
+        if plan_id is not None and plan_id not in known_plans:
+            results[index] = {'schedule_plan': [f'Invalid pk "{plan_id}" - object does not exist.']}
+            continue
+        event = Event(user=user, schedule_plan_id=plan_id, **data)
+        event.prepare()
+        events.append((index, event))
+
+    if len(events) < len(rows) and not partial:
+        return results
+    for index, event in events:
+        results[index] = event
+    events = [event for index, event in events]
+    if events:
+        Event.objects.bulk_create(events, batch_size=batch_size)
+        # Bulk inserts send no model signals
+        invalidate_user_occurrences(user.id)
+        for plan_id in {event.schedule_plan_id for event in events}:
+            invalidate_plan_events(plan_id)
+    return results
@@ -0,0 +1,111 @@
+"""
+Thread counts per facet for the forum sidebar.
+
+``ThreadFacetCount`` holds one row per (category, visible_for_teachers,
+can_be_answered) combination with the number of threads in it. Thread
+signals move threads between rows as they are created, edited and deleted,
+so the sidebar reads a handful of counter rows instead of running COUNT
+queries over all threads on every page view.
+
+Counts follow the role filtering of the thread list: lecturers only count
+threads visible for teachers. Per-user blacklists are not applied.
+"""
+from collections import Counter
+from django.db import connection, transaction
+from django.db.models import Count
+from .post import Thread, ThreadFacetCount
+
+
+def adjust_facet_counts(deltas):
+    """Apply {(category, visible_for_teachers, can_be_answered): delta} with one upsert."""
+    deltas = {facet: delta for facet, delta in deltas.items() if facet is not None and delta}
+    if not deltas:
+        return
+    table = connection.ops.quote_name(ThreadFacetCount._meta.db_table)
+    rows = ', '.join(['(%s, %s, %s, %s)'] * len(deltas))
+    params = [value for facet, delta in sorted(deltas.items()) for value in (*facet, delta)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} (category, visible_for_teachers, can_be_answered, thread_count) '
+            f'VALUES {rows} '
+            f'ON CONFLICT (category, visible_for_teachers, can_be_answered) '
+            f'DO UPDATE SET thread_count = {table}.thread_count + EXCLUDED.thread_count',
+            params,
+        )
+
+
+def thread_moved(old_facet, new_facet):
+    """Move one thread from ``old_facet`` to ``new_facet``; either may be None."""
+    if old_facet != new_facet:
+        deltas = Counter()
+        deltas[old_facet] -= 1
+        deltas[new_facet] += 1
+        adjust_facet_counts(deltas)
+
+
+def rebuild_facet_counts():
+    """Recount all facets from the thread table. Returns the number of facet rows."""
+    with transaction.atomic():
+        # Writers upserting counters wait for the rebuild and then apply their
+        # deltas on top of it, and the rebuild waits for writers in progress
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'LOCK TABLE {connection.ops.quote_name(ThreadFacetCount._meta.db_table)} IN EXCLUSIVE MODE'
+            )
+        ThreadFacetCount.objects.all().delete()
+        counts = (
+            Thread.objects.order_by()
+            .values(*Thread.FACET_FIELDS)
+            .annotate(total=Count('id'))
+        )
+        return len(ThreadFacetCount.objects.bulk_create([
+            ThreadFacetCount(
+                category=row['category'],
+                visible_for_teachers=row['visible_for_teachers'],
+                can_be_answered=row['can_be_answered'],
+                thread_count=row['total'],
+            )
+            for row in counts
+        ]))
+
+
+def sees_only_teacher_threads(user):
+    """Mirror of the lecturer filtering in ThreadListCreateAPIView."""
+    return user.is_authenticated and user.role == 'lecturer'
+
+
+def get_facet_counts(user):
+    """
+    Return the thread counts the given user can see, per facet.
+
+    ``categories``, ``visible_for_teachers`` and ``can_be_answered`` map
+    each facet value to its thread count, and ``combinations`` lists the
+    counts of every combination so that clients can narrow one facet by
+    another without another request.
+    """
+    rows = ThreadFacetCount.objects.filter(thread_count__gt=0).order_by(
+        'category', 'visible_for_teachers', 'can_be_answered'
+    )
+    if sees_only_teacher_threads(user):
+        rows = rows.filter(visible_for_teachers=True)
+
+    categories, visible, answerable = Counter(), Counter(), Counter()
+    combinations = []
+    for row in rows:
+        categories[row.category] += row.thread_count
+        visible[row.visible_for_teachers] += row.thread_count
+        answerable[row.can_be_answered] += row.thread_count
+        combinations.append({
+            'category': row.category,
+            'visible_for_teachers': row.visible_for_teachers,
+            'can_be_answered': row.can_be_answered,
+            'count': row.thread_count,
+        })
+
+    return {
+        'total': sum(categories.values()),
+        'categories': dict(categories),
+        'visible_for_teachers': {'true': visible[True], 'false': visible[False]},
+        'can_be_answered': {'true': answerable[True], 'false': answerable[False]},
+        'combinations': combinations,
+    }
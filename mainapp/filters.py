@@ -26,6 +26,7 @@ class ThreadFilter(django_filters.FilterSet):
             ('vote_count_cache', 'votes'),
             ('post_count', 'posts'),
             ('title', 'title'),
+            ('hot_score', 'hot'),
         ),
         field_labels={
             'created_date': 'Creation date',
@@ -33,6 +34,7 @@ class ThreadFilter(django_filters.FilterSet):
             'vote_count_cache': 'Vote count',
             'post_count': 'Post count',
             'title': 'Title',
+            'hot_score': 'Trending',
         }
     )
     
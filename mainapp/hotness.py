@@ -0,0 +1,77 @@
+"""
+Time-decayed "hot" score of threads.
+
+``Thread.hot_score`` is a sum of event weights (thread creation, votes,
+new posts) that halves every ``FORUM_HOT_HALF_LIFE_HOURS``. The score is
+stored together with the moment it was last decayed to, and every event
+decays the stored value to the current time and adds its weight in the
+same UPDATE. The ``decay_hot_scores`` command periodically decays all
+scores to a common moment, so that sorting by the indexed column ranks
+quiet threads correctly as well.
+"""
+from django.conf import settings
+from django.db.models import Case, F, FloatField, Func, Q, Value, When
+from django.utils import timezone
+from .post import Thread
+
+# New threads start at the Thread.hot_score default of 1.0
+POST_WEIGHT = 0.5
+# Scores closer to zero than this no longer affect the ranking and are
+# left out of the periodic sweep
+NEGLIGIBLE_SCORE = 1e-3
+
+
+def get_half_life_seconds():
+    return getattr(settings, 'FORUM_HOT_HALF_LIFE_HOURS', 24) * 3600
+
+
+class Decay(Func):
+    """Factor by which a score stored at ``since`` has decayed until ``now``."""
+    # The exponent is capped because POWER raises on float underflow
+    template = 'POWER(0.5, LEAST(EXTRACT(EPOCH FROM (%(expressions)s)) / %(half_life)s, 1000))'
+    arg_joiner = ' - '
+    output_field = FloatField()
+
+    def __init__(self, now, since, **extra):
+        super().__init__(Value(now), since, half_life=float(get_half_life_seconds()), **extra)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # SQLite stores datetimes as text; JULIANDAY gives their distance in days
+        return self.as_sql(
+            compiler, connection,
+            template='POWER(0.5, MIN((JULIANDAY(%(expressions)s)) * 86400.0 / %(half_life)s, 1000))',
+            arg_joiner=') - JULIANDAY(',
+            **extra_context
+        )
+
+
+def decayed_hot_score(now):
+    return F('hot_score') * Decay(now, F('hot_score_updated'))
+
+
+def bump_hot_scores(weights):
+    """Decay the scores of {thread id: weight} to now and add the weights in one UPDATE."""
+    weights = {pk: weight for pk, weight in weights.items() if weight}
+    if not weights:
+        return
+    now = timezone.now()
+    Thread.objects.filter(id__in=weights).update(
+        hot_score=decayed_hot_score(now) + Case(
+            *[When(id=pk, then=Value(float(weight))) for pk, weight in weights.items()],
+            default=Value(0.0),
+            output_field=FloatField(),
+        ),
+        hot_score_updated=now,
+    )
+
+
+def decay_all_hot_scores(queryset=None):
+    """Decay every non-negligible score to now. Returns the number of threads updated."""
+    now = timezone.now()
+    queryset = Thread.objects.all() if queryset is None else queryset
+    return queryset.filter(
+        Q(hot_score__gt=NEGLIGIBLE_SCORE) | Q(hot_score__lt=-NEGLIGIBLE_SCORE)
+    ).update(
+        hot_score=decayed_hot_score(now),
+        hot_score_updated=now,
+    )
@@ -0,0 +1,324 @@
+"""
+iCalendar feed of a user's calendar.
+
+The feed holds the user's own events and the events of their active
+applied plans, clipped to the dates of each application. Recurring events
+are exported once with an ``RRULE``:
+
+- ``weekly`` becomes ``FREQ=WEEKLY``.
+- ``monthly`` becomes ``FREQ=MONTHLY`` on the nth weekday, e.g. ``BYDAY=2TU``.
+
+Occurrences keep their local wall-clock time across DST changes (see
+``mainapp.recurrence``), so outside of UTC recurring events are sent in
+local time with a ``TZID`` and the feed carries a ``VTIMEZONE`` with the
+offset changes of the time zone.
+
+Feeds are addressed by a signed token in the URL, since calendar clients
+cannot send bearer tokens. Tokens carry the version of the user's
+``CalendarFeedKey``; rotating it revokes every token issued before.
+``VEVENT``s are streamed while the events are
+read from a server-side cursor, so a feed is never built in memory.
+
+Polling clients are answered with 304 while their ETag is current. Every
+feed also carries a sync token in ``X-Sync-Token``. Passing it back as
+``?sync_token=`` returns only the events changed since, plus cancelled
+``VEVENT``s for deleted ones, taken from ``DeletedEvent`` tombstones.
+A token from before a change of the user's applied plans, or older than
+the tombstones kept, is answered with the full feed.
+"""
+import hashlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q
+from django.utils import timezone
+from .models import AppliedPlan, CalendarFeedKey, DeletedEvent, Event
+from .plan_overlay import application_bounds
+from .recurrence import Recurrence
+
+FEED_SALT = 'mainapp.calendar_feed'
+PRODID = '-//Sumy//Calendar//EN'
+EVENTS_PER_FETCH = 500
+# Tombstones are kept this long; older sync tokens get the full feed
+TOMBSTONE_DAYS = getattr(settings, 'CALENDAR_FEED_TOMBSTONE_DAYS', 30)
+# Sync tokens reach back this far to cover writes committed after a feed
+# was read, at the price of sending a few events twice
+SYNC_MARGIN = timedelta(seconds=60)
+WEEKDAYS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+# Offset changes are listed up to this many years ahead
+VTIMEZONE_YEARS = 10
+
+
+def get_feed_version(user_id):
+    return CalendarFeedKey.objects.filter(user_id=user_id).values_list('version', flat=True).first() or 0
+
+
+def make_feed_token(user):
+    return signing.dumps([user.id, get_feed_version(user.id)], salt=FEED_SALT)
+
+
+def rotate_feed_token(user):
+    """Revoke every feed token of the user and return a new one."""
+    with transaction.atomic():
+        CalendarFeedKey.objects.get_or_create(user=user)
+        CalendarFeedKey.objects.filter(user=user).update(version=F('version') + 1)
+    return make_feed_token(user)
+
+
+def get_feed_user(token):
+    """The user a current feed token was issued for, or None."""
+    try:
+        user_id, version = signing.loads(token, salt=FEED_SALT)
+    except (signing.BadSignature, TypeError, ValueError):
+        return None
+    if version != get_feed_version(user_id):
+        return None
+    return get_user_model().objects.filter(id=user_id, is_active=True).first()
+
+
+class Feed:
+    """The calendar of one user as served by the feed."""
+
+    def __init__(self, user, host):
+        self.user = user
+        self.host = host
+        # {plan id: (since, until)} of the active applications
+        self.applications = {
+            application.plan_id: application_bounds(application)
+            for application in AppliedPlan.objects.filter(
+                user=user, is_active=True, plan__is_active=True
+            ).only('plan_id', 'start_date', 'end_date')
+        }
+        # Recurring events are sent in local time outside of UTC
+        self.zone = timezone.get_current_timezone()
+        self.tzid = None if is_utc(self.zone) else str(self.zone)
+        self.applications_digest = hashlib.sha1(
+            repr(sorted(self.applications.items())).encode()
+        ).hexdigest()[:12]
+
+    def events(self):
+        return Event.objects.filter(
+            Q(user=self.user, schedule_plan__isnull=True) | Q(schedule_plan_id__in=list(self.applications))
+        )
+
+    def deleted_events(self, since):
+        return DeletedEvent.objects.filter(
+            Q(user_id=self.user.id, schedule_plan_id__isnull=True)
+            | Q(schedule_plan_id__in=list(self.applications)),
+            deleted_at__gte=since,
+        )
+
+    def etag(self, since=None):
+        """Validator of the feed, from one aggregate over its events."""
+        state = self.events().aggregate(updated=Max('updated_at'), count=Count('id'))
+        parts = (self.user.id, self.applications_digest, state['updated'], state['count'], since)
+        return '"' + hashlib.sha1(repr(parts).encode()).hexdigest() + '"'
+
+    def sync_token(self):
+        """Token for the next incremental request, issued before reading the feed."""
+        return f'{(timezone.now() - SYNC_MARGIN).timestamp():.6f}.{self.applications_digest}'
+
+    def parse_sync_token(self, token):
+        """Time a sync token was issued, or None if the full feed is needed."""
+        try:
+            timestamp, digest = token.rsplit('.', 1)
+            since = datetime.fromtimestamp(float(timestamp), tz=dt_timezone.utc)
+        except (ValueError, OverflowError, OSError):
+            return None
+        if digest != self.applications_digest or since < timezone.now() - timedelta(days=TOMBSTONE_DAYS):
+            return None
+        return since
+
+    def lines(self, since=None):
+        """Content lines of the feed; only changes after ``since`` if given."""
+        yield 'BEGIN:VCALENDAR'
+        yield 'VERSION:2.0'
+        yield f'PRODID:{PRODID}'
+        yield 'CALSCALE:GREGORIAN'
+        if self.tzid:
+            first = self.events().exclude(repeat_type='none').aggregate(first=Min('start_date'))['first']
+            yield from vtimezone(self.zone, (first or timezone.now()).year)
+        events = self.events()
+        if since is not None:
+            events = events.filter(updated_at__gte=since)
+        for event in events.order_by().iterator(chunk_size=EVENTS_PER_FETCH):
+            yield from self.vevent(event, cancelled_if_hidden=since is not None)
+        if since is not None:
+            for deleted in self.deleted_events(since).iterator(chunk_size=EVENTS_PER_FETCH):
+                yield from self.cancelled(deleted.event_id, deleted.start_date, deleted.deleted_at)
+        yield 'END:VCALENDAR'
+
+    def uid(self, event_id):
+        return f'event-{event_id}@{self.host}'
+
+    def vevent(self, event, cancelled_if_hidden=False):
+        start, end, until = event.start_date, event.end_date, None
+        if event.schedule_plan_id is not None:
+            # Plan events start with the first occurrence of the application
+            since, until = self.applications[event.schedule_plan_id]
+            first = next(Recurrence.from_event(event, since=since, until=until).between(since, until), None)
+            if first is None:
+                if cancelled_if_hidden:
+                    yield from self.cancelled(event.id, event.start_date, event.updated_at)
+                return
+            start, end = first
+
+        yield 'BEGIN:VEVENT'
+        yield f'UID:{self.uid(event.id)}'
+        yield f'DTSTAMP:{format_datetime(event.updated_at)}'
+        rule = recurrence_rule(event, until)
+        if rule and self.tzid:
+            # Clients expand the rule in the zone of DTSTART
+            yield f'DTSTART;TZID={self.tzid}:{format_local_datetime(start)}'
+            yield f'DTEND;TZID={self.tzid}:{format_local_datetime(end)}'
+        else:
+            yield f'DTSTART:{format_datetime(start)}'
+            yield f'DTEND:{format_datetime(end)}'
+        if rule:
+            yield f'RRULE:{rule}'
+        yield f'SUMMARY:{escape_text(event.title)}'
+        if event.description:
+            yield f'DESCRIPTION:{escape_text(event.description)}'
+        if event.room:
+            yield f'LOCATION:{escape_text(event.room)}'
+        yield f'CATEGORIES:{escape_text(event.category)}'
+        yield 'END:VEVENT'
+
+    def cancelled(self, event_id, start, stamp):
+        yield 'BEGIN:VEVENT'
+        yield f'UID:{self.uid(event_id)}'
+        yield f'DTSTAMP:{format_datetime(stamp)}'
+        yield f'DTSTART:{format_datetime(start)}'
+        yield 'STATUS:CANCELLED'
+        yield 'END:VEVENT'
+
+    def stream(self, since=None):
+        """The feed as folded, CRLF terminated lines."""
+        for line in self.lines(since):
+            yield fold_line(line) + '\r\n'
+
+
+def recurrence_rule(event, until=None):
+    if event.repeat_type == 'weekly':
+        rule = 'FREQ=WEEKLY'
+    elif event.repeat_type == 'monthly':
+        start = timezone.localtime(event.start_date)
+        rule = f'FREQ=MONTHLY;BYDAY={(start.day - 1) // 7 + 1}{WEEKDAYS[start.weekday()]}'
+    else:
+        return None
+    if until is not None:
+        rule += f';UNTIL={format_datetime(until - timedelta(seconds=1))}'
+    return rule
+
+
+def format_datetime(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def format_local_datetime(value):
+    return timezone.localtime(value).strftime('%Y%m%dT%H%M%S')
+
+
+def format_offset(offset):
+    minutes = int(offset.total_seconds()) // 60
+    sign = '-' if minutes < 0 else '+'
+    return f'{sign}{abs(minutes) // 60:02d}{abs(minutes) % 60:02d}'
+
+
+def is_utc(zone):
+    return str(zone) in ('UTC', 'Etc/UTC')
+
+
+def offset_changes(zone, since, until):
+    """UTC instants in [since, until) at which the offset of ``zone`` changes."""
+    def offset(moment):
+        return moment.astimezone(zone).utcoffset()
+
+    day = timedelta(days=1)
+    moment = since
+    while moment < until:
+        following = moment + day
+        if offset(moment) != offset(following):
+            low, high = moment, following
+            while high - low > timedelta(minutes=1):
+                middle = low + (high - low) / 2
+                if offset(middle) == offset(low):
+                    low = middle
+                else:
+                    high = middle
+            yield high.replace(second=0, microsecond=0)
+        moment = following
+
+
+def vtimezone(zone, first_year, years_ahead=VTIMEZONE_YEARS):
+    """
+    ``VTIMEZONE`` of ``zone`` from ``first_year`` on. Every kind of offset
+    change becomes one observance listing its onsets as ``RDATE``s.
+    """
+    since = datetime(first_year, 1, 1, tzinfo=dt_timezone.utc)
+    until = datetime(timezone.now().year + years_ahead, 1, 1, tzinfo=dt_timezone.utc)
+    observances = {}
+    for change in offset_changes(zone, since, until):
+        local = change.astimezone(zone)
+        before, after = (change - timedelta(minutes=1)).astimezone(zone).utcoffset(), local.utcoffset()
+        key = (bool(local.dst()), before, after, local.tzname())
+        # Onsets are given in the local time before the change
+        observances.setdefault(key, []).append((change + before).strftime('%Y%m%dT%H%M%S'))
+
+    yield 'BEGIN:VTIMEZONE'
+    yield f'TZID:{zone}'
+    if not observances:
+        offset = format_offset(since.astimezone(zone).utcoffset())
+        yield from ('BEGIN:STANDARD', 'DTSTART:19700101T000000', f'TZOFFSETFROM:{offset}',
+                    f'TZOFFSETTO:{offset}', 'END:STANDARD')
+    for (daylight, before, after, name), onsets in observances.items():
+        kind = 'DAYLIGHT' if daylight else 'STANDARD'
+        yield f'BEGIN:{kind}'
+        yield f'DTSTART:{onsets[0]}'
+        if onsets[1:]:
+            yield f'RDATE:{",".join(onsets[1:])}'
+        yield f'TZOFFSETFROM:{format_offset(before)}'
+        yield f'TZOFFSETTO:{format_offset(after)}'
+        if name:
+            yield f'TZNAME:{escape_text(name)}'
+        yield f'END:{kind}'
+    yield 'END:VTIMEZONE'
+
+
+def escape_text(value):
+    return (
+        str(value).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def fold_line(line, limit=75):
+    """Fold a content line into chunks of at most ``limit`` octets."""
+    encoded = line.encode()
+    if len(encoded) <= limit:
+        return line
+    chunks, start = [], 0
+    while start < len(encoded):
+        end = min(start + (limit if not chunks else limit - 1), len(encoded))
+        # Never split a UTF-8 sequence
+        while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+            end -= 1
+        chunks.append(encoded[start:end].decode())
+        start = end
+    return '\r\n '.join(chunks)
+
+
+def record_deletion(event):
+    """Keep a tombstone of a deleted event for incremental feeds."""
+    DeletedEvent.objects.create(
+        event_id=event.id, user_id=event.user_id, schedule_plan_id=event.schedule_plan_id, start_date=event.start_date
+    )
+
+
+def prune_tombstones():
+    """Drop tombstones no sync token can reach anymore."""
+    cutoff = timezone.now() - timedelta(days=TOMBSTONE_DAYS)
+    deleted, _ = DeletedEvent.objects.filter(deleted_at__lt=cutoff).delete()
+    return deleted
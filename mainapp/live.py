@@ -0,0 +1,195 @@
+"""
+Live forum updates.
+
+Forum events (new and edited posts, vote changes, unread counters of pinned
+threads) are published to topics such as ``thread:<id>`` and ``user:<id>``
+through a broadcaster and streamed to clients by the server-sent events
+endpoint in ``mainapp.api.live``.
+
+The broadcaster backend is chosen with ``FORUM_LIVE_BACKEND``:
+
+- ``LocalBackend`` (default) delivers messages to subscribers of the
+  current process. It is enough for a single ASGI worker, and stands in
+  for a real message bus in development and tests.
+- ``RedisBackend`` relays messages through Redis pub/sub, so that events
+  published by any process reach clients connected to any other.
+"""
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils.module_loading import import_string
+from .post import Post
+try:
+    import redis
+    import redis.asyncio as redis_asyncio
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+def thread_topic(thread_id):
+    return f'thread:{thread_id}'
+
+
+def user_topic(user_id):
+    return f'user:{user_id}'
+
+
+class Subscription:
+    """Messages of a set of topics, consumed by one client connection."""
+
+    def __init__(self, backend, topics):
+        self.backend = backend
+        self.topics = set()
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=1000)
+        self.add_topics(topics)
+
+    def deliver(self, topic, message):
+        """Hand a message over from any thread; drops it if the client is too slow."""
+        def put():
+            try:
+                self.queue.put_nowait((topic, message))
+            except asyncio.QueueFull:
+                logger.warning('Dropping live update for a slow subscriber')
+        self.loop.call_soon_threadsafe(put)
+
+    def add_topics(self, topics):
+        topics = set(topics) - self.topics
+        self.topics |= topics
+        self.backend.add_topics(self, topics)
+
+    def remove_topics(self, topics):
+        topics = set(topics) & self.topics
+        self.topics -= topics
+        self.backend.remove_topics(self, topics)
+
+    async def get(self, timeout=None):
+        """Return the next (topic, message), or None after ``timeout`` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.remove_topics(set(self.topics))
+
+
+class LocalBackend:
+    """Deliver messages to the subscribers of the current process."""
+
+    def __init__(self, **options):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def add_topics(self, subscription, topics):
+        with self._lock:
+            for topic in topics:
+                self._subscribers[topic].add(subscription)
+
+    def remove_topics(self, subscription, topics):
+        with self._lock:
+            for topic in topics:
+                self._subscribers[topic].discard(subscription)
+                if not self._subscribers[topic]:
+                    del self._subscribers[topic]
+
+    def publish(self, topic, message):
+        self.deliver(topic, message)
+
+    def deliver(self, topic, message):
+        with self._lock:
+            subscriptions = list(self._subscribers.get(topic, ()))
+        for subscription in subscriptions:
+            subscription.deliver(topic, message)
+
+
+class RedisBackend(LocalBackend):
+    """
+    Relay messages between processes through Redis pub/sub.
+
+    Each process keeps one pattern subscription and fans incoming messages
+    out to its local subscribers.
+    """
+    channel_prefix = 'sumy:live:'
+
+    def __init__(self, url='redis://127.0.0.1:6379/0', **options):
+        if not REDIS_AVAILABLE:
+            raise ImproperlyConfigured('RedisBackend requires the redis package')
+        super().__init__()
+        self.url = url
+        self._client = redis.Redis.from_url(url)
+        self._listener = None
+
+    def add_topics(self, subscription, topics):
+        super().add_topics(subscription, topics)
+        if self._listener is None:
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+
+    def publish(self, topic, message):
+        self._client.publish(self.channel_prefix + topic, json.dumps(message))
+
+    async def _listen(self):
+        client = redis_asyncio.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        await pubsub.psubscribe(self.channel_prefix + '*')
+        async for item in pubsub.listen():
+            if item['type'] != 'pmessage':
+                continue
+            topic = item['channel'].decode().removeprefix(self.channel_prefix)
+            self.deliver(topic, json.loads(item['data']))
+
+
+_broadcaster = None
+_broadcaster_lock = threading.Lock()
+
+
+def get_broadcaster():
+    global _broadcaster
+    if _broadcaster is None:
+        with _broadcaster_lock:
+            if _broadcaster is None:
+                backend = import_string(getattr(settings, 'FORUM_LIVE_BACKEND', 'mainapp.live.LocalBackend'))
+                _broadcaster = backend(**getattr(settings, 'FORUM_LIVE_BACKEND_OPTIONS', {}))
+    return _broadcaster
+
+
+def publish(topic, message):
+    """Publish ``message`` to ``topic`` once the current transaction commits."""
+    def send():
+        try:
+            get_broadcaster().publish(topic, message)
+        except Exception:
+            logger.exception('Publishing a live update to %s failed', topic)
+    transaction.on_commit(send)
+
+
+def publish_post_event(post, action):
+    """Announce a created, updated or deleted post to its thread's subscribers."""
+    if post.thread_id:
+        publish(thread_topic(post.thread_id), {
+            'type': 'post', 'action': action, 'thread': post.thread_id, 'post': post.id,
+        })
+
+
+def publish_vote_deltas(thread_deltas=None, post_deltas=None):
+    """Announce vote count changes given as {thread id: delta} and {post id: delta}."""
+    for thread_id, delta in (thread_deltas or {}).items():
+        if thread_id is not None and delta:
+            publish(thread_topic(thread_id), {'type': 'vote', 'thread': thread_id, 'post': None, 'delta': delta})
+
+    post_deltas = {pk: delta for pk, delta in (post_deltas or {}).items() if pk is not None and delta}
+    if post_deltas:
+        post_threads = Post.objects.filter(id__in=post_deltas).values_list('id', 'thread_id')
+        for post_id, thread_id in post_threads:
+            if thread_id:
+                publish(thread_topic(thread_id), {
+                    'type': 'vote', 'thread': thread_id, 'post': post_id, 'delta': post_deltas[post_id],
+                })
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from mainapp.hotness import decay_all_hot_scores
+
+
+class Command(BaseCommand):
+    help = 'Decay the trending scores of all threads to the current time (run periodically, e.g. every 10 minutes)'
+
+    def handle(self, *args, **options):
+        updated = decay_all_hot_scores()
+        self.stdout.write(self.style.SUCCESS(f'Decayed hot scores of {updated} threads'))
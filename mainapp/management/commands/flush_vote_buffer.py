@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from mainapp.vote_buffer import get_vote_buffer
+
+
+class Command(BaseCommand):
+    help = 'Write votes waiting in the write-behind vote buffer to the database'
+
+    def handle(self, *args, **options):
+        flushed = get_vote_buffer().flush()
+        self.stdout.write(self.style.SUCCESS(f'Flushed {flushed} buffered votes'))
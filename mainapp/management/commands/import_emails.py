@@ -0,0 +1,71 @@
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from mainapp import email_import
+
+
+class Command(BaseCommand):
+    help = 'Import new emails of the forum mailbox as threads, resuming from the last imported UID'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--mailbox',
+            default='INBOX',
+            help='Mailbox to import from'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Messages fetched per UID FETCH (default: FORUM_EMAIL_BATCH_SIZE)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Threads parsing messages (default: FORUM_EMAIL_PARSE_WORKERS)'
+        )
+        parser.add_argument(
+            '--user',
+            help='Email of the account the imported threads are attributed to'
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Leave imported messages in the mailbox instead of deleting them'
+        )
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            try:
+                user = get_user_model().objects.get(email=options['user'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"No user with email {options['user']}")
+
+        def progress(totals):
+            self.stdout.write(
+                f"Imported up to UID {totals['last_uid']}: "
+                f"{totals['fetched']} emails, {totals['created']} new threads"
+            )
+
+        try:
+            mail = email_import.connect()
+        except ImproperlyConfigured as e:
+            raise CommandError(str(e))
+        try:
+            totals = email_import.import_mailbox(
+                mail,
+                mailbox=options['mailbox'],
+                user=user,
+                batch_size=options['batch_size'],
+                workers=options['workers'],
+                delete=not options['keep'],
+                progress=progress,
+            )
+        finally:
+            mail.logout()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {totals['fetched']} emails as {totals['created']} threads"
+        ))
@@ -1,47 +1,94 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from django.apps import apps
 from django.core.management.base import BaseCommand
-from django.db import transaction
+from django.db import connections, transaction
+from django.db.models import Max, Min
 from mainapp.post import Thread, Post
+from mainapp.counters import rebuild_counter_chunk
+
+
+def rebuild_chunk(model_label, low, high, dry_run):
+    """Worker entry point; runs one chunk in its own transaction."""
+    model = apps.get_model(model_label)
+    with transaction.atomic():
+        return rebuild_counter_chunk(model, low, high, dry_run=dry_run)
 
 
 class Command(BaseCommand):
     help = 'Populate vote_count_cache and post_count fields for existing threads and posts'
-    
+
     def add_arguments(self, parser):
         parser.add_argument(
             '--batch-size',
             type=int,
-            default=100,
-            help='Number of objects to process in each batch'
+            default=5000,
+            help='Width of each id range recomputed by one pair of statements'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of worker processes recomputing chunks in parallel'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report drifted counters without repairing them'
         )
-    
+
     def handle(self, *args, **options):
-        batch_size = options['batch_size']
-        
-        self.stdout.write('Updating thread vote counts and post counts...')
-        thread_count = Thread.objects.count()
-        
-        # Update threads in batches
-        for i in range(0, thread_count, batch_size):
-            with transaction.atomic():
-                threads = Thread.objects.all()[i:i+batch_size]
-                for thread in threads:
-                    thread.update_vote_count()
-                    thread.update_post_count()
-                    
-            self.stdout.write(f'Processed threads {i} to {min(i+batch_size, thread_count)}')
-        
-        self.stdout.write(self.style.SUCCESS(f'Successfully updated {thread_count} threads'))
-        
-        # Update posts
-        self.stdout.write('Updating post vote counts...')
-        post_count = Post.objects.count()
-        
-        for i in range(0, post_count, batch_size):
-            with transaction.atomic():
-                posts = Post.objects.all()[i:i+batch_size]
-                for post in posts:
-                    post.update_vote_count()
-                    
-            self.stdout.write(f'Processed posts {i} to {min(i+batch_size, post_count)}')
-        
-        self.stdout.write(self.style.SUCCESS(f'Successfully updated {post_count} posts'))
\ No newline at end of file
+        batch_size = max(1, options['batch_size'])
+        workers = max(1, options['workers'])
+        dry_run = options['dry_run']
+
+        for model in (Thread, Post):
+            name = model._meta.verbose_name_plural
+            bounds = model.objects.aggregate(low=Min('id'), high=Max('id'))
+            if bounds['low'] is None:
+                self.stdout.write(f'No {name} to update')
+                continue
+
+            # Keyset chunks over the primary key: every chunk is an index range
+            chunks = [
+                (low, min(low + batch_size, bounds['high']))
+                for low in range(bounds['low'] - 1, bounds['high'], batch_size)
+            ]
+            self.stdout.write(f'Recomputing counters of {name} in {len(chunks)} chunks...')
+            rows, drifted = self.run_chunks(model, chunks, workers, dry_run)
+
+            verb = 'Found' if dry_run else 'Repaired'
+            self.stdout.write(self.style.SUCCESS(
+                f'Checked {rows} {name}; {verb} {drifted} with drifted counters'
+            ))
+
+    def run_chunks(self, model, chunks, workers, dry_run):
+        started = time.monotonic()
+        rows = drifted = 0
+
+        def report(done, chunk_rows, chunk_drifted):
+            nonlocal rows, drifted
+            rows += chunk_rows
+            drifted += chunk_drifted
+            rate = rows / max(time.monotonic() - started, 1e-6)
+            self.stdout.write(
+                f'  chunk {done}/{len(chunks)}: {rows} rows, {drifted} drifted, {rate:.0f} rows/s'
+            )
+
+        if workers == 1:
+            for done, (low, high) in enumerate(chunks, 1):
+                report(done, *rebuild_chunk(model._meta.label, low, high, dry_run))
+            return rows, drifted
+
+        # Forked workers must not share the parent's database connection
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = [
+                pool.submit(rebuild_chunk, model._meta.label, low, high, dry_run)
+                for low, high in chunks
+            ]
+            for done, future in enumerate(as_completed(futures), 1):
+                report(done, *future.result())
+        return rows, drifted
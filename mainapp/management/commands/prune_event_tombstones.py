@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from mainapp.ics_feed import prune_tombstones
+
+
+class Command(BaseCommand):
+    help = 'Delete tombstones of deleted events older than CALENDAR_FEED_TOMBSTONE_DAYS (run daily)'
+
+    def handle(self, *args, **options):
+        rows = prune_tombstones()
+        self.stdout.write(self.style.SUCCESS(f'Pruned {rows} event tombstones'))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from mainapp.facets import rebuild_facet_counts
+
+
+class Command(BaseCommand):
+    help = 'Recount the cached thread counts per forum facet (after bulk imports or queryset updates of threads)'
+
+    def handle(self, *args, **options):
+        rows = rebuild_facet_counts()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} facet counters'))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from mainapp.unread import find_unread_drift, reconcile_unread_counts
+
+
+class Command(BaseCommand):
+    help = 'Repair unread counters of pinned threads that drifted from the posts written since the last view'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report drifted counters without repairing them'
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+
+        if dry_run:
+            drift = find_unread_drift()
+        else:
+            with transaction.atomic():
+                drift = reconcile_unread_counts()
+
+        for pk, cached, actual in drift:
+            self.stdout.write(f'PinnedThread {pk}: cached {cached}, actual {actual}')
+
+        verb = 'Found' if dry_run else 'Repaired'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {len(drift)} drifted unread counters'))
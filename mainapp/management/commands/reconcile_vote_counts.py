@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from mainapp.post import Thread, Post
+from mainapp.counters import find_vote_drift, reconcile_vote_counts
+
+
+class Command(BaseCommand):
+    help = 'Repair vote_count_cache values that drifted from the actual votes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report drifted counters without repairing them'
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+
+        for model in (Thread, Post):
+            name = model._meta.verbose_name_plural
+            if dry_run:
+                drift = find_vote_drift(model)
+            else:
+                with transaction.atomic():
+                    drift = reconcile_vote_counts(model)
+
+            for pk, cached, actual in drift:
+                self.stdout.write(f'{model.__name__} {pk}: cached {cached}, actual {actual}')
+
+            verb = 'Found' if dry_run else 'Repaired'
+            self.stdout.write(self.style.SUCCESS(f'{verb} {len(drift)} drifted {name}'))
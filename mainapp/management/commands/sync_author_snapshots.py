@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from mainapp.author_snapshots import get_sync_lag, request_full_sync, sync_author_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Sync the denormalized author snapshots of threads and posts with queued user changes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Queue every author first, e.g. to fill in snapshots of existing content'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Number of queued users read per batch'
+        )
+
+    def handle(self, *args, **options):
+        if options['all']:
+            queued = request_full_sync()
+            self.stdout.write(f'Queued {queued} authors')
+
+        self.stdout.write(f'Current sync lag: {get_sync_lag():.1f}s')
+        totals = sync_author_snapshots(batch_size=max(1, options['batch_size']))
+        self.stdout.write(self.style.SUCCESS(
+            f"Synced {totals['users']} authors, {totals['rows']} rows updated, "
+            f"max lag {totals['max_lag']:.1f}s"
+        ))
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.3 on 2026-10-17 06:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='thread',
+            index=models.Index(fields=['last_activity_date', 'id'], name='thread_activity_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='thread',
+            index=models.Index(fields=['vote_count_cache', 'id'], name='thread_votes_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='thread',
+            index=models.Index(fields=['post_count', 'id'], name='thread_posts_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='thread',
+            index=models.Index(fields=['created_date', 'id'], name='thread_created_keyset_idx'),
+        ),
+    ]
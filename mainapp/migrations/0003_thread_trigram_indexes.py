@@ -0,0 +1,27 @@
+# Trigram indexes serving the blacklist regex predicate on thread title and content
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0002_thread_keyset_indexes'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunSQL(
+            sql=[
+                'CREATE INDEX IF NOT EXISTS thread_title_trgm_idx '
+                'ON mainapp_thread USING gin (title gin_trgm_ops);',
+                'CREATE INDEX IF NOT EXISTS thread_content_trgm_idx '
+                'ON mainapp_thread USING gin (content gin_trgm_ops);',
+            ],
+            reverse_sql=[
+                'DROP INDEX IF EXISTS thread_content_trgm_idx;',
+                'DROP INDEX IF EXISTS thread_title_trgm_idx;',
+            ],
+        ),
+    ]
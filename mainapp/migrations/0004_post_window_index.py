@@ -0,0 +1,19 @@
+# Generated by Django 5.1.3 on 2026-10-17 06:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0003_thread_trigram_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['thread', 'date', 'id'], name='post_thread_window_idx'),
+        ),
+    ]
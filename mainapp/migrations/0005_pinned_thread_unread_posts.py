@@ -0,0 +1,32 @@
+# Generated by Django 5.1.3 on 2026-10-17 06:15
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_unread_posts(apps, schema_editor):
+    PinnedThread = apps.get_model('mainapp', 'PinnedThread')
+    Post = apps.get_model('mainapp', 'Post')
+    unread = Post.objects.filter(
+        thread_id=OuterRef('thread_id'), date__gt=OuterRef('last_viewed')
+    ).values('thread_id').annotate(total=Count('id')).values('total')
+    PinnedThread.objects.update(
+        unread_posts=Coalesce(Subquery(unread, output_field=IntegerField()), Value(0))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0004_post_window_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pinnedthread',
+            name='unread_posts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_unread_posts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.3 on 2026-10-17 06:18
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0005_pinned_thread_unread_posts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='thread',
+            name='hot_score',
+            field=models.FloatField(default=1.0),
+        ),
+        migrations.AddField(
+            model_name='thread',
+            name='hot_score_updated',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        # Seed existing threads from their votes and posts, decayed since
+        # their last activity with the default 24 hour half-life
+        migrations.RunSQL(
+            """
+            UPDATE mainapp_thread
+            SET hot_score = (1 + vote_count_cache + 0.5 * post_count)
+                    * POWER(0.5, LEAST(EXTRACT(EPOCH FROM (NOW() - last_activity_date)) / 86400.0, 1000)),
+                hot_score_updated = NOW()
+            """,
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='thread',
+            index=models.Index(fields=['hot_score', 'id'], name='thread_hot_keyset_idx'),
+        ),
+    ]
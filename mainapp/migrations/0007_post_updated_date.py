@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-17 06:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0006_thread_hot_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='updated_date',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.3 on 2026-10-17 06:25
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_facet_counts(apps, schema_editor):
+    Thread = apps.get_model('mainapp', 'Thread')
+    ThreadFacetCount = apps.get_model('mainapp', 'ThreadFacetCount')
+    counts = Thread.objects.order_by().values(
+        'category', 'visible_for_teachers', 'can_be_answered'
+    ).annotate(total=Count('id'))
+    ThreadFacetCount.objects.bulk_create([
+        ThreadFacetCount(
+            category=row['category'],
+            visible_for_teachers=row['visible_for_teachers'],
+            can_be_answered=row['can_be_answered'],
+            thread_count=row['total'],
+        )
+        for row in counts
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0007_post_updated_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ThreadFacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(max_length=63)),
+                ('visible_for_teachers', models.BooleanField()),
+                ('can_be_answered', models.BooleanField()),
+                ('thread_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('category', 'visible_for_teachers', 'can_be_answered'), name='unique_thread_facet')],
+            },
+        ),
+        migrations.RunPython(backfill_facet_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.3 on 2026-10-17 06:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0008_thread_facet_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailImportCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mailbox', models.CharField(max_length=255, unique=True)),
+                ('uidvalidity', models.BigIntegerField()),
+                ('last_uid', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.3 on 2026-10-17 06:28
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def backfill_content_hash(apps, schema_editor):
+    # Email imports are the anonymous threads; the digest matches
+    # Thread.fingerprint
+    Thread = apps.get_model('mainapp', 'Thread')
+    threads = Thread.objects.filter(is_anonymous=True).only('title', 'content', 'nickname')
+    batch = []
+    for thread in threads.iterator(chunk_size=2000):
+        thread.content_hash = hashlib.sha256(
+            '\x1f'.join((thread.title, thread.content, thread.nickname)).encode()
+        ).hexdigest()
+        batch.append(thread)
+        if len(batch) == 2000:
+            Thread.objects.bulk_update(batch, ['content_hash'])
+            batch = []
+    Thread.objects.bulk_update(batch, ['content_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0009_email_import_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='thread',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+        migrations.RunPython(backfill_content_hash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.3 on 2026-10-17 06:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('mainapp', '0010_thread_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorSnapshotSync',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('requested_at', models.DateTimeField()),
+                ('version', models.PositiveIntegerField(default=1)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='author_snapshot',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='thread',
+            name='author_snapshot',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.3 on 2026-10-17 06:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0011_author_snapshots'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['user', 'end_date', 'start_date'], name='event_user_window_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.3 on 2026-10-17 06:48
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0012_event_window_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletedEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.IntegerField()),
+                ('user_id', models.IntegerField()),
+                ('schedule_plan_id', models.IntegerField(null=True)),
+                ('start_date', models.DateTimeField()),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['user', 'updated_at'], name='event_user_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deletedevent',
+            index=models.Index(fields=['user_id', 'deleted_at'], name='deletedevent_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deletedevent',
+            index=models.Index(fields=['schedule_plan_id', 'deleted_at'], name='deletedevent_plan_idx'),
+        ),
+    ]
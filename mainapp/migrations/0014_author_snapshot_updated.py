@@ -0,0 +1,23 @@
+# Generated by Django 5.1.3 on 2026-10-17 07:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0013_calendar_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='author_snapshot_updated',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='thread',
+            name='author_snapshot_updated',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.3 on 2026-10-17 07:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('mainapp', '0014_author_snapshot_updated'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarFeedKey',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('version', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
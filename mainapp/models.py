@@ -110,15 +110,48 @@ class Event(models.Model):
     )
     room = models.CharField(max_length=50, null=True)
     teacher = models.CharField(max_length=100, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
-    def save(self, *args, **kwargs):
+    class Meta:
+        indexes = [
+            # Calendar windows are range scans over a user's events
+            models.Index(fields=['user', 'end_date', 'start_date'], name='event_user_window_idx'),
+            # Incremental calendar feeds read what changed since a sync token
+            models.Index(fields=['user', 'updated_at'], name='event_user_updated_idx'),
+        ]
+
+    def prepare(self):
+        """Set the category color and check the dates; bulk writes call this instead of save()."""
         self.color = CATEGORY_COLORS.get(self.category, '#808080')
         if self.start_date >= self.end_date:
             raise ValueError("Data rozpoczęcia musi być wcześniejsza niż zakończenia")
+
+    def save(self, *args, **kwargs):
+        self.prepare()
         super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.title} ({self.start_date:%Y-%m-%d})"
 
+class DeletedEvent(models.Model):
+    """Tombstone of a deleted event, kept for incremental calendar feeds."""
+    event_id = models.IntegerField()
+    # Plain ids: tombstones outlive their users and plans
+    user_id = models.IntegerField()
+    schedule_plan_id = models.IntegerField(null=True)
+    start_date = models.DateTimeField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user_id', 'deleted_at'], name='deletedevent_user_idx'),
+            models.Index(fields=['schedule_plan_id', 'deleted_at'], name='deletedevent_plan_idx'),
+        ]
+
+class CalendarFeedKey(models.Model):
+    """Version of a user's calendar feed token; bumping it revokes the issued tokens."""
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True)
+    version = models.PositiveIntegerField(default=0)
+
 # Import models from post.py to make them available for migrations
-from .post import Thread, Post, Vote, PinnedThread
\ No newline at end of file
+from .post import Thread, Post, Vote, PinnedThread, ThreadFacetCount, EmailImportCheckpoint, AuthorSnapshotSync
\ No newline at end of file
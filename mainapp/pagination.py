@@ -0,0 +1,273 @@
+import base64
+import json
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class ThreadKeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination for thread lists.
+
+    Pages are addressed by the (sort value, id) pair of the last row of the
+    previous page instead of an OFFSET, so every page costs one index range
+    scan no matter how deep the client scrolls. No total count is computed.
+
+    Rows inserted or deleted while scrolling do not shift the following
+    pages. A thread whose sort value changes between two requests moves
+    to its new position, though: it is skipped if it moves behind the
+    cursor and shown again if it moves ahead of it. Only ``created`` never
+    changes. ``activity``, ``votes`` and ``posts`` change for the threads
+    that receive posts or votes. ``hot`` changes for every thread on each
+    decay sweep, so hot lists are paged by offset instead.
+
+    Accepts the same ``ordering`` values as ``ThreadFilter`` for the fields
+    backed by a composite (field, id) index.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 10
+    max_page_size = 100
+    default_ordering = '-activity'
+
+    # ThreadFilter ordering name -> (model field, cursor value parser)
+    orderings = {
+        'created': ('created_date', parse_datetime),
+        'activity': ('last_activity_date', parse_datetime),
+        'votes': ('vote_count_cache', int),
+        'posts': ('post_count', int),
+    }
+    # Orderings whose sort keys change between requests; served by offset
+    offset_orderings = {'hot'}
+
+    @classmethod
+    def supports(cls, request):
+        """Whether the requested ordering is paged by keyset rather than offset."""
+        ordering = request.query_params.get('ordering') or cls.default_ordering
+        return ordering.lstrip('-') not in cls.offset_orderings
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_ordering(self, request):
+        ordering = request.query_params.get('ordering') or self.default_ordering
+        descending = ordering.startswith('-')
+        name = ordering.lstrip('-')
+        if name not in self.orderings:
+            raise ValidationError({
+                'ordering': f"Cursor pagination supports ordering by: {', '.join(self.orderings)}"
+            })
+        return ordering, self.orderings[name], descending
+
+    def encode_cursor(self, ordering, value, pk):
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        payload = json.dumps({'o': ordering, 'v': value, 'id': pk}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, cursor, ordering, parse):
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+            if payload['o'] != ordering:
+                raise ValueError
+            value = parse(payload['v'])
+            pk = int(payload['id'])
+        except (TypeError, ValueError, KeyError, json.JSONDecodeError):
+            raise ValidationError({self.cursor_query_param: 'Invalid cursor'})
+        if value is None:
+            raise ValidationError({self.cursor_query_param: 'Invalid cursor'})
+        return value, pk
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        ordering, (field, parse), descending = self.get_ordering(request)
+        self.ordering = ordering
+        self.field = field
+
+        sign = '-' if descending else ''
+        queryset = queryset.order_by(f'{sign}{field}', f'{sign}id')
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            value, pk = self.decode_cursor(cursor, ordering, parse)
+            # The inclusive bound on the sort field lets the (field, id) index
+            # serve the range; the OR only breaks ties on the boundary value.
+            if descending:
+                queryset = queryset.filter(
+                    Q(**{f'{field}__lte': value}),
+                    Q(**{f'{field}__lt': value}) | Q(id__lt=pk),
+                )
+            else:
+                queryset = queryset.filter(
+                    Q(**{f'{field}__gte': value}),
+                    Q(**{f'{field}__gt': value}) | Q(id__gt=pk),
+                )
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        cursor = self.encode_cursor(self.ordering, getattr(last, self.field), last.id)
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, 'page')
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class PostWindowPagination:
+    """
+    Windowed loading of the posts of a single thread.
+
+    Posts are ordered by (date, id) and a window is selected by one of:
+
+    - ``posts_limit`` alone: the first posts of the thread
+    - ``posts_cursor``: the posts after or before an earlier window
+    - ``around=<post id>``: the posts surrounding a given post
+    - ``since=<ISO timestamp>``: the posts written after a moment
+
+    Every window is read with range scans on the (thread, date, id) index,
+    so the cost of opening a thread is bounded by ``posts_limit`` and not by
+    the size of the thread.
+    """
+    cursor_query_param = 'posts_cursor'
+    page_size_query_param = 'posts_limit'
+    around_query_param = 'around'
+    since_query_param = 'since'
+    page_size = 50
+    max_page_size = 200
+
+    def is_requested(self, request):
+        params = request.query_params
+        return any(param in params for param in (
+            self.cursor_query_param, self.page_size_query_param,
+            self.around_query_param, self.since_query_param,
+        ))
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def encode_cursor(self, post, direction):
+        payload = json.dumps(
+            {'d': post.date.isoformat(), 'id': post.id, 'dir': direction}, separators=(',', ':')
+        )
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+            date = parse_datetime(payload['d'])
+            pk = int(payload['id'])
+            direction = payload['dir']
+        except (TypeError, ValueError, KeyError, json.JSONDecodeError):
+            raise ValidationError({self.cursor_query_param: 'Invalid cursor'})
+        if date is None or direction not in ('next', 'prev'):
+            raise ValidationError({self.cursor_query_param: 'Invalid cursor'})
+        return date, pk, direction
+
+    @staticmethod
+    def _after(queryset, date, pk, inclusive=False):
+        tie = Q(id__gte=pk) if inclusive else Q(id__gt=pk)
+        return queryset.filter(Q(date__gte=date), Q(date__gt=date) | tie).order_by('date', 'id')
+
+    @staticmethod
+    def _before(queryset, date, pk):
+        return queryset.filter(Q(date__lte=date), Q(date__lt=date) | Q(id__lt=pk)).order_by('-date', '-id')
+
+    def paginate_queryset(self, queryset, request):
+        """Return the requested window of ``queryset`` in (date, id) order."""
+        self.request = request
+        size = self.get_page_size(request)
+        params = request.query_params
+
+        if params.get(self.cursor_query_param):
+            date, pk, direction = self.decode_cursor(params[self.cursor_query_param])
+            if direction == 'next':
+                rows = list(self._after(queryset, date, pk)[:size + 1])
+                self.has_previous, self.has_next = True, len(rows) > size
+                self.page = rows[:size]
+            else:
+                rows = list(self._before(queryset, date, pk)[:size + 1])
+                self.has_previous, self.has_next = len(rows) > size, True
+                self.page = rows[:size][::-1]
+
+        elif params.get(self.around_query_param):
+            try:
+                anchor_id = int(params[self.around_query_param])
+            except ValueError:
+                anchor_id = None
+            anchor_date = queryset.filter(id=anchor_id).values_list('date', flat=True).first()
+            if anchor_date is None:
+                raise ValidationError({self.around_query_param: 'Post not found in this thread'})
+            before_size = size // 2
+            before = list(self._before(queryset, anchor_date, anchor_id)[:before_size + 1])
+            after = list(self._after(queryset, anchor_date, anchor_id, inclusive=True)[:size - before_size + 1])
+            self.has_previous = len(before) > before_size
+            self.has_next = len(after) > size - before_size
+            self.page = before[:before_size][::-1] + after[:size - before_size]
+
+        elif params.get(self.since_query_param):
+            since = parse_datetime(params[self.since_query_param])
+            if since is None:
+                raise ValidationError({self.since_query_param: 'Expected an ISO 8601 timestamp'})
+            if timezone.is_naive(since):
+                # Timestamps without an offset are read in the server's time zone
+                since = timezone.make_aware(since)
+            rows = list(queryset.filter(date__gt=since).order_by('date', 'id')[:size + 1])
+            self.has_next = len(rows) > size
+            self.page = rows[:size]
+            self.has_previous = queryset.filter(date__lte=since).exists()
+
+        else:
+            rows = list(queryset.order_by('date', 'id')[:size + 1])
+            self.has_previous, self.has_next = False, len(rows) > size
+            self.page = rows[:size]
+
+        return self.page
+
+    def _link(self, post, direction):
+        url = self.request.build_absolute_uri()
+        for param in (self.around_query_param, self.since_query_param):
+            url = remove_query_param(url, param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(post, direction))
+
+    def get_window_links(self):
+        """Links to the adjacent windows, or None at either end of the thread."""
+        if not self.page:
+            return {'next': None, 'previous': None}
+        return {
+            'next': self._link(self.page[-1], 'next') if self.has_next else None,
+            'previous': self._link(self.page[0], 'prev') if self.has_previous else None,
+        }
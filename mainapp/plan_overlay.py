@@ -0,0 +1,89 @@
+"""
+Overlay of applied schedule plans on a user's calendar.
+
+Applying a plan (``AppliedPlan``) does not copy its events into the
+subscriber's calendar. ``get_calendar_occurrences`` reads the user's active
+applications with one query and merges the occurrences of their plans,
+clipped to the ``start_date``/``end_date`` of each application, with the
+user's own events.
+
+The events of a plan are cached once per plan revision, shared by all its
+subscribers, and loaded with one query for all plans missing from the
+cache. Saving or deleting an event of a plan starts a new revision.
+"""
+from datetime import datetime, time, timedelta
+from django.core.cache import cache
+from django.utils import timezone
+from analytics.cache_service import CacheService
+from .models import AppliedPlan, Event
+from .recurrence import expand_events, get_user_occurrences
+
+PREFIX_PLAN = 'schedule_plan'
+
+
+def plan_revision_key(plan_id):
+    return CacheService.make_key(PREFIX_PLAN, plan_id, 'revision')
+
+
+def invalidate_plan_events(plan_id):
+    """Start a new revision of the plan's cached events."""
+    if plan_id is not None:
+        cache.set(plan_revision_key(plan_id), timezone.now().timestamp(), None)
+
+
+def get_plan_events(plan_ids, serialize):
+    """Return {plan id: [(event, serialized event)]}, loading the uncached plans in one query."""
+    revisions = cache.get_many([plan_revision_key(plan_id) for plan_id in plan_ids])
+    keys = {}
+    for plan_id in plan_ids:
+        revision = revisions.get(plan_revision_key(plan_id))
+        if revision is None:
+            revision = timezone.now().timestamp()
+            cache.add(plan_revision_key(plan_id), revision, None)
+        keys[CacheService.make_key(PREFIX_PLAN, plan_id, 'events', revision)] = plan_id
+
+    plans = {keys[key]: events for key, events in cache.get_many(list(keys)).items()}
+    missing = set(plan_ids) - set(plans)
+    if missing:
+        loaded = {plan_id: [] for plan_id in missing}
+        for event in Event.objects.filter(schedule_plan_id__in=missing).order_by('start_date', 'id'):
+            loaded[event.schedule_plan_id].append((event, serialize(event)))
+        cache.set_many(
+            {key: loaded[plan_id] for key, plan_id in keys.items() if plan_id in loaded}, CacheService.TIMEOUT_DAY
+        )
+        plans.update(loaded)
+    return plans
+
+
+def application_bounds(application):
+    """Datetime range covered by an application; its end date is inclusive."""
+    since = timezone.make_aware(datetime.combine(application.start_date, time.min))
+    until = timezone.make_aware(datetime.combine(application.end_date + timedelta(days=1), time.min))
+    return since, until
+
+
+def get_calendar_occurrences(user, window_start, window_end, serialize):
+    """Occurrences of the user's own events and of their applied plans in the window."""
+    applications = list(AppliedPlan.objects.filter(
+        user=user,
+        is_active=True,
+        plan__is_active=True,
+        start_date__lt=timezone.localtime(window_end).date() + timedelta(days=1),
+        end_date__gte=timezone.localtime(window_start).date(),
+    ).only('plan_id', 'start_date', 'end_date'))
+
+    occurrences = list(get_user_occurrences(user, window_start, window_end, serialize))
+    if not applications:
+        return occurrences
+
+    plan_events = get_plan_events(sorted({application.plan_id for application in applications}), serialize)
+    for application in applications:
+        since, until = application_bounds(application)
+        events = plan_events.get(application.plan_id, [])
+        data = {event.id: item for event, item in events}
+        occurrences += expand_events(
+            [event for event, item in events], window_start, window_end,
+            lambda event: data[event.id], since=since, until=until,
+        )
+    occurrences.sort(key=lambda occurrence: (occurrence['start_date'], occurrence['id']))
+    return occurrences
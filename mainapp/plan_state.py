@@ -0,0 +1,128 @@
+"""
+Per-request state of listed schedule plans.
+
+``PlanStateResolver`` answers ``is_applied`` for every listed plan with one
+``AppliedPlan`` query and builds event summaries (counts and the next
+occurrence) from the plan events cached per plan revision (see
+``mainapp.plan_overlay``), so listing plans costs the same number of
+queries for 2 or 200 plans.
+"""
+from django.utils import timezone
+from rest_framework import serializers
+from .plan_overlay import get_plan_events
+from .recurrence import MAX_WINDOW, Recurrence
+from .serializers import EventSerializer
+from .models import AppliedPlan, SchedulePlan
+
+# ?events= values of the plan endpoints
+EVENTS_FULL = 'full'
+EVENTS_SUMMARY = 'summary'
+
+_datetime_field = serializers.DateTimeField()
+
+
+class PlanStateResolver:
+    """
+    Resolve applied state and event summaries of many plans.
+
+    Plans are registered with ``add`` before serialization; the first
+    lookup loads the state of every registered plan at once. Serializers
+    read from the resolver through ``context['plan_state']``. Plans that
+    were never registered are loaded on their own.
+    """
+
+    def __init__(self, user):
+        self.user_id = user.id if user and user.is_authenticated else None
+        self._plan_ids = set()
+        self._applied = None
+        self._summaries = {}
+
+    def add(self, objects):
+        """Register a SchedulePlan or an iterable of them."""
+        if isinstance(objects, SchedulePlan):
+            objects = [objects]
+        self._plan_ids.update(plan.id for plan in objects)
+        self._applied = None
+
+    def _register(self, plan):
+        if plan.id not in self._plan_ids:
+            self.add(plan)
+
+    def is_applied(self, plan):
+        if self.user_id is None:
+            return False
+        self._register(plan)
+        if self._applied is None:
+            self._applied = set(AppliedPlan.objects.filter(
+                user_id=self.user_id, plan_id__in=self._plan_ids
+            ).values_list('plan_id', flat=True))
+        return plan.id in self._applied
+
+    def events_summary(self, plan):
+        """``{'count', 'recurring_count', 'next_occurrence'}`` of the plan's events."""
+        self._register(plan)
+        if plan.id not in self._summaries:
+            pending = sorted(self._plan_ids - set(self._summaries))
+            now = timezone.now()
+            for plan_id, events in get_plan_events(pending, EventSerializer().to_representation).items():
+                self._summaries[plan_id] = self._summarize(events, now)
+        return self._summaries[plan.id]
+
+    @staticmethod
+    def _summarize(events, now):
+        upcoming = None
+        for event, data in events:
+            first = next(Recurrence.from_event(event).between(now, now + MAX_WINDOW), None)
+            if first is not None and (upcoming is None or first[0] < upcoming[0]):
+                upcoming = (first[0], first[1], data)
+        next_occurrence = None
+        if upcoming is not None:
+            start, end, data = upcoming
+            next_occurrence = {
+                'id': data['id'],
+                'title': data['title'],
+                'start_date': _datetime_field.to_representation(start),
+                'end_date': _datetime_field.to_representation(end),
+            }
+        return {
+            'count': len(events),
+            'recurring_count': sum(1 for event, data in events if event.repeat_type != 'none'),
+            'next_occurrence': next_occurrence,
+        }
+
+
+class PlanStateMixin:
+    """
+    Provide a per-request ``PlanStateResolver`` to plan serializers.
+
+    Every instance passed to ``get_serializer`` is registered with the
+    resolver. ``?events=summary`` replaces the nested events of each plan
+    with ``events_summary``; the full event lists are prefetched otherwise.
+    """
+
+    def get_events_mode(self):
+        if self.request.query_params.get('events') == EVENTS_SUMMARY:
+            return EVENTS_SUMMARY
+        return EVENTS_FULL
+
+    def get_plan_state(self):
+        if not hasattr(self, '_plan_state'):
+            self._plan_state = PlanStateResolver(self.request.user)
+        return self._plan_state
+
+    def get_queryset(self):
+        queryset = super().get_queryset().select_related('administrator')
+        if self.get_events_mode() == EVENTS_FULL:
+            queryset = queryset.prefetch_related('event_set')
+        return queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['plan_state'] = self.get_plan_state()
+        context['plan_events'] = self.get_events_mode()
+        return context
+
+    def get_serializer(self, *args, **kwargs):
+        if args and args[0] is not None:
+            self.get_plan_state().add(args[0])
+        return super().get_serializer(*args, **kwargs)
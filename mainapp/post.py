@@ -1,8 +1,10 @@
-from django.db import models
+import hashlib
+from django.db import models, transaction
 from django.conf import settings
 from django.utils import timezone
 from django.db.models import Count, Q
 from rest_framework import serializers
+from .author_cards import get_author_card_resolver
 
 class Post(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, 
@@ -10,6 +12,7 @@ class Post(models.Model):
     nickname = models.CharField(max_length=63, default="Anonymous User")
     content = models.TextField()
     date = models.DateTimeField(auto_now_add=True)
+    updated_date = models.DateTimeField(auto_now=True)
     was_edited = models.BooleanField(default=False)
     thread = models.ForeignKey('Thread', on_delete=models.CASCADE,
                                related_name='posts', null=True, blank=True)
@@ -20,6 +23,11 @@ class Post(models.Model):
     # Cached vote count for efficient sorting
     vote_count_cache = models.IntegerField(default=0, db_index=True)
     
+    # Author card of the user, kept in sync by mainapp.author_snapshots
+    author_snapshot = models.JSONField(null=True, blank=True, editable=False)
+    # Time of the last snapshot rewrite; part of the conditional GET validators
+    author_snapshot_updated = models.DateTimeField(null=True, blank=True, editable=False)
+    
     def vote_count(self):
         """Return cached vote count"""
         return self.vote_count_cache
@@ -40,6 +48,13 @@ class Post(models.Model):
             return vote.vote_type
         except Vote.DoesNotExist:
             return None
+
+    class Meta:
+        # Backs windowed loading of a thread's posts by (date, id) cursors
+        indexes = [
+            models.Index(fields=['thread', 'date', 'id'], name='post_thread_window_idx'),
+        ]
+
 class PostSerializer(serializers.ModelSerializer):
     replies = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
     replying_to = serializers.PrimaryKeyRelatedField(many=True,
@@ -53,59 +68,39 @@ class PostSerializer(serializers.ModelSerializer):
     author_profile_thumbnail = serializers.SerializerMethodField()
     
     def get_user_display_name(self, obj):
-        if obj.is_anonymous:
-            return obj.nickname
-        elif obj.user:
-            if obj.user.role == 'student':
-                return f"{obj.user.first_name} {obj.user.last_name} {obj.user.login}"
-            else:
-                return f"{obj.user.first_name} {obj.user.last_name}"
-        else:
-            return obj.nickname
+        card = get_author_card_resolver(self.context).card(obj, 'user')
+        return card['display_name'] if card else obj.nickname
     
     def get_vote_count(self, obj):
+        vote_state = self.context.get('vote_state')
+        if vote_state is not None:
+            return vote_state.vote_count(obj)
         return obj.vote_count()
     
     def get_user_vote(self, obj):
+        vote_state = self.context.get('vote_state')
+        if vote_state is not None:
+            return vote_state.user_vote(obj)
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return obj.get_user_vote(request.user)
         return None
     
     def get_can_vote(self, obj):
+        vote_state = self.context.get('vote_state')
+        if vote_state is not None:
+            return vote_state.can_vote(obj)
         request = self.context.get('request')
         if not request or not request.user.is_authenticated:
             return False
         # User cannot vote on their own posts (even anonymous ones)
-        return obj.user != request.user
+        return obj.user_id != request.user.id
     
     def get_author_profile_picture(self, obj):
-        if obj.is_anonymous or not obj.user:
-            return None
-        if obj.user.profile_picture:
-            request = self.context.get('request')
-            if request:
-                url = request.build_absolute_uri(obj.user.profile_picture.url)
-                # Ensure it uses the correct protocol and host
-                if 'localhost:8000' not in url:
-                    url = url.replace(request.get_host(), 'localhost:8000')
-                return url
-            return f'http://localhost:8000{obj.user.profile_picture.url}'
-        return None
+        return get_author_card_resolver(self.context).avatar_url(obj, 'user', 'picture')
     
     def get_author_profile_thumbnail(self, obj):
-        if obj.is_anonymous or not obj.user:
-            return None
-        if obj.user.profile_thumbnail:
-            request = self.context.get('request')
-            if request:
-                url = request.build_absolute_uri(obj.user.profile_thumbnail.url)
-                # Ensure it uses the correct protocol and host
-                if 'localhost:8000' not in url:
-                    url = url.replace(request.get_host(), 'localhost:8000')
-                return url
-            return f'http://localhost:8000{obj.user.profile_thumbnail.url}'
-        return None
+        return get_author_card_resolver(self.context).avatar_url(obj, 'user', 'thumbnail')
             
     class Meta:
         model = Post
@@ -114,6 +109,20 @@ class PostSerializer(serializers.ModelSerializer):
                   'vote_count', 'user_vote', 'can_vote', 'author_profile_picture', 
                   'author_profile_thumbnail']
 
+class ReplyTreePostSerializer(PostSerializer):
+    """
+    Post node of a thread's reply tree.
+
+    Carries no relation, vote or author fields, so serializing a whole
+    thread needs nothing beyond the posts. The reply edges and the author
+    cards are attached by ``mainapp.reply_tree``.
+    """
+    replies = None
+    replying_to = None
+
+    class Meta(PostSerializer.Meta):
+        fields = ['id', 'user', 'nickname', 'content', 'date', 'was_edited', 'is_anonymous']
+
 class Thread(models.Model):
     # Primary key (auto-generated)
     id = models.AutoField(primary_key=True)
@@ -141,6 +150,46 @@ class Thread(models.Model):
     vote_count_cache = models.IntegerField(default=0, db_index=True)
     post_count = models.IntegerField(default=0, db_index=True)
     
+    # Time-decayed trending score, maintained by mainapp.hotness
+    hot_score = models.FloatField(default=1.0)
+    hot_score_updated = models.DateTimeField(default=timezone.now)
+    
+    # Fingerprint of title, content and nickname of threads imported from
+    # email, used to skip emails that were already imported
+    content_hash = models.CharField(max_length=64, null=True, blank=True, db_index=True)
+    
+    # Author card of the author, kept in sync by mainapp.author_snapshots
+    author_snapshot = models.JSONField(null=True, blank=True, editable=False)
+    # Time of the last snapshot rewrite; part of the conditional GET validators
+    author_snapshot_updated = models.DateTimeField(null=True, blank=True, editable=False)
+    
+    FACET_FIELDS = ('category', 'visible_for_teachers', 'can_be_answered')
+    
+    # Facet values as stored in the database; the facet counter signals
+    # use them to move a changed or deleted thread out of its old facet
+    _stored_facet = None
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._stored_facet = instance.get_facet()
+        return instance
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._stored_facet = self.get_facet()
+    
+    def get_facet(self):
+        """(category, visible_for_teachers, can_be_answered), or None if any is deferred"""
+        if any(field not in self.__dict__ for field in self.FACET_FIELDS):
+            return None
+        return tuple(self.__dict__[field] for field in self.FACET_FIELDS)
+    
+    @staticmethod
+    def fingerprint(title, content, nickname):
+        """SHA-256 hex digest identifying a thread's title, content and nickname"""
+        return hashlib.sha256('\x1f'.join((title, content, nickname)).encode()).hexdigest()
+    
     def vote_count(self):
         """Return cached vote count"""
         return self.vote_count_cache
@@ -167,6 +216,17 @@ class Thread(models.Model):
         except Vote.DoesNotExist:
             return None
     
+    class Meta:
+        # Composite indexes backing keyset pagination; the id tie-breaker makes
+        # every (sort value, id) position unique.
+        indexes = [
+            models.Index(fields=['last_activity_date', 'id'], name='thread_activity_keyset_idx'),
+            models.Index(fields=['vote_count_cache', 'id'], name='thread_votes_keyset_idx'),
+            models.Index(fields=['post_count', 'id'], name='thread_posts_keyset_idx'),
+            models.Index(fields=['created_date', 'id'], name='thread_created_keyset_idx'),
+            models.Index(fields=['hot_score', 'id'], name='thread_hot_keyset_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.title} ({self.category})"
 
@@ -193,20 +253,31 @@ class Vote(models.Model):
         # Ensure vote is for either thread or post, not both
         # This will be enforced in the clean method
     
+    # Vote type as stored in the database; the counter signals use it to
+    # compute the delta of a change or deletion
+    _stored_vote_type = None
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._stored_vote_type = instance.__dict__.get('vote_type')
+        return instance
+    
     def clean(self):
         from django.core.exceptions import ValidationError
-        if (self.thread and self.post) or (not self.thread and not self.post):
+        if (self.thread_id and self.post_id) or (not self.thread_id and not self.post_id):
             raise ValidationError("Vote must be for either a thread or a post, not both or neither.")
         
         # Prevent users from voting on their own content
-        if self.thread and self.thread.author == self.user:
+        if self.thread_id and self.thread.author_id == self.user_id:
             raise ValidationError("Users cannot vote on their own threads.")
-        if self.post and self.post.user == self.user:
+        if self.post_id and self.post.user_id == self.user_id:
             raise ValidationError("Users cannot vote on their own posts.")
     
     def save(self, *args, **kwargs):
         self.clean()
         super().save(*args, **kwargs)
+        self._stored_vote_type = self.vote_type
     
     def __str__(self):
         target = self.thread.title if self.thread else f"Post {self.post.id}"
@@ -230,69 +301,74 @@ class ThreadSerializer(serializers.ModelSerializer):
     def get_author_display_name(self, obj):
         if obj.is_anonymous:
             return obj.nickname
-        elif obj.author:
-            if obj.author.role == 'student':
-                return f"{obj.author.first_name} {obj.author.last_name} {obj.author.login}"
-            else:
-                return f"{obj.author.first_name} {obj.author.last_name}"
+        card = get_author_card_resolver(self.context).card(obj, 'author')
+        if card:
+            return card['display_name']
         return obj.nickname or "Anonymous"
     
     def get_date(self, obj):
         return obj.created_date or obj.last_activity_date
     
     def get_user(self, obj):
-        return obj.author.id if obj.author else None
+        return obj.author_id
     
     def get_vote_count(self, obj):
+        vote_state = self.context.get('vote_state')
+        if vote_state is not None:
+            return vote_state.vote_count(obj)
         return obj.vote_count()
     
     def get_user_vote(self, obj):
+        vote_state = self.context.get('vote_state')
+        if vote_state is not None:
+            return vote_state.user_vote(obj)
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return obj.get_user_vote(request.user)
         return None
     
     def get_can_vote(self, obj):
+        vote_state = self.context.get('vote_state')
+        if vote_state is not None:
+            return vote_state.can_vote(obj)
         request = self.context.get('request')
         if not request or not request.user.is_authenticated:
             return False
         # User cannot vote on their own threads (even anonymous ones)
-        return obj.author != request.user
+        return obj.author_id != request.user.id
     
     def get_author_profile_picture(self, obj):
-        if obj.is_anonymous or not obj.author:
-            return None
-        if obj.author.profile_picture:
-            request = self.context.get('request')
-            if request:
-                url = request.build_absolute_uri(obj.author.profile_picture.url)
-                # Ensure it uses the correct protocol and host
-                if 'localhost:8000' not in url:
-                    url = url.replace(request.get_host(), 'localhost:8000')
-                return url
-            return f'http://localhost:8000{obj.author.profile_picture.url}'
-        return None
+        return get_author_card_resolver(self.context).avatar_url(obj, 'author', 'picture')
     
     def get_author_profile_thumbnail(self, obj):
-        if obj.is_anonymous or not obj.author:
-            return None
-        if obj.author.profile_thumbnail:
-            request = self.context.get('request')
-            if request:
-                url = request.build_absolute_uri(obj.author.profile_thumbnail.url)
-                # Ensure it uses the correct protocol and host
-                if 'localhost:8000' not in url:
-                    url = url.replace(request.get_host(), 'localhost:8000')
-                return url
-            return f'http://localhost:8000{obj.author.profile_thumbnail.url}'
-        return None
+        return get_author_card_resolver(self.context).avatar_url(obj, 'author', 'thumbnail')
             
     class Meta:
         model = Thread
         fields = [
             'id', 'category', 'title', 'content', 'nickname', 'date',
             'visible_for_teachers', 'can_be_answered', 'last_activity_date',
-            'posts', 'is_anonymous', 'user', 'author_display_name',
+            'posts', 'post_count', 'is_anonymous', 'user', 'author_display_name',
+            'vote_count', 'user_vote', 'can_vote', 'author_profile_picture',
+            'author_profile_thumbnail'
+        ]
+        read_only_fields = ['post_count']
+
+class ThreadSummarySerializer(ThreadSerializer):
+    """
+    Compact thread representation for list views.
+
+    Carries no nested posts; the number of replies is exposed through
+    ``post_count``. Expects ``vote_state`` and ``author_cards`` resolvers in
+    the context, so that a page is served by a fixed number of queries.
+    """
+    posts = None
+
+    class Meta(ThreadSerializer.Meta):
+        fields = [
+            'id', 'category', 'title', 'content', 'nickname', 'date',
+            'visible_for_teachers', 'can_be_answered', 'last_activity_date',
+            'post_count', 'is_anonymous', 'user', 'author_display_name',
             'vote_count', 'user_vote', 'can_vote', 'author_profile_picture',
             'author_profile_thumbnail'
         ]
@@ -428,78 +504,65 @@ class VoteSerializer(serializers.ModelSerializer):
         fields = ['id', 'vote_type', 'created_date', 'thread', 'post']
         read_only_fields = ['id', 'created_date']
 
+def _cast_vote(user, target, vote_type, **lookup):
+    """
+    Apply a vote transition on a thread or post inside one transaction.
+
+    The Vote signals add the resulting delta to ``vote_count_cache`` with a
+    single atomic UPDATE, so no recount is needed. Returns (message, current_user_vote).
+    """
+    with transaction.atomic():
+        existing_vote = Vote.objects.select_for_update().filter(user=user, **lookup).first()
+
+        if existing_vote is None:
+            # Create new vote
+            Vote.objects.create(user=user, vote_type=vote_type, **lookup)
+            return f"Voted {vote_type}", vote_type
+
+        if existing_vote.vote_type == vote_type:
+            # Same vote - withdraw it
+            existing_vote.delete()
+            return "Vote withdrawn", None
+
+        # Different vote - change it
+        existing_vote.vote_type = vote_type
+        existing_vote.save(update_fields=['vote_type'])
+        return f"Vote changed to {vote_type}", vote_type
+
 def vote_on_thread(user, thread_id, vote_type):
     """
     Vote on a thread. Returns (success, message, vote_count, current_user_vote)
     """
     try:
         thread = Thread.objects.get(id=thread_id)
-        
-        # Check if user can vote (not their own thread)
-        if thread.author == user:
-            return False, "You cannot vote on your own thread", thread.vote_count(), None
-        
-        # Check if vote already exists
-        try:
-            existing_vote = Vote.objects.get(user=user, thread=thread)
-            
-            if existing_vote.vote_type == vote_type:
-                # Same vote - withdraw it
-                existing_vote.delete()
-                thread.update_vote_count()
-                return True, "Vote withdrawn", thread.vote_count(), None
-            else:
-                # Different vote - change it
-                existing_vote.vote_type = vote_type
-                existing_vote.save()
-                thread.update_vote_count()
-                return True, f"Vote changed to {vote_type}", thread.vote_count(), vote_type
-                
-        except Vote.DoesNotExist:
-            # Create new vote
-            Vote.objects.create(user=user, thread=thread, vote_type=vote_type)
-            thread.update_vote_count()
-            return True, f"Voted {vote_type}", thread.vote_count(), vote_type
-            
     except Thread.DoesNotExist:
         return False, "Thread not found", 0, None
 
+    # Check if user can vote (not their own thread)
+    if thread.author_id == user.id:
+        return False, "You cannot vote on your own thread", thread.vote_count(), None
+
+    message, current_user_vote = _cast_vote(user, thread, vote_type, thread=thread)
+    thread.refresh_from_db(fields=['vote_count_cache'])
+    return True, message, thread.vote_count(), current_user_vote
+
 def vote_on_post(user, post_id, vote_type):
     """
     Vote on a post. Returns (success, message, vote_count, current_user_vote)
     """
     try:
         post = Post.objects.get(id=post_id)
-        
-        # Check if user can vote (not their own post)
-        if post.user == user:
-            return False, "You cannot vote on your own post", post.vote_count(), None
-        
-        # Check if vote already exists
-        try:
-            existing_vote = Vote.objects.get(user=user, post=post)
-            
-            if existing_vote.vote_type == vote_type:
-                # Same vote - withdraw it
-                existing_vote.delete()
-                post.update_vote_count()
-                return True, "Vote withdrawn", post.vote_count(), None
-            else:
-                # Different vote - change it
-                existing_vote.vote_type = vote_type
-                existing_vote.save()
-                post.update_vote_count()
-                return True, f"Vote changed to {vote_type}", post.vote_count(), vote_type
-                
-        except Vote.DoesNotExist:
-            # Create new vote
-            Vote.objects.create(user=user, post=post, vote_type=vote_type)
-            post.update_vote_count()
-            return True, f"Voted {vote_type}", post.vote_count(), vote_type
-            
     except Post.DoesNotExist:
         return False, "Post not found", 0, None
 
+    # Check if user can vote (not their own post)
+    if post.user_id == user.id:
+        return False, "You cannot vote on your own post", post.vote_count(), None
+
+    message, current_user_vote = _cast_vote(user, post, vote_type, post=post)
+    post.refresh_from_db(fields=['vote_count_cache'])
+    return True, message, post.vote_count(), current_user_vote
+
 
 class PinnedThread(models.Model):
     """Model to track threads pinned by users with last viewed timestamp."""
@@ -516,23 +579,66 @@ class PinnedThread(models.Model):
     )
     pinned_at = models.DateTimeField(auto_now_add=True)
     last_viewed = models.DateTimeField(default=timezone.now)
+    # Posts added since last_viewed, maintained by mainapp.unread
+    unread_posts = models.PositiveIntegerField(default=0)
     
     class Meta:
         unique_together = ('user', 'thread')
         ordering = ['-pinned_at']
     
-    def get_unread_count(self):
-        """Calculate number of unread comments since last viewed."""
-        return Post.objects.filter(
-            thread=self.thread,
-            date__gt=self.last_viewed
-        ).count()
-    
     def mark_as_viewed(self):
-        """Update last_viewed timestamp to current time."""
+        """Update last_viewed timestamp to current time and reset the unread counter."""
         self.last_viewed = timezone.now()
-        self.save(update_fields=['last_viewed'])
+        self.unread_posts = 0
+        self.save(update_fields=['last_viewed', 'unread_posts'])
     
     def __str__(self):
         return f"{self.user.username} pinned {self.thread.title}"
 
+class ThreadFacetCount(models.Model):
+    """Number of threads per facet combination, maintained by mainapp.facets."""
+    
+    category = models.CharField(max_length=63)
+    visible_for_teachers = models.BooleanField()
+    can_be_answered = models.BooleanField()
+    thread_count = models.IntegerField(default=0)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['category', 'visible_for_teachers', 'can_be_answered'],
+                name='unique_thread_facet',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.category} ({self.thread_count})"
+
+class EmailImportCheckpoint(models.Model):
+    """Highest imported message UID of a mailbox, maintained by mainapp.email_import."""
+    
+    mailbox = models.CharField(max_length=255, unique=True)
+    # UIDs are only comparable while the mailbox UIDVALIDITY stays the same
+    uidvalidity = models.BigIntegerField()
+    last_uid = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.mailbox} up to UID {self.last_uid}"
+
+class AuthorSnapshotSync(models.Model):
+    """A user whose author snapshots are waiting to be synced by mainapp.author_snapshots."""
+    
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True)
+    # Earliest change not synced yet; the sync lag is measured from it
+    requested_at = models.DateTimeField()
+    # Bumped on every further change, so a sync that raced with one keeps the request
+    version = models.PositiveIntegerField(default=1)
+    
+    def __str__(self):
+        return f"Author snapshot sync of user {self.user_id}"
+
+def pinned_threads_with_unread_counts(user):
+    """Return the user's pins with their threads and maintained unread counters."""
+    return PinnedThread.objects.filter(user=user).select_related('thread')
+
@@ -0,0 +1,218 @@
+"""
+Expansion of recurring calendar events.
+
+An ``Event`` is stored once with its first occurrence and its
+``repeat_type``; its further occurrences are computed on demand for the
+requested window instead of being stored as rows:
+
+- ``weekly`` events repeat every 7 days at the same local time.
+- ``monthly`` events repeat on the same weekday of the same week of the
+  month (e.g. the second Tuesday); months without that weekday are skipped.
+
+``Recurrence.between`` jumps straight to the first occurrence of a window,
+so a semester of weekly classes costs the handful of occurrences that are
+shown, not one row per week per student. ``events_in_window`` selects the
+stored events that can reach a window with range predicates on
+``start_date`` and ``end_date``, and ``get_user_occurrences`` memoizes the
+expansion of a user's calendar per window until one of their events changes.
+"""
+import calendar
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework import serializers
+from analytics.cache_service import CacheService
+
+WEEK = timedelta(days=7)
+# Widest window a single request may expand
+MAX_WINDOW = timedelta(days=400)
+
+
+class Recurrence:
+    """Recurrence rule of an event: first occurrence, duration and frequency."""
+
+    def __init__(self, start, end, repeat_type='none', since=None, until=None):
+        self.start = start
+        self.duration = end - start
+        self.repeat_type = repeat_type
+        # Optional bounds of the series itself, e.g. the term of an applied plan
+        self.since = since
+        self.until = until
+
+    @classmethod
+    def from_event(cls, event, **bounds):
+        return cls(event.start_date, event.end_date, event.repeat_type, **bounds)
+
+    def between(self, window_start, window_end):
+        """Yield (start, end) of the occurrences overlapping [window_start, window_end)."""
+        if self.since is not None:
+            window_start = max(window_start, self.since)
+        if self.until is not None:
+            window_end = min(window_end, self.until)
+        for start in self._starts(window_start - self.duration):
+            if start >= window_end:
+                return
+            if start + self.duration > window_start:
+                yield start, start + self.duration
+
+    def _starts(self, after):
+        """Occurrence starts in ascending order, beginning close before ``after``."""
+        if self.repeat_type == 'weekly':
+            yield from self._weekly_starts(after)
+        elif self.repeat_type == 'monthly':
+            yield from self._monthly_starts(after)
+        else:
+            yield self.start
+
+    def _weekly_starts(self, after):
+        # Occurrences keep their local wall-clock time across DST changes
+        first = timezone.localtime(self.start).replace(tzinfo=None)
+        index = max(0, (after - self.start) // WEEK - 1)
+        while True:
+            yield timezone.make_aware(first + index * WEEK)
+            index += 1
+
+    def _monthly_starts(self, after):
+        first = timezone.localtime(self.start).replace(tzinfo=None)
+        nth = (first.day - 1) // 7
+        weekday = first.weekday()
+        after_local = timezone.localtime(max(after, self.start))
+        year, month = after_local.year, after_local.month
+        # The occurrence of the previous month may still be running
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+        while True:
+            day = nth_weekday(year, month, weekday, nth)
+            if day is not None:
+                start = timezone.make_aware(datetime.combine(date(year, month, day), first.time()))
+                if start >= self.start:
+                    yield start
+            year, month = (year, month + 1) if month < 12 else (year + 1, 1)
+
+
+def nth_weekday(year, month, weekday, nth):
+    """Day of the month of its ``nth`` (0-based) ``weekday``, or None."""
+    first_weekday, days = calendar.monthrange(year, month)
+    day = 1 + (weekday - first_weekday) % 7 + 7 * nth
+    return day if day <= days else None
+
+
+def events_in_window(queryset, window_start, window_end):
+    """
+    Narrow an Event queryset to events with occurrences in the window.
+
+    Uses plain range predicates, which an index on ``start_date`` or
+    ``end_date`` can serve: one-off events must overlap the window and
+    series must have started before it ends.
+    """
+    return queryset.filter(
+        Q(end_date__gt=window_start) | ~Q(repeat_type='none'),
+        start_date__lt=window_end,
+    )
+
+
+def parse_window(params):
+    """
+    Read a window from ``start``/``end`` (dates or datetimes) or ``year``/``month``.
+
+    Defaults to the current month. Raises ``ValidationError`` for malformed
+    or oversized windows.
+    """
+    def parse_bound(name):
+        value = params.get(name)
+        parsed = parse_datetime(value) or parse_date(value)
+        if parsed is None:
+            raise serializers.ValidationError({name: 'Expected an ISO date or datetime.'})
+        if isinstance(parsed, datetime):
+            return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+        return timezone.make_aware(datetime.combine(parsed, time.min))
+
+    try:
+        if params.get('start') or params.get('end'):
+            window_start, window_end = parse_bound('start'), parse_bound('end')
+        else:
+            today = timezone.localdate()
+            year = int(params.get('year', today.year))
+            month = int(params.get('month', today.month))
+            window_start = timezone.make_aware(datetime(year, month, 1))
+            window_end = timezone.make_aware(
+                datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+            )
+    except (TypeError, ValueError):
+        raise serializers.ValidationError('Expected start and end, or a year and month.')
+
+    if not window_start < window_end <= window_start + MAX_WINDOW:
+        raise serializers.ValidationError(f'The window must end after it starts and span at most {MAX_WINDOW.days} days.')
+    return window_start, window_end
+
+
+_datetime_field = serializers.DateTimeField()
+
+
+def recurrence_id(event, start):
+    """Identifier of one occurrence of a series, or None for one-off events."""
+    if event.repeat_type == 'none':
+        return None
+    return f'{event.id}:{start.astimezone(dt_timezone.utc):%Y%m%dT%H%M%SZ}'
+
+
+def expand_events(events, window_start, window_end, serialize, **bounds):
+    """
+    Occurrences of ``events`` in the window, as serialized event dicts.
+
+    Every event is serialized once with ``serialize``; its occurrences copy
+    that dict with their own ``start_date`` and ``end_date`` and a
+    ``recurrence_id`` unique within the series.
+    """
+    occurrences = []
+    for event in events:
+        data = None
+        for start, end in Recurrence.from_event(event, **bounds).between(window_start, window_end):
+            if data is None:
+                data = serialize(event)
+            occurrences.append({
+                **data,
+                'start_date': _datetime_field.to_representation(start),
+                'end_date': _datetime_field.to_representation(end),
+                'recurrence_id': recurrence_id(event, start),
+            })
+    occurrences.sort(key=lambda occurrence: (occurrence['start_date'], occurrence['id']))
+    return occurrences
+
+
+def calendar_version_key(user_id):
+    return CacheService.make_key(CacheService.PREFIX_USER, user_id, 'calendar_version')
+
+
+def get_calendar_version(user_id):
+    key = calendar_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = timezone.now().timestamp()
+        cache.add(key, version, None)
+    return version
+
+
+def invalidate_user_occurrences(user_id):
+    """Retire every memoized expansion of the user's calendar."""
+    if user_id is not None:
+        cache.set(calendar_version_key(user_id), timezone.now().timestamp(), None)
+
+
+def get_user_occurrences(user, window_start, window_end, serialize):
+    """Occurrences of the user's own events in the window, memoized per calendar version."""
+    from .models import Event
+
+    key = CacheService.make_key(
+        CacheService.PREFIX_USER, user.id, 'occurrences', get_calendar_version(user.id),
+        window_start.isoformat(), window_end.isoformat(),
+    )
+    occurrences = cache.get(key)
+    if occurrences is None:
+        events = events_in_window(
+            Event.objects.filter(user=user, schedule_plan__isnull=True), window_start, window_end
+        )
+        occurrences = expand_events(events, window_start, window_end, serialize)
+        cache.set(key, occurrences, CacheService.TIMEOUT_DAY)
+    return occurrences
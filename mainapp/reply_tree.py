@@ -0,0 +1,83 @@
+from django.core.cache import cache
+from analytics.cache_service import CacheService
+from .author_cards import AuthorCardResolver
+from .post import Post, ReplyTreePostSerializer
+
+ReplyEdge = Post.replying_to.through
+
+
+def reply_tree_cache_key(thread_id):
+    return CacheService.make_key(CacheService.PREFIX_THREAD, thread_id, 'reply_tree')
+
+
+def invalidate_reply_tree(thread_id):
+    if thread_id is not None:
+        cache.delete(reply_tree_cache_key(thread_id))
+
+
+def build_reply_tree(thread_id):
+    """
+    Build the reply graph of a thread from one post query and one edge query.
+
+    Returns ``{'thread': id, 'roots': [...], 'posts': [...]}`` where every post
+    lists the ids it replies to and the ids replying to it, both ordered by
+    post date. A post may reply to several others, so the graph is returned
+    as nodes with adjacency lists instead of a nested tree; ``roots`` holds
+    the posts that reply to nothing in the thread. Author data is left out
+    so the graph can be cached independently of profile changes.
+    """
+    posts = list(Post.objects.filter(thread_id=thread_id).order_by('date', 'id'))
+    order = {post.id: index for index, post in enumerate(posts)}
+
+    replying_to = {post.id: [] for post in posts}
+    replies = {post.id: [] for post in posts}
+    edges = ReplyEdge.objects.filter(from_post__thread_id=thread_id).values_list('from_post_id', 'to_post_id')
+    for from_id, to_id in edges:
+        # Replies to posts of other threads are not part of this graph
+        if to_id in order:
+            replying_to[from_id].append(to_id)
+            replies[to_id].append(from_id)
+
+    nodes = [dict(node) for node in ReplyTreePostSerializer(posts, many=True).data]
+    for node in nodes:
+        node['replying_to'] = sorted(replying_to[node['id']], key=order.get)
+        node['replies'] = sorted(replies[node['id']], key=order.get)
+
+    return {
+        'thread': thread_id,
+        'roots': [post.id for post in posts if not replying_to[post.id]],
+        'posts': nodes,
+    }
+
+
+def attach_authors(tree, resolver):
+    """Copy of ``tree`` with the current author card of every post merged in."""
+    posts = [
+        Post(id=node['id'], user_id=node['user'], nickname=node['nickname'], is_anonymous=node['is_anonymous'])
+        for node in tree['posts']
+    ]
+    resolver.add(posts)
+    nodes = []
+    for node, post in zip(tree['posts'], posts):
+        card = resolver.card(post, 'user')
+        nodes.append({
+            **node,
+            'user_display_name': card['display_name'] if card else post.nickname,
+            'author_profile_thumbnail': resolver.avatar_url(post, 'user', 'thumbnail'),
+        })
+    return {**tree, 'posts': nodes}
+
+
+def get_reply_tree(thread_id, request=None):
+    """
+    Return the reply graph of a thread with its authors.
+
+    The graph is cached and built on a miss; author cards are merged in on
+    every read from their own per-user cache, which user saves invalidate.
+    """
+    key = reply_tree_cache_key(thread_id)
+    tree = cache.get(key)
+    if tree is None:
+        tree = build_reply_tree(thread_id)
+        cache.set(key, tree, CacheService.TIMEOUT_LONG)
+    return attach_authors(tree, AuthorCardResolver(request))
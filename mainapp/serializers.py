@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from .models import SchedulePlan, AppliedPlan, Event
-from .post import ThreadSerializer, Thread, PinnedThread
+from .post import ThreadSerializer, ThreadSummarySerializer, Thread, PinnedThread
 
 # class EventSerializer(serializers.ModelSerializer):
 #     class Meta:
@@ -14,9 +14,18 @@ class EventSerializer(serializers.ModelSerializer):
             'user': {'read_only': True},
             'color': {'read_only': True}
         }
-        
+
+    def validate(self, attrs):
+        start_date = attrs.get('start_date', getattr(self.instance, 'start_date', None))
+        end_date = attrs.get('end_date', getattr(self.instance, 'end_date', None))
+        if start_date and end_date and start_date >= end_date:
+            raise serializers.ValidationError(
+                {'end_date': "Data rozpoczęcia musi być wcześniejsza niż zakończenia"}
+            )
+        return attrs
+
 class SchedulePlanSerializer(serializers.ModelSerializer):
-    events = EventSerializer(many=True, read_only=True)
+    events = EventSerializer(many=True, read_only=True, source='event_set')
     administrator = serializers.StringRelatedField()
     is_applied = serializers.SerializerMethodField()
 
@@ -34,9 +43,27 @@ class SchedulePlanSerializer(serializers.ModelSerializer):
             'is_applied'
         ]
 
+    def get_fields(self):
+        fields = super().get_fields()
+        # ?events=summary lists counts and the next occurrence instead
+        if self.context.get('plan_events') == 'summary':
+            del fields['events']
+            fields['events_summary'] = serializers.SerializerMethodField()
+        return fields
+
+    def get_plan_state(self):
+        from .plan_state import PlanStateResolver
+
+        if 'plan_state' not in self.context:
+            request = self.context.get('request')
+            self.context['plan_state'] = PlanStateResolver(getattr(request, 'user', None))
+        return self.context['plan_state']
+
     def get_is_applied(self, obj):
-        user = self.context['request'].user
-        return obj.participants.filter(id=user.id).exists()
+        return self.get_plan_state().is_applied(obj)
+
+    def get_events_summary(self, obj):
+        return self.get_plan_state().events_summary(obj)
 
 class AppliedPlanSerializer(serializers.ModelSerializer):
     class Meta:
@@ -51,7 +78,7 @@ class ApplyPlanSerializer(serializers.ModelSerializer):
 
 
 class PinnedThreadSerializer(serializers.ModelSerializer):
-    thread_data = ThreadSerializer(source='thread', read_only=True)
+    thread_data = ThreadSummarySerializer(source='thread', read_only=True)
     unread_count = serializers.SerializerMethodField()
     
     class Meta:
@@ -60,7 +87,8 @@ class PinnedThreadSerializer(serializers.ModelSerializer):
         read_only_fields = ['pinned_at', 'last_viewed']
     
     def get_unread_count(self, obj):
-        return obj.get_unread_count()
+        # Maintained on post creation by mainapp.unread
+        return obj.unread_posts
 
 
 class PinThreadSerializer(serializers.Serializer):
@@ -1,33 +1,45 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
+from django.conf import settings
 from django.dispatch import receiver
 from .post import Vote, Post, Thread
+from .counters import adjust_vote_count, signal_counting_enabled, vote_value
+from .reply_tree import invalidate_reply_tree
+from .unread import fan_out_new_post, withdraw_deleted_post
+from .hotness import POST_WEIGHT, bump_hot_scores
+from .live import publish_post_event, publish_vote_deltas
+from .facets import thread_moved
+from .author_cards import invalidate_author_card
+from .author_snapshots import take_snapshot, user_changed
+from .recurrence import invalidate_user_occurrences
+from .plan_overlay import invalidate_plan_events
+from .ics_feed import record_deletion
+from .models import Event
 
 
 @receiver(post_save, sender=Vote)
 def update_vote_count_on_save(sender, instance, created, **kwargs):
-    """Update vote count when a vote is created or updated"""
-    if instance.thread:
-        instance.thread.update_vote_count()
-    if instance.post:
-        instance.post.update_vote_count()
+    """Apply the vote count delta when a vote is created or changed"""
+    if not signal_counting_enabled():
+        return
+    delta = vote_value(instance.vote_type) - vote_value(instance._stored_vote_type)
+    adjust_vote_count(instance.thread_id, instance.post_id, delta)
+    if instance.thread_id:
+        bump_hot_scores({instance.thread_id: delta})
+    publish_vote_deltas({instance.thread_id: delta}, {instance.post_id: delta})
 
 
 @receiver(post_delete, sender=Vote)
 def update_vote_count_on_delete(sender, instance, **kwargs):
-    """Update vote count when a vote is deleted"""
-    try:
-        if instance.thread:
-            instance.thread.update_vote_count()
-    except Thread.DoesNotExist:
-        # Thread might be in the process of being deleted
-        pass
-    
-    try:
-        if instance.post:
-            instance.post.update_vote_count()
-    except Post.DoesNotExist:
-        # Post might be in the process of being deleted
-        pass
+    """Remove the vote's contribution when a vote is deleted"""
+    if not signal_counting_enabled():
+        return
+    # The thread or post might be in the process of being deleted, in which
+    # case the update simply matches no rows
+    delta = -vote_value(instance._stored_vote_type)
+    adjust_vote_count(instance.thread_id, instance.post_id, delta)
+    if instance.thread_id:
+        bump_hot_scores({instance.thread_id: delta})
+    publish_vote_deltas({instance.thread_id: delta}, {instance.post_id: delta})
 
 
 @receiver(post_save, sender=Post)
@@ -36,6 +48,7 @@ def update_thread_counts_on_post_save(sender, instance, created, **kwargs):
     if created and instance.thread:
         instance.thread.update_post_count()
         instance.thread.save(update_fields=['last_activity_date'])
+        bump_hot_scores({instance.thread_id: POST_WEIGHT})
 
 
 @receiver(post_delete, sender=Post)
@@ -46,4 +59,103 @@ def update_thread_counts_on_post_delete(sender, instance, **kwargs):
             instance.thread.update_post_count()
     except Thread.DoesNotExist:
         # Thread might be in the process of being deleted
-        pass
\ No newline at end of file
+        pass
+
+
+@receiver(post_save, sender=Post)
+def update_unread_counters_on_post_save(sender, instance, created, **kwargs):
+    """Count a new post as unread for the users who pinned its thread"""
+    if created and instance.thread_id:
+        fan_out_new_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def update_unread_counters_on_post_delete(sender, instance, **kwargs):
+    """Stop counting a deleted post as unread"""
+    if instance.thread_id:
+        withdraw_deleted_post(instance)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_reply_tree_on_post_change(sender, instance, **kwargs):
+    """Drop the cached reply tree when a post is added, edited or removed"""
+    invalidate_reply_tree(instance.thread_id)
+
+
+@receiver(m2m_changed, sender=Post.replying_to.through)
+def invalidate_reply_tree_on_reply_change(sender, instance, action, **kwargs):
+    """Drop the cached reply tree when reply links change"""
+    # Only links within one thread are part of a tree, so the thread of
+    # either end of the changed links is the one to invalidate
+    if action.startswith('post_'):
+        invalidate_reply_tree(instance.thread_id)
+
+
+@receiver(post_save, sender=Post)
+def publish_post_change(sender, instance, created, **kwargs):
+    """Push new and edited posts to live subscribers of the thread"""
+    publish_post_event(instance, 'created' if created else 'updated')
+
+
+@receiver(post_delete, sender=Post)
+def publish_post_removal(sender, instance, **kwargs):
+    """Push removed posts to live subscribers of the thread"""
+    publish_post_event(instance, 'deleted')
+
+
+@receiver(post_save, sender=Thread)
+def update_facet_counts_on_thread_save(sender, instance, created, **kwargs):
+    """Count a new thread in its facet, or move an edited one to its new facet"""
+    facet = instance.get_facet()
+    if facet is None or (not created and instance._stored_facet is None):
+        # Deferred instances without the facet fields loaded are not tracked
+        return
+    thread_moved(None if created else instance._stored_facet, facet)
+
+
+@receiver(post_delete, sender=Thread)
+def update_facet_counts_on_thread_delete(sender, instance, **kwargs):
+    """Remove a deleted thread from its facet"""
+    thread_moved(instance._stored_facet or instance.get_facet(), None)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_author_card_on_user_change(sender, instance, **kwargs):
+    """Drop the cached author card when a profile or profile picture changes"""
+    invalidate_author_card(instance.id)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def sync_author_snapshots_on_user_change(sender, instance, update_fields=None, **kwargs):
+    """Queue the snapshot sync of the user's threads and posts"""
+    user_changed(instance, update_fields)
+
+
+@receiver(pre_save, sender=Thread)
+def snapshot_thread_author(sender, instance, **kwargs):
+    """Store the author card on new threads"""
+    if instance._state.adding:
+        take_snapshot(instance, 'author')
+
+
+@receiver(pre_save, sender=Post)
+def snapshot_post_author(sender, instance, **kwargs):
+    """Store the author card on new posts"""
+    if instance._state.adding:
+        take_snapshot(instance, 'user')
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def invalidate_occurrences_on_event_change(sender, instance, **kwargs):
+    """Retire the memoized calendar expansions of the event's owner and plan"""
+    invalidate_user_occurrences(instance.user_id)
+    invalidate_plan_events(instance.schedule_plan_id)
+
+
+@receiver(post_delete, sender=Event)
+def record_event_deletion(sender, instance, **kwargs):
+    """Keep a tombstone for incremental calendar feeds"""
+    record_deletion(instance)
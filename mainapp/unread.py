@@ -0,0 +1,108 @@
+"""
+Unread counters of pinned threads.
+
+Every ``PinnedThread`` row carries an ``unread_posts`` counter. A new post
+increments the counters of all pins of its thread with one UPDATE, and
+``PinnedThread.mark_as_viewed`` resets it, so reading unread counts is a
+lookup on the (user, thread) key instead of a COUNT over posts.
+
+Threads pinned by more than ``FORUM_UNREAD_FANOUT_BATCH_SIZE`` users are
+updated after the post is committed, by a background worker, in batches of
+that size, so creating a post never waits on a huge fan-out. Only pins
+viewed before the post was written are incremented, which keeps the
+counters exact when a user views the thread while the fan-out is running.
+
+A fan-out that is still queued when the process stops is lost. The
+``reconcile_unread_counts`` command recounts the posts written since each
+pin was last viewed and repairs the counters that drifted, e.g. after a
+restart.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from .post import PinnedThread, Post
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='unread-fanout')
+
+
+def get_batch_size():
+    return getattr(settings, 'FORUM_UNREAD_FANOUT_BATCH_SIZE', 1000)
+
+
+def _unread_pins(thread_id, post_date):
+    return PinnedThread.objects.filter(thread_id=thread_id, last_viewed__lt=post_date)
+
+
+def fan_out_new_post(post):
+    """Count ``post`` as unread for every user who pinned its thread."""
+    batch_size = get_batch_size()
+    pins = _unread_pins(post.thread_id, post.date)
+    if len(pins.values_list('id', flat=True)[:batch_size + 1]) <= batch_size:
+        pins.update(unread_posts=F('unread_posts') + 1)
+        return
+    thread_id, post_date = post.thread_id, post.date
+    transaction.on_commit(lambda: _executor.submit(_run_fan_out, thread_id, post_date))
+
+
+def fan_out_in_batches(thread_id, post_date, batch_size=None):
+    """Increment the counters of all pins of a thread in id-ordered batches."""
+    batch_size = batch_size or get_batch_size()
+    last_id = 0
+    while True:
+        ids = list(
+            _unread_pins(thread_id, post_date).filter(id__gt=last_id)
+            .order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return
+        PinnedThread.objects.filter(id__in=ids).update(unread_posts=F('unread_posts') + 1)
+        last_id = ids[-1]
+
+
+def _run_fan_out(thread_id, post_date):
+    try:
+        fan_out_in_batches(thread_id, post_date)
+    except Exception:
+        logger.exception('Unread counter fan-out failed for thread %s', thread_id)
+    finally:
+        close_old_connections()
+
+
+def withdraw_deleted_post(post):
+    """Undo the unread increment of a deleted post for pins that had not seen it."""
+    _unread_pins(post.thread_id, post.date).filter(unread_posts__gt=0).update(
+        unread_posts=F('unread_posts') - 1
+    )
+
+
+def actual_unread_count():
+    """Subquery computing the real number of unread posts of the outer PinnedThread."""
+    posts = Post.objects.filter(
+        thread=OuterRef('thread'), date__gt=OuterRef('last_viewed')
+    ).values('thread').annotate(total=Count('id')).values('total')
+    return Coalesce(Subquery(posts, output_field=IntegerField()), Value(0))
+
+
+def find_unread_drift(queryset=None):
+    """Return (id, cached, actual) rows whose unread counter has drifted."""
+    queryset = PinnedThread.objects.all() if queryset is None else queryset
+    return list(
+        queryset.annotate(actual=actual_unread_count())
+        .exclude(unread_posts=F('actual'))
+        .values_list('id', 'unread_posts', 'actual')
+    )
+
+
+def reconcile_unread_counts(queryset=None):
+    """Repair drifted unread counters with one UPDATE. Returns the drift found."""
+    drift = find_unread_drift(queryset)
+    if drift:
+        PinnedThread.objects.filter(id__in=[row[0] for row in drift]).update(
+            unread_posts=actual_unread_count()
+        )
+    return drift
@@ -4,12 +4,14 @@ from .views import (
     EventViewSet, SchedulePlanViewSet, home, event_list, add_event,
     PostListCreateAPIView, PostRetrieveUpdateDestroyAPIView,
     ThreadListCreateAPIView, ThreadRetrieveUpdateDestroyAPIView,
-    create_thread_with_post, vote_thread, vote_post,
+    create_thread_with_post, vote_thread, vote_post, thread_reply_tree, thread_facet_counts,
     fetch_and_delete_emails, create_threads_from_emails
 )
 from .api.pinned_threads import (
-    pin_thread, get_pinned_threads, mark_thread_as_viewed, get_pin_status, get_bulk_pin_status
+    pin_thread, get_pinned_threads, get_unread_counts, mark_thread_as_viewed, get_pin_status,
+    get_bulk_pin_status
 )
+from .api.live import live_updates
 from mainapp import views
 
 # Setup DRF router for EventViewSet
@@ -29,6 +31,7 @@ urlpatterns = [
     path('events/save-as-plan/', EventViewSet.as_view({'post': 'save_as_plan'})),
     path('create-plan/', views.create_plan, name='create-plan'),
     path('plans/', views.plans_list, name='plans-list'),
+    path('calendar/feed/<str:token>/', views.calendar_feed, name='calendar-feed'),
     path('plans/<int:pk>/apply/', views.SchedulePlanViewSet.as_view({'post': 'apply'}), name='apply-plan'),
 
     # Post endpoints
@@ -37,7 +40,9 @@ urlpatterns = [
 
     # Thread endpoints
     path('threads/', ThreadListCreateAPIView.as_view(), name='thread-list-create'),
+    path('threads/facets/', thread_facet_counts, name='thread-facet-counts'),
     path('threads/<int:pk>/', ThreadRetrieveUpdateDestroyAPIView.as_view(), name='thread-detail'),
+    path('threads/<int:thread_id>/reply-tree/', thread_reply_tree, name='thread-reply-tree'),
     path('create-thread/', create_thread_with_post, name='create-thread-with-post'),
     path('api/email/fetch-delete/', fetch_and_delete_emails, name='fetch-delete-emails'),
     path('api/email/create/', create_threads_from_emails, name='create-threads-from-emails'),
@@ -49,10 +54,14 @@ urlpatterns = [
     # Pinned threads endpoints
     path('threads/pin/', pin_thread, name='pin-thread'),
     path('threads/pinned/', get_pinned_threads, name='get-pinned-threads'),
+    path('threads/pinned/unread/', get_unread_counts, name='pinned-unread-counts'),
     path('threads/<int:thread_id>/mark-viewed/', mark_thread_as_viewed, name='mark-thread-viewed'),
     path('threads/<int:thread_id>/pin-status/', get_pin_status, name='get-pin-status'),
     path('threads/bulk-pin-status/', get_bulk_pin_status, name='bulk-pin-status'),
 
+    # Live updates (server-sent events, ASGI)
+    path('live/', live_updates, name='live-updates'),
+
     # Include the router URLs for EventViewSet
     path('', include(router.urls)),
 ]
\ No newline at end of file
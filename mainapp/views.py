@@ -4,17 +4,17 @@ from rest_framework.decorators import api_view, action, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.db import transaction
-from django.db.models import Q
+from django.db.models import Q, Prefetch
 from datetime import date, datetime, time
-import imaplib
-import email
-from email.header import decode_header
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import *
 from .constants import CATEGORY_COLORS
 from .forms import EventForm
 from .serializers import *
-from django.http import HttpResponse
+from django.http import HttpResponse, HttpResponseNotFound, HttpResponseNotModified, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.http import parse_etags
+from django.views.decorators.http import require_GET
 from django.contrib.admin.views.decorators import staff_member_required
 from django.db import transaction
 from django.contrib.auth.decorators import login_required
@@ -23,6 +23,7 @@ from datetime import timedelta
 from django.contrib.admin.views.decorators import staff_member_required
 
 from .post import Post, Thread, PostSerializer, ThreadSerializer, Vote, VoteSerializer
+from .post import ThreadSummarySerializer
 from .post import vote_on_thread, vote_on_post
 from .models import Event
 from .serializers import EventSerializer
@@ -30,19 +31,31 @@ from .forms import EventForm
 from .post import create_thread
 from .permissions import IsOwnerOrReadOnly
 from .filters import ThreadFilter
+from .vote_state import VoteStateMixin, VoteStateResolver
+from .author_cards import AuthorCardMixin, AuthorCardResolver
+from .pagination import ThreadKeysetPagination, PostWindowPagination
+from .blacklist import exclude_blacklisted_threads
+from . import vote_buffer
+from . import email_import
+from .reply_tree import get_reply_tree
+from .facets import get_facet_counts
+from .calendar_sync import sync_calendar
+from .event_bulk import bulk_insert_events
+from .recurrence import events_in_window, expand_events, parse_window
+from .plan_overlay import get_calendar_occurrences
+from .plan_state import PlanStateMixin
+from .ics_feed import Feed, get_feed_user, make_feed_token, rotate_feed_token
+from .conditional import ConditionalGetMixin, thread_list_validators, thread_detail_validators
 
 # ---------- COMMON HOME ----------
 def home(request):
     return HttpResponse("Hello World!")
 
-class SchedulePlanViewSet(viewsets.ModelViewSet):
-    queryset = SchedulePlan.objects.filter(is_active=True).order_by('-created_at')
+class SchedulePlanViewSet(PlanStateMixin, viewsets.ModelViewSet):
+    queryset = SchedulePlan.objects.all().order_by('-created_at')
     serializer_class = SchedulePlanSerializer
     permission_classes = [IsAuthenticated]
 
-    def get_queryset(self):
-        return SchedulePlan.objects.all().order_by('-created_at')
-
     def perform_create(self, serializer):
         serializer.save(administrator=self.request.user)
 
@@ -52,7 +65,7 @@ class SchedulePlanViewSet(viewsets.ModelViewSet):
         return super().destroy(request, *args, **kwargs)
         
 
-class PublicSchedulePlanViewSet(viewsets.ReadOnlyModelViewSet):
+class PublicSchedulePlanViewSet(PlanStateMixin, viewsets.ReadOnlyModelViewSet):
     queryset = SchedulePlan.objects.all().order_by('-created_at')
     serializer_class = SchedulePlanSerializer
     permission_classes = [IsAuthenticated]
@@ -92,47 +105,87 @@ class EventViewSet(viewsets.ModelViewSet):
         else:
             queryset = queryset.filter(schedule_plan__isnull=True, user=self.request.user)
 
+        # Optional window, e.g. ?start=2024-10-01&end=2024-11-01: stored
+        # events with occurrences in it, recurring ones by their first one
+        if self.action == 'list' and 'start' in self.request.query_params:
+            queryset = events_in_window(queryset, *parse_window(self.request.query_params))
+
         return queryset
+
+    @action(detail=False, methods=['get'])
+    def occurrences(self, request):
+        """
+        Every occurrence of the user's events and of their applied plans in
+        a window, recurring events expanded. The window is given by
+        ``start`` and ``end`` or by ``year`` and ``month`` (default: the
+        current month).
+        """
+        window_start, window_end = parse_window(request.query_params)
+        serializer = self.get_serializer()
+        return Response(
+            get_calendar_occurrences(request.user, window_start, window_end, serializer.to_representation)
+        )
     
     def get_object(self):
         obj = Event.objects.get(pk=self.kwargs['pk'])
 
         return obj
 
+    @action(detail=False, methods=['get', 'post'])
+    def feed(self, request):
+        """
+        URL of the user's iCalendar feed, for subscribing from calendar apps.
+        POST issues a new URL and revokes the previous ones.
+        """
+        if request.method == 'POST':
+            token = rotate_feed_token(request.user)
+        else:
+            token = make_feed_token(request.user)
+        url = reverse('mainapp:calendar-feed', kwargs={'token': token})
+        return Response({'url': request.build_absolute_uri(url)})
+
     @action(detail=False, methods=['POST'])
-    @transaction.atomic
     def save_calendar(self, request):
+        """
+        Sync the user's calendar with the posted ``events``, writing only
+        what changed. Send back the returned ``revision`` to be warned
+        with a 409 about changes made elsewhere.
+        """
         user = request.user
         if not user.is_authenticated:
             return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
-        try:
-           Event.objects.filter(user=user).delete() 
-           events_data = request.data.get('events', [])
-           created_events = []
-           for event_data in events_data:
-               event_data['user'] = user.id
-               serializer = self.get_serializer(data=event_data)
-               serializer.is_valid(raise_exception=True)  
-               serializer.save()
-               created_events.append(serializer.data)
-           return Response(created_events, status=status.HTTP_201_CREATED)
-        except Exception as e: 
-           return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        events_data = request.data.get('events', [])
+        if not isinstance(events_data, list):
+            return Response({'error': 'events must be a list'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(sync_calendar(user, events_data, request.data.get('revision')))
 
     @action(detail=False, methods=['POST'])
     @transaction.atomic
     def bulk_create(self, request):
-        serializer = self.get_serializer(data=request.data, many=True)
-        serializer.is_valid(raise_exception=True)
-        
-        try:
-            self.perform_create(serializer)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        except Exception as e:
-            return Response(
-                {"error": str(e)}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        """
+        Insert a list of events at once. The response lists the created
+        event or ``{'errors': ...}`` for every row. Any invalid row rejects
+        the batch, unless ``?partial=true`` is given: then the valid rows
+        are created anyway (207 Multi-Status when only some were created).
+        """
+        if not isinstance(request.data, list):
+            return Response({'error': 'Expected a list of events'}, status=status.HTTP_400_BAD_REQUEST)
+        partial = request.query_params.get('partial', '').lower() in ('1', 'true', 'yes')
+        results = bulk_insert_events(request.user, request.data, partial=partial)
+        events = [result for result in results if isinstance(result, Event)]
+        created = iter(self.get_serializer(events, many=True).data)
+        data = [
+            next(created) if isinstance(result, Event) else result and {'errors': result}
+            for result in results
+        ]
+
+        if len(events) == len(results):
+            status_code = status.HTTP_201_CREATED
+        elif events:
+            status_code = status.HTTP_207_MULTI_STATUS
+        else:
+            status_code = status.HTTP_400_BAD_REQUEST
+        return Response(data, status=status_code)
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -147,20 +200,48 @@ class EventViewSet(viewsets.ModelViewSet):
         plan = serializer.save()
         return Response(SchedulePlanSerializer(plan).data, status=201)
 
+@require_GET
+def calendar_feed(request, token):
+    """
+    iCalendar feed of a user's calendar, addressed by a signed token (see
+    ``EventViewSet.feed``). Answers 304 while the client's ETag is current;
+    ``?sync_token=`` from ``X-Sync-Token`` returns only the changes since.
+    """
+    user = get_feed_user(token)
+    if user is None:
+        return HttpResponseNotFound()
+
+    feed = Feed(user, request.get_host())
+    since = None
+    if request.GET.get('sync_token'):
+        since = feed.parse_sync_token(request.GET['sync_token'])
+    headers = {
+        'ETag': feed.etag(since),
+        'Cache-Control': 'private, no-cache',
+        'X-Sync-Token': feed.sync_token(),
+        'X-Sync-Mode': 'full' if since is None else 'delta',
+    }
+    if headers['ETag'] in parse_etags(request.headers.get('If-None-Match', '')):
+        return HttpResponseNotModified(headers=headers)
+    return StreamingHttpResponse(feed.stream(since), content_type='text/calendar; charset=utf-8', headers=headers)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_events_for_month(request):
-    year = int(request.query_params.get('year', datetime.now().year))
-    month = int(request.query_params.get('month', datetime.now().month))
+    window_start, window_end = parse_window(request.query_params)
 
-    events = Event.objects.filter(start_date__year=year, start_date__month=month)
+    # Range predicates instead of start_date__year/month, so the window
+    # index is used and events running into the month are included
+    events = events_in_window(Event.objects.all(), window_start, window_end)
     #przypisanie eventu do kontretnego uzytkownika
     if not request.user.is_superuser:
         events = events.filter(user=request.user)
 
-    #czy lepiej tak? bo mam datefield()
-    events_data = [{"title": event.title, "date": event.start_date} for event in events]
-    # events_data = [{"title": event.title, "date": event.date} for event in events]
+    occurrences = expand_events(
+        events, window_start, window_end, lambda event: {'id': event.id, 'title': event.title}
+    )
+    events_data = [{"title": item['title'], "date": item['start_date']} for item in occurrences]
     return Response(events_data)
     
 @login_required
@@ -223,7 +304,7 @@ def admin_create_plan(request):
 
 
 # ---------- POST SECTION ----------
-class PostListCreateAPIView(generics.ListCreateAPIView):
+class PostListCreateAPIView(AuthorCardMixin, VoteStateMixin, generics.ListCreateAPIView):
     queryset = Post.objects.all()
     serializer_class = PostSerializer
 
@@ -279,7 +360,7 @@ class PostListCreateAPIView(generics.ListCreateAPIView):
         is_anonymous = self.request.data.get('is_anonymous', False)
         serializer.save(user=user, is_anonymous=is_anonymous)
 
-class PostRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
+class PostRetrieveUpdateDestroyAPIView(AuthorCardMixin, VoteStateMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Post.objects.all()
     serializer_class = PostSerializer
     permission_classes = [IsOwnerOrReadOnly]
@@ -288,15 +369,37 @@ class PostRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
         serializer.save(was_edited=True)
 
 # ---------- THREAD SECTION ----------
-class ThreadListCreateAPIView(generics.ListCreateAPIView):
+class ThreadListCreateAPIView(ConditionalGetMixin, AuthorCardMixin, VoteStateMixin, generics.ListCreateAPIView):
     serializer_class = ThreadSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_class = ThreadFilter
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
+    def get_validators(self):
+        return thread_list_validators(self)
+
+    @property
+    def paginator(self):
+        # ?pagination=cursor switches to keyset paging for infinite-scroll
+        # clients, except for orderings whose keys change between requests
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            wants_cursor = params.get('pagination') == 'cursor' or 'cursor' in params
+            if wants_cursor and ThreadKeysetPagination.supports(self.request):
+                self._paginator = ThreadKeysetPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def get_serializer_class(self):
+        # Lists use the compact summary; nested posts are served by the detail endpoint
+        if self.request.method in permissions.SAFE_METHODS:
+            return ThreadSummarySerializer
+        return ThreadSerializer
+
     def get_queryset(self):
-        queryset = Thread.objects.all()
         user = self.request.user
+        queryset = Thread.objects.all()
 
         # Role-based filtering
         # Lecturers should only see threads marked as visible_for_teachers
@@ -307,25 +410,56 @@ class ThreadListCreateAPIView(generics.ListCreateAPIView):
         apply_blacklist = self.request.query_params.get("blacklist", "on") != "off"
 
         if apply_blacklist and user.is_authenticated:
-            blacklist = getattr(user, 'blacklist', [])
-            if isinstance(blacklist, str):
-                try:
-                    import json
-                    blacklist = json.loads(blacklist)
-                except Exception:
-                    blacklist = []
-
-            for phrase in blacklist:
-                queryset = queryset.exclude(
-                    Q(title__icontains=phrase) | Q(content__icontains=phrase)
-                )
+            queryset = exclude_blacklisted_threads(queryset, user)
 
         return queryset
 
-class ThreadRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Thread.objects.select_related('author').all()
+class ThreadRetrieveUpdateDestroyAPIView(ConditionalGetMixin, AuthorCardMixin, VoteStateMixin, generics.RetrieveUpdateDestroyAPIView):
+    vote_state_include_posts = True
+    author_cards_include_posts = True
+    queryset = Thread.objects.prefetch_related(
+        Prefetch(
+            'posts',
+            queryset=Post.objects.prefetch_related('replying_to', 'replies')
+        )
+    )
     serializer_class = ThreadSerializer
     permission_classes = [IsOwnerOrReadOnly]
+    post_window_class = PostWindowPagination
+
+    @property
+    def post_window(self):
+        if not hasattr(self, '_post_window'):
+            self._post_window = self.post_window_class()
+        return self._post_window
+
+    def get_validators(self):
+        return thread_detail_validators(self)
+
+    def is_windowed(self):
+        return self.request.method == 'GET' and self.post_window.is_requested(self.request)
+
+    def get_queryset(self):
+        # Windowed reads load only the requested posts, not the whole thread
+        if self.is_windowed():
+            return Thread.objects.all()
+        return super().get_queryset()
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.is_windowed():
+            return super().retrieve(request, *args, **kwargs)
+
+        thread = self.get_object()
+        posts = self.post_window.paginate_queryset(
+            thread.posts.prefetch_related('replying_to', 'replies'), request
+        )
+        self.get_vote_state().add([thread, *posts])
+        self.get_author_cards().add([thread, *posts])
+
+        data = ThreadSummarySerializer(thread, context=self.get_serializer_context()).data
+        data['posts'] = PostSerializer(posts, many=True, context=self.get_serializer_context()).data
+        data['posts_window'] = self.post_window.get_window_links()
+        return Response(data)
 
     def get_object(self):
         obj = super().get_object()
@@ -350,6 +484,21 @@ class ThreadRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
                 message="You do not have permission to modify this thread. Only the thread creator can modify it."
             )
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticatedOrReadOnly])
+def thread_reply_tree(request, thread_id):
+    """Return the reply graph of all posts in a thread"""
+    tree = get_reply_tree(thread_id, request)
+    if not tree['posts'] and not Thread.objects.filter(id=thread_id).exists():
+        return Response({'error': 'Thread not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(tree)
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticatedOrReadOnly])
+def thread_facet_counts(request):
+    """Return thread counts per category, teacher visibility and answerability"""
+    return Response(get_facet_counts(request.user))
+
 @api_view(['POST'])
 def create_thread_with_post(request):
     try:
@@ -394,7 +543,8 @@ def vote_thread(request, thread_id):
         return Response({'error': 'Invalid vote type. Must be "upvote" or "downvote"'}, 
                        status=status.HTTP_400_BAD_REQUEST)
     
-    success, message, vote_count, current_user_vote = vote_on_thread(request.user, thread_id, vote_type)
+    cast_vote = vote_buffer.buffered_vote_on_thread if vote_buffer.is_enabled() else vote_on_thread
+    success, message, vote_count, current_user_vote = cast_vote(request.user, thread_id, vote_type)
     
     if success:
         return Response({
@@ -416,7 +566,8 @@ def vote_post(request, post_id):
         return Response({'error': 'Invalid vote type. Must be "upvote" or "downvote"'}, 
                        status=status.HTTP_400_BAD_REQUEST)
     
-    success, message, vote_count, current_user_vote = vote_on_post(request.user, post_id, vote_type)
+    cast_vote = vote_buffer.buffered_vote_on_post if vote_buffer.is_enabled() else vote_on_post
+    success, message, vote_count, current_user_vote = cast_vote(request.user, post_id, vote_type)
     
     if success:
         return Response({
@@ -431,52 +582,18 @@ def vote_post(request, post_id):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def fetch_and_delete_emails(request):
-    EMAIL = "plwftims@gmail.com"
-    PASSWORD = "fdnj bnbg rszz jzmc "
-    IMAP_SERVER = "imap.gmail.com"
-    IMAP_PORT = 993
-
+    # Large mailboxes should be imported with the import_emails command;
+    # this endpoint drains at most one batch per request
     results = []
     try:
-        mail = imaplib.IMAP4_SSL(IMAP_SERVER)
-        mail.login(EMAIL, PASSWORD)
+        mail = email_import.connect()
         mail.select("inbox")
-        status, messages = mail.search(None, "ALL")
-
-        if status != "OK":
-            return Response({"error": "Błąd przy wyszukiwaniu e-maili"}, status=500)
-
-        email_ids = messages[0].split()
-        for email_id in email_ids:
-            status, msg_data = mail.fetch(email_id, "(RFC822)")
-            if status != "OK":
-                continue
-
-            msg = email.message_from_bytes(msg_data[0][1])
-            subject, encoding = decode_header(msg.get("Subject"))[0]
-            if isinstance(subject, bytes):
-                subject = subject.decode(encoding or "utf-8")
-
-            from_ = msg.get("From")
-            body = ""
-            if msg.is_multipart():
-                for part in msg.walk():
-                    content_type = part.get_content_type()
-                    if content_type == "text/plain" and part.get_payload(decode=True):
-                        body = part.get_payload(decode=True).decode(errors="ignore")
-                        break
-            else:
-                body = msg.get_payload(decode=True).decode(errors="ignore")
-
-            results.append({
-                "subject": subject,
-                "from": from_,
-                "body": body.strip()
-            })
-
-            mail.store(email_id, '+FLAGS', '\\Deleted')
-
-        mail.expunge()
+        uids = email_import.search_uids(mail)[:email_import.get_batch_size()]
+        if uids:
+            for _, raw in email_import.fetch_batch(mail, uids):
+                results.append(email_import.parse_message(raw))
+            email_import.flag_deleted(mail, uids)
+            mail.expunge()
         mail.logout()
 
         return Response({"emails": results})
@@ -491,54 +608,21 @@ def create_threads_from_emails(request):
         emails = request.data.get('emails', [])
         if not emails:
             return Response({'info': 'Brak e-maili do przetworzenia'}, status=status.HTTP_200_OK)
-        created_threads = []
         user = request.user if request.user.is_authenticated else None
 
         with transaction.atomic():
-            for email_data in emails:
-                subject = email_data.get('subject')
-                body = email_data.get('body')
-                body = clean_email_body(body)
-                sender = email_data.get('from')
-                if not sender.endswith('p.lodz.pl>'):
-                    continue
-                if not subject or not body or not sender:
-                    continue
-                nickname = sender
-                is_anonymous = True
-
-                exists = Thread.objects.filter(
-                    title=subject,
-                    content=body,
-                    nickname=nickname,
-                    is_anonymous=True,
-                ).exists()
-                if exists:
-                    continue
-                if user.email and user.email[0].isdigit():
-                    visible_for_teachers_var = False
-                else:
-                    visible_for_teachers_var = True
-                thread_id = create_thread(
-                    title=subject,
-                    content=body,
-                    category="other",
-                    nickname=nickname,
-                    visible_for_teachers=visible_for_teachers_var,
-                    can_be_answered=False,
-                    user=user,
-                    is_anonymous=is_anonymous
-                )
-                thread = Thread.objects.get(id=thread_id)
-                created_threads.append(ThreadSerializer(thread).data)
+            threads = email_import.create_threads_from_email_data(emails, user)
+        # New threads have no posts; the summary with batched vote and author
+        # state keeps the response at a fixed number of queries
+        vote_state = VoteStateResolver(request.user)
+        vote_state.add(threads)
+        author_cards = AuthorCardResolver(request)
+        author_cards.add(threads)
+        created_threads = ThreadSummarySerializer(threads, many=True, context={
+            'request': request, 'vote_state': vote_state, 'author_cards': author_cards,
+        }).data
 
         return Response({"created_threads": created_threads}, status=status.HTTP_201_CREATED)
 
     except Exception as e:
-        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
-
-def clean_email_body(body: str) -> str:
-    separator = "_______________________________"
-    pos = body.find(separator)
-    if pos != -1:
-        return body[:pos].strip()
\ No newline at end of file
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
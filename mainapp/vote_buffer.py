@@ -0,0 +1,315 @@
+"""
+Write-behind buffer for forum votes.
+
+When ``FORUM_VOTE_WRITE_BEHIND`` is enabled, ``vote_thread`` and
+``vote_post`` record the user's desired vote in a local SQLite store instead
+of writing to PostgreSQL. Clicks on the same (user, target) are deduplicated
+and toggled in the buffer, and a background thread flushes all pending votes
+in bulk every ``FORUM_VOTE_FLUSH_INTERVAL`` seconds.
+
+The buffer keeps the desired final state of each vote, not the clicks, and a
+flush applies it relative to the votes currently stored in PostgreSQL. A
+flush interrupted after the PostgreSQL commit is therefore simply repeated
+as a no-op, and votes recorded before a crash are flushed by the next
+process that opens the buffer.
+"""
+import logging
+import sqlite3
+import threading
+import time
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections, transaction
+from .post import Thread, Post, Vote
+from .counters import apply_vote_deltas, manual_vote_counts, vote_value
+from .hotness import bump_hot_scores
+from .live import publish_vote_deltas
+
+logger = logging.getLogger(__name__)
+
+TARGET_MODELS = {'thread': Thread, 'post': Post}
+# (kind, target_id) pairs per snapshot query
+SNAPSHOT_CHUNK_SIZE = 400
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pending_vote (
+    kind TEXT NOT NULL,
+    target_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    stored_vote TEXT,
+    vote TEXT,
+    PRIMARY KEY (kind, target_id, user_id)
+)
+"""
+
+
+def is_enabled():
+    return getattr(settings, 'FORUM_VOTE_WRITE_BEHIND', False)
+
+
+class VoteBuffer:
+    """Durable per-host buffer of pending votes backed by SQLite."""
+
+    def __init__(self, path, flush_interval=5.0):
+        self.path = str(path)
+        self.flush_interval = flush_interval
+        self._local = threading.local()
+        self._flusher = None
+        self._flusher_lock = threading.Lock()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=FULL')
+            conn.execute(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def vote(self, user, kind, target_id, vote_type):
+        """
+        Toggle the user's vote on a target in the buffer.
+
+        Returns (message, current_user_vote) with the same semantics as the
+        synchronous ``vote_on_thread`` / ``vote_on_post``.
+        """
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT stored_vote, vote FROM pending_vote WHERE kind = ? AND target_id = ? AND user_id = ?',
+                (kind, target_id, user.id)
+            ).fetchone()
+            if row is not None:
+                stored_vote, current_vote = row
+            else:
+                stored_vote = Vote.objects.filter(
+                    user=user, **{kind: target_id}
+                ).values_list('vote_type', flat=True).first()
+                current_vote = stored_vote
+
+            new_vote = None if current_vote == vote_type else vote_type
+            conn.execute(
+                'INSERT OR REPLACE INTO pending_vote (kind, target_id, user_id, stored_vote, vote) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (kind, target_id, user.id, stored_vote, new_vote)
+            )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+        self.start_flusher()
+
+        if new_vote is None:
+            return "Vote withdrawn", None
+        if current_vote is None:
+            return f"Voted {vote_type}", vote_type
+        return f"Vote changed to {vote_type}", vote_type
+
+    def snapshot(self, user_id=None, targets=None):
+        """
+        Return the buffered state as ({(kind, target_id): delta},
+        {(kind, target_id): vote}) where the votes are those of ``user_id``.
+
+        ``targets`` limits the state to the given (kind, target_id) pairs,
+        so a page reads only its own rows however large the buffer grows.
+        """
+        conn = self._connection()
+        query = 'SELECT kind, target_id, user_id, stored_vote, vote FROM pending_vote'
+        if targets is None:
+            rows = conn.execute(query).fetchall()
+        else:
+            targets = sorted(targets)
+            rows = []
+            # Two bound parameters per pair, within SQLite's default limit of 999
+            for start in range(0, len(targets), SNAPSHOT_CHUNK_SIZE):
+                chunk = targets[start:start + SNAPSHOT_CHUNK_SIZE]
+                rows += conn.execute(
+                    f"{query} WHERE (kind, target_id) IN (VALUES {', '.join(['(?, ?)'] * len(chunk))})",
+                    [value for target in chunk for value in target]
+                ).fetchall()
+
+        deltas = {}
+        votes = {}
+        for kind, target_id, row_user_id, stored_vote, vote in rows:
+            key = (kind, target_id)
+            deltas[key] = deltas.get(key, 0) + vote_value(vote) - vote_value(stored_vote)
+            if row_user_id == user_id:
+                votes[key] = vote
+        return deltas, votes
+
+    def pending_delta(self, kind, target_id):
+        rows = self._connection().execute(
+            'SELECT stored_vote, vote FROM pending_vote WHERE kind = ? AND target_id = ?',
+            (kind, target_id)
+        ).fetchall()
+        return sum(vote_value(vote) - vote_value(stored_vote) for stored_vote, vote in rows)
+
+    def flush(self):
+        """
+        Write all pending votes to the database in bulk. Returns the number
+        of buffered rows processed, including dropped orphans.
+        """
+        conn = self._connection()
+        # Holding the SQLite write lock keeps other processes from flushing
+        # the same rows and makes new votes wait for the flush to finish.
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            rows = conn.execute(
+                'SELECT kind, target_id, user_id, vote FROM pending_vote'
+            ).fetchall()
+            if rows:
+                with transaction.atomic(), manual_vote_counts():
+                    live = self._drop_orphans(conn, rows)
+                    for kind, model in TARGET_MODELS.items():
+                        desired = {
+                            (user_id, target_id): vote
+                            for row_kind, target_id, user_id, vote in live if row_kind == kind
+                        }
+                        if desired:
+                            self._apply(kind, model, desired)
+                conn.execute('DELETE FROM pending_vote')
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return len(rows)
+
+    def _drop_orphans(self, conn, rows):
+        """
+        Discard votes on threads, posts or by users deleted since they were
+        buffered; inserting them would fail every flush on the foreign keys.
+        """
+        existing = {
+            kind: set(model.objects.filter(
+                id__in={target_id for row_kind, target_id, _, _ in rows if row_kind == kind}
+            ).values_list('id', flat=True))
+            for kind, model in TARGET_MODELS.items()
+        }
+        users = set(get_user_model().objects.filter(
+            id__in={user_id for _, _, user_id, _ in rows}
+        ).values_list('id', flat=True))
+
+        live, orphans = [], []
+        for row in rows:
+            kind, target_id, user_id, _ = row
+            if target_id in existing[kind] and user_id in users:
+                live.append(row)
+            else:
+                orphans.append((kind, target_id, user_id))
+        if orphans:
+            conn.executemany(
+                'DELETE FROM pending_vote WHERE kind = ? AND target_id = ? AND user_id = ?', orphans
+            )
+            logger.warning('Dropped %d buffered votes on deleted content or by deleted users', len(orphans))
+        return live
+
+    def _apply(self, kind, model, desired):
+        target_field = f'{kind}_id'
+        user_ids = {user_id for user_id, _ in desired}
+        target_ids = {target_id for _, target_id in desired}
+        stored = {
+            (vote.user_id, getattr(vote, target_field)): vote
+            for vote in Vote.objects.select_for_update().filter(
+                user_id__in=user_ids, **{f'{target_field}__in': target_ids}
+            )
+        }
+
+        to_create, to_delete = [], []
+        to_change = {'upvote': [], 'downvote': []}
+        deltas = {}
+        for (user_id, target_id), vote_type in desired.items():
+            existing = stored.get((user_id, target_id))
+            stored_type = existing.vote_type if existing else None
+            if stored_type == vote_type:
+                continue
+            deltas[target_id] = deltas.get(target_id, 0) + vote_value(vote_type) - vote_value(stored_type)
+            if existing is None:
+                to_create.append(Vote(user_id=user_id, vote_type=vote_type, **{target_field: target_id}))
+            elif vote_type is None:
+                to_delete.append(existing.id)
+            else:
+                to_change[vote_type].append(existing.id)
+
+        if to_delete:
+            Vote.objects.filter(id__in=to_delete).delete()
+        for vote_type, ids in to_change.items():
+            if ids:
+                Vote.objects.filter(id__in=ids).update(vote_type=vote_type)
+        if to_create:
+            Vote.objects.bulk_create(to_create)
+        apply_vote_deltas(model, deltas)
+        if model is Thread:
+            bump_hot_scores(deltas)
+            publish_vote_deltas(thread_deltas=deltas)
+        else:
+            publish_vote_deltas(post_deltas=deltas)
+
+    def start_flusher(self):
+        """Start the background flush thread of this process once."""
+        if self._flusher is not None:
+            return
+        with self._flusher_lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(
+                    target=self._flush_forever, name='vote-buffer-flusher', daemon=True
+                )
+                self._flusher.start()
+
+    def _flush_forever(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Flushing the vote buffer failed; pending votes are kept')
+            finally:
+                close_old_connections()
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_vote_buffer():
+    """Return the process-wide buffer, flushing votes left over by a crash on first use."""
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                buffer = VoteBuffer(
+                    getattr(settings, 'FORUM_VOTE_BUFFER_PATH', settings.BASE_DIR / 'vote_buffer.sqlite3'),
+                    getattr(settings, 'FORUM_VOTE_FLUSH_INTERVAL', 5.0),
+                )
+                buffer.start_flusher()
+                _buffer = buffer
+    return _buffer
+
+
+def _buffered_vote(user, kind, target, owner_id, vote_type):
+    if owner_id == user.id:
+        return False, f"You cannot vote on your own {kind}", target.vote_count(), None
+    buffer = get_vote_buffer()
+    message, current_user_vote = buffer.vote(user, kind, target.id, vote_type)
+    vote_count = target.vote_count() + buffer.pending_delta(kind, target.id)
+    return True, message, vote_count, current_user_vote
+
+
+def buffered_vote_on_thread(user, thread_id, vote_type):
+    """Buffered counterpart of ``vote_on_thread`` with the same return value."""
+    try:
+        thread = Thread.objects.only('id', 'author_id', 'vote_count_cache').get(id=thread_id)
+    except Thread.DoesNotExist:
+        return False, "Thread not found", 0, None
+    return _buffered_vote(user, 'thread', thread, thread.author_id, vote_type)
+
+
+def buffered_vote_on_post(user, post_id, vote_type):
+    """Buffered counterpart of ``vote_on_post`` with the same return value."""
+    try:
+        post = Post.objects.only('id', 'user_id', 'vote_count_cache').get(id=post_id)
+    except Post.DoesNotExist:
+        return False, "Post not found", 0, None
+    return _buffered_vote(user, 'post', post, post.user_id, vote_type)
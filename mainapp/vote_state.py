@@ -0,0 +1,149 @@
+from django.db.models import Q
+from .post import Thread, Post, Vote
+from . import vote_buffer
+
+
+class VoteStateResolver:
+    """
+    Resolve the requesting user's vote state for many threads and posts.
+
+    Objects are registered with ``add`` before serialization; the first
+    lookup loads every matching ``Vote`` row of the user in one query.
+    Serializers read from the resolver through ``context['vote_state']``.
+    Objects that were never registered fall back to a per-object query,
+    so a missing registration costs performance, never correctness.
+
+    With the write-behind vote buffer enabled, votes still waiting to be
+    flushed are overlaid on both the user's votes and the vote counts.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.user_id = user.id if user and user.is_authenticated else None
+        self._thread_ids = set()
+        self._post_ids = set()
+        # Threads whose posts are all covered, e.g. a thread detail
+        self._post_thread_ids = set()
+        self._thread_votes = None
+        self._post_votes = None
+        # Buffered state is read for the registered targets only
+        self._buffer_targets = set()
+        self._buffer_loaded = set()
+        self._buffered = ({}, {})
+
+    def add(self, objects, include_posts=False):
+        """Register a Thread, a Post or an iterable of them."""
+        if isinstance(objects, (Thread, Post)):
+            objects = [objects]
+        for obj in objects:
+            if isinstance(obj, Thread):
+                self._thread_ids.add(obj.id)
+                self._buffer_targets.add(('thread', obj.id))
+                if include_posts:
+                    self._post_thread_ids.add(obj.id)
+                    if 'posts' in getattr(obj, '_prefetched_objects_cache', {}):
+                        self._buffer_targets.update(('post', post.id) for post in obj.posts.all())
+            elif isinstance(obj, Post):
+                self._post_ids.add(obj.id)
+                self._buffer_targets.add(('post', obj.id))
+        self._thread_votes = None
+        self._post_votes = None
+
+    def _load(self):
+        self._thread_votes = {}
+        self._post_votes = {}
+        if self.user_id is None:
+            return
+
+        condition = Q()
+        if self._thread_ids:
+            condition |= Q(thread_id__in=self._thread_ids)
+        if self._post_ids:
+            condition |= Q(post_id__in=self._post_ids)
+        if self._post_thread_ids:
+            condition |= Q(post__thread_id__in=self._post_thread_ids)
+        if not condition:
+            return
+
+        votes = Vote.objects.filter(condition, user_id=self.user_id).values_list(
+            'thread_id', 'post_id', 'vote_type'
+        )
+        for thread_id, post_id, vote_type in votes:
+            if thread_id is not None:
+                self._thread_votes[thread_id] = vote_type
+            if post_id is not None:
+                self._post_votes[post_id] = vote_type
+
+    def _covers(self, obj):
+        if isinstance(obj, Thread):
+            return obj.id in self._thread_ids
+        return obj.id in self._post_ids or obj.thread_id in self._post_thread_ids
+
+    @staticmethod
+    def _key(obj):
+        return ('thread' if isinstance(obj, Thread) else 'post', obj.id)
+
+    def _buffered_state(self, obj):
+        """Buffered state covering ``obj``, read together with every target registered since."""
+        key = self._key(obj)
+        if vote_buffer.is_enabled() and key not in self._buffer_loaded:
+            pending = (self._buffer_targets | {key}) - self._buffer_loaded
+            deltas, votes = vote_buffer.get_vote_buffer().snapshot(self.user_id, pending)
+            self._buffered[0].update(deltas)
+            self._buffered[1].update(votes)
+            self._buffer_loaded |= pending
+        return self._buffered
+
+    def vote_count(self, obj):
+        """Return the net vote count including votes not flushed yet."""
+        deltas, _ = self._buffered_state(obj)
+        return obj.vote_count() + deltas.get(self._key(obj), 0)
+
+    def user_vote(self, obj):
+        """Return 'upvote', 'downvote' or None for the given thread or post."""
+        if self.user_id is None:
+            return None
+        _, buffered_votes = self._buffered_state(obj)
+        if self._key(obj) in buffered_votes:
+            return buffered_votes[self._key(obj)]
+        if not self._covers(obj):
+            return obj.get_user_vote(self.user)
+        if self._thread_votes is None:
+            self._load()
+        if isinstance(obj, Thread):
+            return self._thread_votes.get(obj.id)
+        return self._post_votes.get(obj.id)
+
+    def can_vote(self, obj):
+        """Users may vote on anything except their own threads and posts."""
+        if self.user_id is None:
+            return False
+        if isinstance(obj, Thread):
+            return obj.author_id != self.user_id
+        return obj.user_id != self.user_id
+
+
+class VoteStateMixin:
+    """
+    Provide a per-request ``VoteStateResolver`` to serializers.
+
+    Every instance passed to ``get_serializer`` is registered with the
+    resolver. Set ``vote_state_include_posts`` on views whose serializer
+    nests the posts of each thread.
+    """
+    vote_state_include_posts = False
+
+    def get_vote_state(self):
+        if not hasattr(self, '_vote_state'):
+            self._vote_state = VoteStateResolver(self.request.user)
+        return self._vote_state
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['vote_state'] = self.get_vote_state()
+        return context
+
+    def get_serializer(self, *args, **kwargs):
+        if args and args[0] is not None:
+            self.get_vote_state().add(args[0], include_posts=self.vote_state_include_posts)
+        return super().get_serializer(*args, **kwargs)
@@ -293,4 +293,33 @@ CORS_ALLOW_HEADERS = [
 CORS_ALLOW_CREDENTIALS = True
 
 # Optional: Allow all origins during development (not recommended for production)
-# CORS_ALLOW_ALL_ORIGINS = True  # Use only in development!
\ No newline at end of file
+# CORS_ALLOW_ALL_ORIGINS = True  # Use only in development!
+# Forum votes: buffer votes in a local SQLite file and flush them in bulk
+# every FORUM_VOTE_FLUSH_INTERVAL seconds. Buffered votes are per host.
+FORUM_VOTE_WRITE_BEHIND = False
+FORUM_VOTE_BUFFER_PATH = BASE_DIR / 'vote_buffer.sqlite3'
+FORUM_VOTE_FLUSH_INTERVAL = 5
+
+# Forum trending: hot scores halve every FORUM_HOT_HALF_LIFE_HOURS; run the
+# decay_hot_scores command periodically to keep the ranking current.
+FORUM_HOT_HALF_LIFE_HOURS = 24
+
+# Forum live updates: LocalBackend serves a single ASGI process; use
+# 'mainapp.live.RedisBackend' with {'url': ...} options across processes.
+FORUM_LIVE_BACKEND = 'mainapp.live.LocalBackend'
+FORUM_LIVE_BACKEND_OPTIONS = {}
+
+# Forum email import: mailbox read by the import_emails command, fetched in
+# UID batches of FORUM_EMAIL_BATCH_SIZE and parsed by a worker pool. The
+# mailbox credentials are read from the environment only.
+FORUM_EMAIL_IMAP_HOST = 'imap.gmail.com'
+FORUM_EMAIL_IMAP_PORT = 993
+FORUM_EMAIL_IMAP_USER = os.environ.get('FORUM_EMAIL_IMAP_USER', '')
+FORUM_EMAIL_IMAP_PASSWORD = os.environ.get('FORUM_EMAIL_IMAP_PASSWORD', '')
+FORUM_EMAIL_BATCH_SIZE = 50
+FORUM_EMAIL_PARSE_WORKERS = 4
+
+# Calendar feeds: tombstones of deleted events are kept this many days for
+# incremental (sync token) feed requests; prune them with the
+# prune_event_tombstones command.
+CALENDAR_FEED_TOMBSTONE_DAYS = 30
@@ -0,0 +1,87 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from tests.base import BaseAPITestCase
+from tests.factories import UserFactory, LecturerFactory, ThreadFactory, PostFactory
+from mainapp.models import Thread, Post
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def author_queries(queries, user_id):
+    """Queries reading users other than the authenticated requester"""
+    return [
+        q for q in queries
+        if '"accounts_user"' in q['sql'] and f'"accounts_user"."id" = {user_id} ' not in q['sql']
+    ]
+
+
+class TestAuthorCards(BaseAPITestCase):
+    """Tests for the cached author cards of forum serializers"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.student = UserFactory(first_name='Anna', last_name='Nowak')
+        self.student.profile_picture = 'profile_pictures/1/anna.jpg'
+        self.student.profile_thumbnail = 'profile_pictures/1/thumbnails/anna.jpg'
+        self.student.save()
+        self.lecturer = LecturerFactory(first_name='Jan', last_name='Kowalski')
+        self.thread = ThreadFactory(author=self.student, is_anonymous=False)
+        PostFactory(thread=self.thread, user=self.lecturer, is_anonymous=False)
+        ThreadFactory(author=self.lecturer)
+        # Content without author snapshots falls back to the cards
+        Thread.objects.update(author_snapshot=None)
+        Post.objects.update(author_snapshot=None)
+        self.list_url = reverse('mainapp:thread-list-create')
+        self.detail_url = reverse('mainapp:thread-detail', kwargs={'pk': self.thread.id})
+
+    @BaseAPITestCase.doc
+    def test_cards_are_batched_and_match_author_fields(self):
+        """
+        Test author card serialization
+
+        Verifies:
+        - Display names and absolute avatar URLs are served from the cards
+        - All authors of a page are loaded in one query, without joins
+        """
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.list_url)
+        self.assertEqual(len(author_queries(ctx.captured_queries, self.test_user.id)), 1)
+
+        threads = {item['id']: item for item in response.data['results']}
+        item = threads[self.thread.id]
+        self.assertEqual(item['author_display_name'], f'Anna Nowak {self.student.login}')
+        self.assertEqual(item['author_profile_picture'], 'http://localhost:8000/media/profile_pictures/1/anna.jpg')
+        self.assertEqual(
+            item['author_profile_thumbnail'], 'http://localhost:8000/media/profile_pictures/1/thumbnails/anna.jpg'
+        )
+
+        post = self.client.get(self.detail_url).data['posts'][0]
+        self.assertEqual(post['user_display_name'], 'Jan Kowalski')
+        self.assertIsNone(post['author_profile_picture'])
+
+    @override_settings(CACHES=LOCMEM_CACHE)
+    @BaseAPITestCase.doc
+    def test_cached_cards_are_invalidated_on_profile_change(self):
+        """
+        Test author card caching
+
+        Verifies:
+        - Cached cards are served without reading users
+        - Saving a user refreshes their card
+        """
+        cache.clear()
+        self.client.get(self.list_url)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(self.list_url)
+        self.assertEqual(author_queries(ctx.captured_queries, self.test_user.id), [])
+
+        self.student.first_name = 'Maria'
+        self.student.profile_picture = None
+        self.student.save()
+        threads = {item['id']: item for item in self.client.get(self.list_url).data['results']}
+        self.assertEqual(threads[self.thread.id]['author_display_name'], f'Maria Nowak {self.student.login}')
+        self.assertIsNone(threads[self.thread.id]['author_profile_picture'])
@@ -0,0 +1,108 @@
+from datetime import timedelta
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from tests.base import BaseAPITestCase
+from tests.factories import UserFactory, ThreadFactory, PostFactory
+from mainapp.models import Thread, Post, AuthorSnapshotSync
+from mainapp.author_cards import build_author_card
+from mainapp.author_snapshots import get_sync_lag, request_sync, sync_author_snapshots
+
+
+class TestAuthorSnapshots(BaseAPITestCase):
+    """Tests for the denormalized author snapshots of threads and posts"""
+
+    def setUp(self):
+        super().setUp()
+        self.author = UserFactory(first_name='Anna', last_name='Nowak', role='lecturer')
+        self.thread = ThreadFactory(author=self.author, is_anonymous=False)
+        self.post = PostFactory(thread=self.thread, user=self.author, is_anonymous=False)
+        AuthorSnapshotSync.objects.all().delete()
+
+    @BaseAPITestCase.doc
+    def test_rendering_uses_snapshots_without_reading_users(self):
+        """
+        Test snapshot rendering
+
+        Verifies:
+        - New threads and posts store their author's card
+        - The list and detail endpoints read no author rows
+        """
+        self.assertEqual(Thread.objects.get(id=self.thread.id).author_snapshot['display_name'], 'Anna Nowak')
+        self.assertEqual(Post.objects.get(id=self.post.id).author_snapshot['role'], 'lecturer')
+
+        for url in (reverse('mainapp:thread-list-create'),
+                    reverse('mainapp:thread-detail', kwargs={'pk': self.thread.id})):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse([
+                q for q in ctx.captured_queries
+                if '"accounts_user"' in q['sql'] and f'"accounts_user"."id" = {self.test_user.id} ' not in q['sql']
+            ])
+
+        detail = self.client.get(reverse('mainapp:thread-detail', kwargs={'pk': self.thread.id})).data
+        self.assertEqual(detail['author_display_name'], 'Anna Nowak')
+        self.assertEqual(detail['posts'][0]['user_display_name'], 'Anna Nowak')
+
+    @BaseAPITestCase.doc
+    def test_profile_changes_are_synced_in_bulk(self):
+        """
+        Test the snapshot sync job
+
+        Verifies:
+        - Saving a profile queues the user, logins do not
+        - The job rewrites every thread and post of the user and reports its lag
+        """
+        self.author.last_login = timezone.now()
+        self.author.save(update_fields=['last_login'])
+        self.assertFalse(AuthorSnapshotSync.objects.exists())
+
+        self.author.first_name = 'Maria'
+        self.author.save()
+        self.author.last_name = 'Kowalska'
+        self.author.save()
+        sync = AuthorSnapshotSync.objects.get(user=self.author)
+        self.assertEqual(sync.version, 2)
+        AuthorSnapshotSync.objects.filter(user=self.author).update(
+            requested_at=timezone.now() - timedelta(seconds=30)
+        )
+        self.assertGreaterEqual(get_sync_lag(), 30)
+
+        totals = sync_author_snapshots()
+        self.assertEqual(totals['users'], 1)
+        self.assertEqual(totals['rows'], 2)
+        self.assertGreaterEqual(totals['max_lag'], 30)
+        self.assertEqual(get_sync_lag(), 0)
+        self.assertEqual(Thread.objects.get(id=self.thread.id).author_snapshot['display_name'], 'Maria Kowalska')
+        self.assertEqual(Post.objects.get(id=self.post.id).author_snapshot['display_name'], 'Maria Kowalska')
+
+    @BaseAPITestCase.doc
+    def test_change_during_sync_stays_queued(self):
+        """
+        Test sync races
+
+        Verifies:
+        - A change saved while its user is being synced is synced again
+        """
+        self.author.first_name = 'Maria'
+        self.author.save()
+        calls = []
+
+        def build_during_concurrent_save(user):
+            if not calls:
+                # Another request saves the profile right after the job read it
+                get_user_model().objects.filter(id=user.id).update(first_name='Zofia')
+                request_sync([user.id])
+            calls.append(user.id)
+            return build_author_card(user)
+
+        with mock.patch('mainapp.author_snapshots.build_author_card', side_effect=build_during_concurrent_save):
+            totals = sync_author_snapshots()
+
+        self.assertEqual(totals['users'], 2)
+        self.assertFalse(AuthorSnapshotSync.objects.exists())
+        self.assertEqual(Thread.objects.get(id=self.thread.id).author_snapshot['display_name'], 'Zofia Nowak')
@@ -0,0 +1,149 @@
+from datetime import date, datetime, timedelta
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from tests.base import BaseAPITestCase
+from tests.factories import UserFactory, LecturerFactory, EventFactory
+from mainapp.models import AppliedPlan, Event, SchedulePlan
+
+
+def at(*args):
+    return timezone.make_aware(datetime(*args))
+
+
+class TestCalendarFeed(BaseAPITestCase):
+    """Tests for the iCalendar feed export"""
+
+    def setUp(self):
+        super().setUp()
+        admin = LecturerFactory()
+        plan = SchedulePlan.objects.create(name='Semester', administrator=admin)
+        EventFactory(user=admin, schedule_plan=plan, title='Seminar', repeat_type='monthly', room='A1, 2',
+                     start_date=at(2024, 9, 10, 8), end_date=at(2024, 9, 10, 10))
+        AppliedPlan.objects.create(user=self.test_user, plan=plan, start_date=date(2024, 11, 1), end_date=date(2024, 12, 31))
+        self.lecture = EventFactory(user=self.test_user, title='Lecture', repeat_type='weekly',
+                                    start_date=at(2024, 10, 7, 8), end_date=at(2024, 10, 7, 10))
+        self.exam = EventFactory(user=self.test_user, title='Exam', repeat_type='none', description='x' * 200,
+                                 start_date=at(2024, 11, 20, 12), end_date=at(2024, 11, 20, 14))
+        EventFactory(user=UserFactory(), title='Foreign')
+        self.url = self.client.get(reverse('mainapp:event-feed')).data['url']
+        # Calendar apps poll without credentials
+        self.client.credentials()
+
+    def fetch(self, **extra):
+        response = self.client.get(self.url, **extra)
+        body = b''.join(response.streaming_content).decode() if response.status_code == 200 else ''
+        return response, body
+
+    @BaseAPITestCase.doc
+    def test_feed_exports_events_and_rules(self):
+        """
+        Test the feed content
+
+        Verifies:
+        - Own events and applied plan events are exported, others are not
+        - Repeat types become RRULEs, plan events are clipped to the application
+        - Lines are CRLF terminated, escaped and folded
+        - Unknown feed tokens are rejected
+        """
+        response, body = self.fetch()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/calendar'))
+        self.assertEqual(response['X-Sync-Mode'], 'full')
+        lines = body.split('\r\n')
+        self.assertEqual((lines[0], lines[-2]), ('BEGIN:VCALENDAR', 'END:VCALENDAR'))
+        self.assertTrue(all(len(line.encode()) <= 75 for line in lines))
+
+        self.assertIn('DTSTART:20241007T080000Z\r\nDTEND:20241007T100000Z\r\nRRULE:FREQ=WEEKLY\r\nSUMMARY:Lecture', body)
+        self.assertIn('DTSTART:20241112T080000Z', body)
+        self.assertIn('RRULE:FREQ=MONTHLY;BYDAY=2TU;UNTIL=20241231T235959Z', body)
+        self.assertIn('LOCATION:A1\\, 2', body)
+        self.assertIn('\r\n x', body)
+        self.assertNotIn('Foreign', body)
+
+        self.assertEqual(self.client.get(self.url.replace('/feed/', '/feed/x')).status_code, 404)
+
+    @BaseAPITestCase.doc
+    def test_recurring_events_use_local_time_outside_utc(self):
+        """
+        Test the feed in a time zone with DST
+
+        Verifies:
+        - Recurring events start in local time with a TZID
+        - BYDAY follows the local date, UNTIL stays in UTC
+        - A VTIMEZONE lists the DST changes, one-off events stay in UTC
+        """
+        # Mondays 23:30 UTC are Tuesdays 01:30 in Warsaw
+        EventFactory(user=self.test_user, title='Late', repeat_type='monthly',
+                     start_date=at(2024, 10, 7, 23, 30), end_date=at(2024, 10, 8, 0, 30))
+        with override_settings(TIME_ZONE='Europe/Warsaw'):
+            body = self.fetch()[1]
+
+        self.assertIn('DTSTART;TZID=Europe/Warsaw:20241007T100000\r\nDTEND;TZID=Europe/Warsaw:20241007T120000\r\n'
+                      'RRULE:FREQ=WEEKLY\r\nSUMMARY:Lecture', body)
+        self.assertIn('DTSTART;TZID=Europe/Warsaw:20241008T013000', body)
+        self.assertIn('RRULE:FREQ=MONTHLY;BYDAY=2TU\r\n', body)
+        # Plan applications end at local midnight
+        self.assertIn('RRULE:FREQ=MONTHLY;BYDAY=2TU;UNTIL=20241231T225959Z', body)
+        self.assertIn('DTSTART:20241120T120000Z', body)
+
+        vtimezone = body[body.index('BEGIN:VTIMEZONE'):body.index('END:VTIMEZONE')]
+        self.assertLess(body.index('END:VTIMEZONE'), body.index('BEGIN:VEVENT'))
+        self.assertIn('TZID:Europe/Warsaw', vtimezone)
+        self.assertIn('BEGIN:DAYLIGHT\r\nDTSTART:20240331T020000', vtimezone)
+        self.assertIn('TZOFFSETFROM:+0100\r\nTZOFFSETTO:+0200', vtimezone)
+        self.assertIn('BEGIN:STANDARD\r\nDTSTART:20241027T030000', vtimezone)
+
+    @BaseAPITestCase.doc
+    def test_polling_costs_a_304_or_a_delta(self):
+        """
+        Test incremental feed requests
+
+        Verifies:
+        - A current ETag is answered with 304
+        - Edits change the ETag
+        - A sync token returns only changed events and cancellations
+        """
+        response, body = self.fetch()
+        self.assertEqual(self.fetch(HTTP_IF_NONE_MATCH=response['ETag'])[0].status_code, 304)
+
+        Event.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        response, body = self.fetch()
+        token = response['X-Sync-Token']
+
+        self.lecture.title = 'Moved lecture'
+        self.lecture.save()
+        exam_id = self.exam.id
+        self.exam.delete()
+        self.assertEqual(self.fetch(HTTP_IF_NONE_MATCH=response['ETag'])[0].status_code, 200)
+
+        response = self.client.get(self.url, {'sync_token': token})
+        body = b''.join(response.streaming_content).decode()
+        self.assertEqual(response['X-Sync-Mode'], 'delta')
+        self.assertEqual(body.count('BEGIN:VEVENT'), 2)
+        self.assertIn('SUMMARY:Moved lecture', body)
+        self.assertIn(f'UID:event-{exam_id}@testserver\r\nDTSTAMP', body)
+        self.assertIn('STATUS:CANCELLED', body)
+        self.assertNotIn('Seminar', body)
+
+        response = self.client.get(self.url, {'sync_token': 'stale'})
+        self.assertEqual(response['X-Sync-Mode'], 'full')
+
+    @BaseAPITestCase.doc
+    def test_rotating_the_feed_revokes_old_urls(self):
+        """
+        Test feed URL rotation
+
+        Verifies:
+        - Issuing the URL again keeps the current one valid
+        - Rotating returns a working URL and revokes the previous one
+        """
+        self.authenticate()
+        feed_url = reverse('mainapp:event-feed')
+        self.assertEqual(self.client.get(feed_url).data['url'], self.url)
+
+        new_url = self.client.post(feed_url).data['url']
+        self.client.credentials()
+        self.assertNotEqual(new_url, self.url)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.assertEqual(self.client.get(new_url).status_code, 200)
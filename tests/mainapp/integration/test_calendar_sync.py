@@ -0,0 +1,93 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from tests.base import BaseAPITestCase
+from tests.factories import EventFactory
+from mainapp.models import Event, SchedulePlan
+
+
+def event_writes(queries):
+    return [
+        q['sql'] for q in queries
+        if '"mainapp_event"' in q['sql'] and q['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))
+    ]
+
+
+class TestCalendarSync(BaseAPITestCase):
+    """Tests for the diff-based save_calendar sync"""
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('mainapp:save-calendar')
+        self.rows = [
+            {'client_id': f'tmp-{day}', 'title': f'Event {day}', 'category': 'exam',
+             'start_date': f'2024-11-{day:02d}T10:00:00Z', 'end_date': f'2024-11-{day:02d}T12:00:00Z'}
+            for day in (4, 5, 6)
+        ]
+
+    def sync(self, rows, revision=None):
+        data = {'events': rows}
+        if revision is not None:
+            data['revision'] = revision
+        return self.client.post(self.url, data, format='json')
+
+    @BaseAPITestCase.doc
+    def test_only_changes_are_written(self):
+        """
+        Test calendar diffs
+
+        Verifies:
+        - New events are created in bulk and mapped to their client ids
+        - Resending an unchanged calendar, with or without ids, writes nothing
+        - Edits, removals and additions touch only the affected rows
+        """
+        response = self.sync(self.rows)
+        self.assertEqual(response.status_code, 200)
+        created = {item['client_id']: item for item in response.data['created']}
+        self.assertEqual(set(created), {'tmp-4', 'tmp-5', 'tmp-6'})
+        self.assertEqual(created['tmp-4']['color'], Event.objects.get(id=created['tmp-4']['id']).color)
+        rows = [{**row, 'id': created[row['client_id']]['id']} for row in self.rows]
+
+        for unchanged in (rows, self.rows):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.sync(unchanged)
+            self.assertEqual(event_writes(ctx.captured_queries), [])
+            self.assertEqual((response.data['created'], response.data['updated'], response.data['deleted']), ([], [], []))
+
+        rows[0]['title'] = 'Moved'
+        new_row = {'title': 'New', 'start_date': '2024-11-08T10:00:00Z', 'end_date': '2024-11-08T11:00:00Z'}
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.sync([rows[0], rows[1], new_row])
+        self.assertEqual(len(event_writes(ctx.captured_queries)), 3)
+        self.assertEqual([item['title'] for item in response.data['updated']], ['Moved'])
+        self.assertEqual([item['title'] for item in response.data['created']], ['New'])
+        self.assertEqual(response.data['deleted'], [rows[2]['id']])
+        self.assertEqual(
+            set(Event.objects.filter(user=self.test_user).values_list('title', flat=True)), {'Moved', 'Event 5', 'New'}
+        )
+        self.assertTrue(Event.objects.filter(id=rows[1]['id']).exists())
+
+    @BaseAPITestCase.doc
+    def test_conflicts_and_invalid_rows_change_nothing(self):
+        """
+        Test sync guards
+
+        Verifies:
+        - A stale revision is answered with 409
+        - Invalid rows are reported without writing anything
+        - Events of schedule plans are not part of the calendar
+        """
+        plan = SchedulePlan.objects.create(name='Plan', administrator=self.test_user)
+        plan_event = EventFactory(user=self.test_user, schedule_plan=plan)
+        first = self.sync(self.rows)
+        revision = first.data['revision']
+
+        self.assertEqual(self.sync(self.rows, revision).status_code, 200)
+        EventFactory(user=self.test_user)
+        self.assertEqual(self.sync([], revision).status_code, 409)
+
+        invalid = dict(self.rows[0], end_date='2024-11-04T09:00:00Z')
+        response = self.sync([invalid])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Event.objects.filter(user=self.test_user, schedule_plan__isnull=True).count(), 4)
+        self.assertTrue(Event.objects.filter(id=plan_event.id).exists())
@@ -0,0 +1,80 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from tests.base import BaseAPITestCase
+from mainapp.constants import CATEGORY_COLORS
+from mainapp.models import Event, SchedulePlan
+
+
+class TestEventBulkCreate(BaseAPITestCase):
+    """Tests for the bulk insert path of events/bulk/"""
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('mainapp:event-bulk-create')
+        self.plan = SchedulePlan.objects.create(name='Plan', administrator=self.test_user)
+
+    def row(self, day, **extra):
+        return {
+            'title': f'Class {day}', 'category': 'exam', 'schedule_plan': self.plan.id,
+            'start_date': f'2024-11-{day:02d}T08:00:00Z', 'end_date': f'2024-11-{day:02d}T10:00:00Z', **extra,
+        }
+
+    @BaseAPITestCase.doc
+    def test_valid_rows_are_inserted_at_once(self):
+        """
+        Test bulk inserts
+
+        Verifies:
+        - All events are written with a single INSERT
+        - Plans are checked with one query for the whole batch
+        - Colors are derived from the categories
+        """
+        rows = [self.row(day) for day in range(1, 29)]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(self.url, rows, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 28)
+
+        queries = [q['sql'] for q in ctx.captured_queries]
+        self.assertEqual(len([sql for sql in queries if sql.startswith('INSERT INTO "mainapp_event"')]), 1)
+        self.assertEqual(len([sql for sql in queries if '"mainapp_scheduleplan"' in sql]), 1)
+        self.assertEqual(
+            set(Event.objects.filter(schedule_plan=self.plan).values_list('color', flat=True)), {CATEGORY_COLORS['exam']}
+        )
+
+    @BaseAPITestCase.doc
+    def test_invalid_rows_are_reported_in_place(self):
+        """
+        Test per-row errors
+
+        Verifies:
+        - Invalid rows get their errors at their position in the response
+        - By default any invalid row rejects the whole batch
+        - In partial mode the valid rows are still created (207)
+        - A batch without valid rows is rejected (400)
+        """
+        rows = [
+            self.row(1),
+            self.row(2, end_date='2024-11-01T10:00:00Z'),
+            self.row(3, schedule_plan=self.plan.id + 1000),
+            {key: value for key, value in self.row(4).items() if key != 'title'},
+            self.row(5),
+        ]
+        response = self.client.post(self.url, rows, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], None)
+        self.assertIn('end_date', response.data[1]['errors'])
+        self.assertFalse(Event.objects.filter(schedule_plan=self.plan).exists())
+
+        response = self.client.post(f'{self.url}?partial=true', rows, format='json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([item.get('title') for item in response.data], ['Class 1', None, None, None, 'Class 5'])
+        self.assertIn('end_date', response.data[1]['errors'])
+        self.assertIn('schedule_plan', response.data[2]['errors'])
+        self.assertIn('title', response.data[3]['errors'])
+        self.assertEqual(Event.objects.filter(schedule_plan=self.plan).count(), 2)
+
+        response = self.client.post(f'{self.url}?partial=true', rows[1:4], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Event.objects.filter(schedule_plan=self.plan).count(), 2)
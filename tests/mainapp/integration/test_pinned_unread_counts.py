@@ -0,0 +1,101 @@
+from datetime import timedelta
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from tests.base import BaseAPITestCase
+from tests.factories import ThreadFactory, PostFactory
+from mainapp.models import PinnedThread
+
+
+class TestPinnedThreadUnreadCounts(BaseAPITestCase):
+    """Tests for the pinned thread listing"""
+
+    def _pin(self, posts_before, posts_after):
+        thread = ThreadFactory()
+        PostFactory.create_batch(posts_before, thread=thread)
+        pinned = PinnedThread.objects.create(user=self.test_user, thread=thread)
+        PinnedThread.objects.filter(id=pinned.id).update(last_viewed=timezone.now())
+        PostFactory.create_batch(posts_after, thread=thread)
+        return thread
+
+    def _list(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('mainapp:get-pinned-threads'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(ctx.captured_queries), response.json()
+
+    @BaseAPITestCase.doc
+    def test_unread_counts_and_compact_threads(self):
+        """
+        Test pinned listing payload
+
+        Verifies:
+        - Unread counts only include posts newer than last_viewed
+        - Threads are returned as compact summaries without posts
+        """
+        quiet = self._pin(posts_before=3, posts_after=0)
+        busy = self._pin(posts_before=2, posts_after=4)
+
+        _, data = self._list()
+        by_thread = {pin['thread']: pin for pin in data}
+
+        self.assertEqual(by_thread[quiet.id]['unread_count'], 0)
+        self.assertEqual(by_thread[busy.id]['unread_count'], 4)
+        self.assertNotIn('posts', by_thread[busy.id]['thread_data'])
+        self.assertEqual(by_thread[busy.id]['thread_data']['post_count'], 6)
+
+    @BaseAPITestCase.doc
+    def test_query_count_independent_of_pins_and_posts(self):
+        """
+        Test pinned listing cost
+
+        Verifies:
+        - Adding pins and posts does not add queries
+        """
+        self._pin(posts_before=1, posts_after=1)
+        self._list()
+        baseline, _ = self._list()
+
+        for _ in range(4):
+            self._pin(posts_before=3, posts_after=5)
+        queries, data = self._list()
+
+        self.assertEqual(len(data), 5)
+        self.assertEqual(queries, baseline)
+
+    @BaseAPITestCase.doc
+    def test_mark_as_viewed_resets_unread_count(self):
+        """
+        Test viewing a pinned thread
+
+        Verifies:
+        - Unread count drops to zero after marking the thread as viewed
+        """
+        thread = self._pin(posts_before=0, posts_after=2)
+        PinnedThread.objects.filter(thread=thread).update(last_viewed=timezone.now() - timedelta(days=1))
+
+        self.client.post(reverse('mainapp:mark-thread-viewed', kwargs={'thread_id': thread.id}))
+
+        _, data = self._list()
+        self.assertEqual(data[0]['unread_count'], 0)
+
+    @BaseAPITestCase.doc
+    def test_unread_counts_endpoint(self):
+        """
+        Test the polling endpoint for unread counts
+
+        Verifies:
+        - Counts are keyed by thread id and summed
+        """
+        first = self._pin(posts_before=1, posts_after=2)
+        second = self._pin(posts_before=0, posts_after=3)
+
+        response = self.client.get(reverse('mainapp:pinned-unread-counts'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {
+            'unread_counts': {str(first.id): 2, str(second.id): 3},
+            'total': 5,
+        })
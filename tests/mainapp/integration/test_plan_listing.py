@@ -0,0 +1,89 @@
+from datetime import date, timedelta, timezone as dt_timezone
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from tests.base import BaseAPITestCase
+from tests.factories import LecturerFactory, EventFactory
+from mainapp.models import AppliedPlan, SchedulePlan
+
+
+def plan_queries(queries):
+    return [q for q in queries if '"mainapp_' in q['sql']]
+
+
+class TestPlanListing(BaseAPITestCase):
+    """Tests for the batched state of listed schedule plans"""
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('mainapp:scheduleplan-list')
+        self.admin = LecturerFactory()
+
+    def create_plans(self, count):
+        plans = []
+        for index in range(count):
+            plan = SchedulePlan.objects.create(name=f'Plan {index}', administrator=LecturerFactory())
+            EventFactory(user=plan.administrator, schedule_plan=plan, repeat_type='weekly')
+            EventFactory(user=plan.administrator, schedule_plan=plan, repeat_type='none')
+            plans.append(plan)
+        return plans
+
+    def listed(self, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data['results'] if isinstance(response.data, dict) else response.data, ctx
+
+    @BaseAPITestCase.doc
+    def test_listing_has_a_fixed_query_count(self):
+        """
+        Test plan listing queries
+
+        Verifies:
+        - Applied state is read for all listed plans with one query
+        - Nested events are prefetched, summaries read plan events at once
+        - The query count does not grow with the number of plans
+        """
+        plans = self.create_plans(2)
+        AppliedPlan.objects.create(user=self.test_user, plan=plans[0], start_date=date.today())
+
+        counts = {}
+        for mode in ('full', 'summary'):
+            items, ctx = self.listed(events=mode)
+            counts[mode] = len(plan_queries(ctx.captured_queries))
+            self.assertEqual({item['id']: item['is_applied'] for item in items}, {plans[0].id: True, plans[1].id: False})
+
+        self.create_plans(6)
+        for mode in ('full', 'summary'):
+            items, ctx = self.listed(events=mode)
+            self.assertEqual(len(items), 8)
+            self.assertEqual(len(plan_queries(ctx.captured_queries)), counts[mode])
+        self.assertEqual(len([q for q in ctx.captured_queries if '"mainapp_appliedplan"' in q['sql']]), 1)
+
+    @BaseAPITestCase.doc
+    def test_events_summary(self):
+        """
+        Test the events summary mode
+
+        Verifies:
+        - Full mode nests the plan's events
+        - Summary mode counts the events and shows the next occurrence
+        """
+        plan = SchedulePlan.objects.create(name='Plan', administrator=self.admin)
+        start = timezone.now().replace(microsecond=0) - timedelta(days=20)
+        weekly = EventFactory(user=self.admin, schedule_plan=plan, title='Weekly', repeat_type='weekly',
+                              start_date=start, end_date=start + timedelta(hours=1))
+        EventFactory(user=self.admin, schedule_plan=plan, title='Past', repeat_type='none',
+                     start_date=start, end_date=start + timedelta(hours=1))
+
+        items, ctx = self.listed()
+        self.assertEqual({event['title'] for event in items[0]['events']}, {'Weekly', 'Past'})
+
+        items, ctx = self.listed(events='summary')
+        self.assertNotIn('events', items[0])
+        summary = items[0]['events_summary']
+        self.assertEqual((summary['count'], summary['recurring_count']), (2, 1))
+        self.assertEqual(summary['next_occurrence']['id'], weekly.id)
+        next_start = (start + timedelta(days=21)).astimezone(dt_timezone.utc)
+        self.assertEqual(summary['next_occurrence']['start_date'], next_start.strftime('%Y-%m-%dT%H:%M:%SZ'))
@@ -0,0 +1,84 @@
+from datetime import date, datetime
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from tests.base import BaseAPITestCase
+from tests.factories import UserFactory, LecturerFactory, EventFactory
+from mainapp.models import AppliedPlan, SchedulePlan
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def at(*args):
+    return timezone.make_aware(datetime(*args))
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class TestPlanOverlay(BaseAPITestCase):
+    """Tests for the overlay of applied schedule plans on calendars"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        admin = LecturerFactory()
+        self.plan = SchedulePlan.objects.create(name='Semester', administrator=admin)
+        self.lecture = EventFactory(user=admin, schedule_plan=self.plan, title='Lecture', repeat_type='weekly',
+                                    start_date=at(2024, 9, 2, 8), end_date=at(2024, 9, 2, 10))
+        EventFactory(user=admin, schedule_plan=self.plan, title='Exam', repeat_type='none',
+                     start_date=at(2024, 11, 20, 8), end_date=at(2024, 11, 20, 10))
+        AppliedPlan.objects.create(user=self.test_user, plan=self.plan,
+                                   start_date=date(2024, 11, 1), end_date=date(2024, 11, 11))
+        EventFactory(user=self.test_user, title='Own', repeat_type='none',
+                     start_date=at(2024, 11, 12, 8), end_date=at(2024, 11, 12, 9))
+        self.url = reverse('mainapp:event-occurrences')
+
+    def titles(self):
+        response = self.client.get(self.url, {'year': 2024, 'month': 11})
+        self.assertEqual(response.status_code, 200)
+        return [(item['title'], item['start_date'][:10]) for item in response.data]
+
+    @BaseAPITestCase.doc
+    def test_plans_are_merged_and_clipped(self):
+        """
+        Test the plan overlay
+
+        Verifies:
+        - Occurrences of applied plans are merged with the user's own events
+        - They are clipped to the dates of the application, end date included
+        - Inactive applications and plans are left out
+        """
+        self.assertEqual(self.titles(), [
+            ('Lecture', '2024-11-04'), ('Lecture', '2024-11-11'), ('Own', '2024-11-12'),
+        ])
+
+        AppliedPlan.objects.filter(plan=self.plan).update(is_active=False)
+        self.assertEqual(self.titles(), [('Own', '2024-11-12')])
+
+    @BaseAPITestCase.doc
+    def test_plan_events_are_cached_once_per_revision(self):
+        """
+        Test plan caching
+
+        Verifies:
+        - Subscribers of a plan share its cached events
+        - Changing a plan event serves the new revision to every subscriber
+        """
+        with CaptureQueriesContext(connection) as ctx:
+            self.titles()
+        self.assertEqual(len([q for q in ctx.captured_queries if 'schedule_plan_id" IN' in q['sql']]), 1)
+        other = UserFactory()
+        AppliedPlan.objects.create(user=other, plan=self.plan, start_date=date(2024, 11, 1), end_date=date(2024, 11, 30))
+        self.authenticate(other)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual([title for title, day in self.titles()], ['Lecture'] * 3 + ['Exam', 'Lecture'])
+        self.assertFalse([q for q in ctx.captured_queries if 'schedule_plan_id" IN' in q['sql']])
+
+        self.lecture.title = 'Seminar'
+        self.lecture.save()
+        self.assertEqual(self.titles()[0], ('Seminar', '2024-11-04'))
+        self.authenticate(self.test_user)
+        self.assertEqual(self.titles()[0], ('Seminar', '2024-11-04'))
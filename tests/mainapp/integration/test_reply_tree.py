@@ -0,0 +1,118 @@
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from tests.base import BaseAPITestCase
+from tests.factories import ThreadFactory, PostFactory
+from mainapp.reply_tree import build_reply_tree
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class TestReplyTree(BaseAPITestCase):
+    """Tests for the reply-tree endpoint of a thread"""
+
+    def setUp(self):
+        super().setUp()
+        self.thread = ThreadFactory()
+
+    @BaseAPITestCase.doc
+    def test_graph_is_assembled_from_two_queries(self):
+        """
+        Test reply graph assembly
+
+        Verifies:
+        - Roots, replies and replying_to lists follow the reply links
+        - Posts replying to several others appear under each of them
+        - A deep, cross-referenced thread is built with two queries
+        """
+        root = PostFactory(thread=self.thread)
+        chain = [root]
+        for _ in range(20):
+            post = PostFactory(thread=self.thread)
+            post.replying_to.set([chain[-1], root])
+            chain.append(post)
+        other_root = PostFactory(thread=self.thread)
+
+        with self.assertNumQueries(2):
+            tree = build_reply_tree(self.thread.id)
+
+        nodes = {node['id']: node for node in tree['posts']}
+        self.assertEqual(tree['roots'], [root.id, other_root.id])
+        self.assertEqual(nodes[chain[1].id]['replying_to'], [root.id])
+        self.assertEqual(nodes[chain[5].id]['replying_to'], [root.id, chain[4].id])
+        self.assertEqual(nodes[root.id]['replies'], [post.id for post in chain[1:]])
+        self.assertEqual(nodes[chain[-1].id]['replies'], [])
+
+    @BaseAPITestCase.doc
+    def test_unknown_thread_returns_404(self):
+        """
+        Test missing threads
+
+        Verifies:
+        - The endpoint answers 404 for a thread that does not exist
+        """
+        url = reverse('mainapp:thread-reply-tree', kwargs={'thread_id': self.thread.id + 1000})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(CACHES=LOCMEM_CACHE)
+    @BaseAPITestCase.doc
+    def test_cached_tree_is_invalidated_by_post_changes(self):
+        """
+        Test reply tree caching
+
+        Verifies:
+        - A repeated request does not query posts again
+        - Adding a reply, editing a post and deleting a post refresh the tree
+        """
+        from django.core.cache import cache
+        cache.clear()
+        url = reverse('mainapp:thread-reply-tree', kwargs={'thread_id': self.thread.id})
+        root = PostFactory(thread=self.thread)
+
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(any('"mainapp_post"' in q['sql'] for q in ctx.captured_queries))
+
+        reply = PostFactory(thread=self.thread)
+        reply.replying_to.add(root)
+        tree = self.client.get(url).json()
+        self.assertEqual(tree['posts'][0]['replies'], [reply.id])
+
+        root.content = 'Edited content'
+        root.save()
+        self.assertEqual(self.client.get(url).json()['posts'][0]['content'], 'Edited content')
+
+        reply.delete()
+        tree = self.client.get(url).json()
+        self.assertEqual([node['id'] for node in tree['posts']], [root.id])
+        self.assertEqual(tree['posts'][0]['replies'], [])
+
+    @override_settings(CACHES=LOCMEM_CACHE)
+    @BaseAPITestCase.doc
+    def test_cached_tree_shows_current_authors(self):
+        """
+        Test author data of a cached reply tree
+
+        Verifies:
+        - Author names are not part of the cached graph
+        - A profile change shows up without rebuilding the tree
+        """
+        from django.core.cache import cache
+        cache.clear()
+        url = reverse('mainapp:thread-reply-tree', kwargs={'thread_id': self.thread.id})
+        post = PostFactory(thread=self.thread, is_anonymous=False)
+        self.client.get(url)
+
+        author = post.user
+        author.first_name = 'Renamed'
+        author.save()
+        with CaptureQueriesContext(connection) as ctx:
+            node = self.client.get(url).json()['posts'][0]
+        self.assertFalse(any('"mainapp_post"' in q['sql'] for q in ctx.captured_queries))
+        self.assertTrue(node['user_display_name'].startswith('Renamed '))
+        self.assertNotIn('user_display_name', build_reply_tree(self.thread.id)['posts'][0])
@@ -0,0 +1,135 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from tests.base import BaseAPITestCase
+from tests.factories import UserFactory, ThreadFactory, PostFactory, VoteFactory
+from mainapp.models import Post, Vote
+from mainapp.author_snapshots import sync_author_snapshots
+
+
+class TestThreadConditionalGet(BaseAPITestCase):
+    """Tests for ETag handling of the thread list and detail endpoints"""
+
+    def setUp(self):
+        super().setUp()
+        self.thread = ThreadFactory()
+        self.post = PostFactory(thread=self.thread)
+        self.list_url = reverse('mainapp:thread-list-create')
+        self.detail_url = reverse('mainapp:thread-detail', kwargs={'pk': self.thread.id})
+
+    def _revalidate(self, url, etag, **params):
+        return self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+
+    @BaseAPITestCase.doc
+    def test_unchanged_resources_return_304(self):
+        """
+        Test revalidation
+
+        Verifies:
+        - Responses carry a private ETag and Last-Modified
+        - A matching If-None-Match is answered with an empty 304
+        """
+        for url in (self.list_url, self.detail_url):
+            first = self.client.get(url)
+            self.assertEqual(first.status_code, status.HTTP_200_OK)
+            self.assertIn('private', first['Cache-Control'])
+            self.assertTrue(first.has_header('Last-Modified'))
+
+            second = self._revalidate(url, first['ETag'])
+            self.assertEqual(second.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertFalse(second.content)
+
+    @BaseAPITestCase.doc
+    def test_list_response_reuses_the_validated_page(self):
+        """
+        Test list queries on a cache miss
+
+        Verifies:
+        - The threads are filtered, counted and paginated once
+        - The response serves the full rows of the validated page
+        """
+        ThreadFactory.create_batch(12)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.list_url, {'page': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        thread_queries = [q['sql'] for q in ctx.captured_queries if 'FROM "mainapp_thread"' in q['sql']]
+        self.assertEqual(len([sql for sql in thread_queries if 'COUNT(' in sql]), 1)
+        self.assertEqual(len([sql for sql in thread_queries if 'OFFSET' in sql]), 1)
+
+        data = response.json()
+        self.assertEqual((data['count'], len(data['results'])), (13, 3))
+        self.assertIsNotNone(data['previous'])
+        self.assertTrue(all(thread['content'] for thread in data['results']))
+
+    @BaseAPITestCase.doc
+    def test_changes_invalidate_the_etag(self):
+        """
+        Test validator coverage
+
+        Verifies:
+        - New posts, post edits and votes by others change the ETag
+        """
+        etag = self.client.get(self.detail_url)['ETag']
+        list_etag = self.client.get(self.list_url)['ETag']
+
+        VoteFactory(thread=self.thread, user=UserFactory(), vote_type='upvote')
+        self.assertEqual(self._revalidate(self.detail_url, etag).status_code, status.HTTP_200_OK)
+        self.assertEqual(self._revalidate(self.list_url, list_etag).status_code, status.HTTP_200_OK)
+
+        etag = self.client.get(self.detail_url)['ETag']
+        post = Post.objects.get(id=self.post.id)
+        post.content = 'Edited'
+        post.save()
+        self.assertEqual(self._revalidate(self.detail_url, etag).status_code, status.HTTP_200_OK)
+
+        etag = self.client.get(self.detail_url)['ETag']
+        PostFactory(thread=self.thread)
+        self.assertEqual(self._revalidate(self.detail_url, etag).status_code, status.HTTP_200_OK)
+
+    @BaseAPITestCase.doc
+    def test_author_changes_invalidate_the_etag(self):
+        """
+        Test author coverage
+
+        Verifies:
+        - A synced rename of a post author changes the detail ETag
+        - A synced rename of a thread author changes the list ETag
+        """
+        etag = self.client.get(self.detail_url)['ETag']
+        list_etag = self.client.get(self.list_url)['ETag']
+
+        self.post.user.first_name = 'Renamed'
+        self.post.user.save()
+        sync_author_snapshots()
+        self.assertEqual(self._revalidate(self.detail_url, etag).status_code, status.HTTP_200_OK)
+        self.assertEqual(self._revalidate(self.list_url, list_etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.thread.author.last_name = 'Renamed'
+        self.thread.author.save()
+        sync_author_snapshots()
+        self.assertEqual(self._revalidate(self.list_url, list_etag).status_code, status.HTTP_200_OK)
+
+    @BaseAPITestCase.doc
+    def test_etags_are_per_user(self):
+        """
+        Test per-user validators
+
+        Verifies:
+        - Another user's ETag is never accepted
+        - The user's own vote changes the ETag even if counts match
+        """
+        etag = self.client.get(self.detail_url)['ETag']
+
+        self.authenticate(UserFactory())
+        self.assertEqual(self._revalidate(self.detail_url, etag).status_code, status.HTTP_200_OK)
+
+        self.authenticate()
+        other = UserFactory()
+        Vote.objects.create(user=other, post=self.post, vote_type='upvote')
+        etag = self.client.get(self.detail_url)['ETag']
+
+        # Same net count on the post, but user_vote differs for the requester
+        Vote.objects.filter(user=other, post=self.post).delete()
+        Vote.objects.create(user=self.test_user, post=self.post, vote_type='upvote')
+        self.assertEqual(self._revalidate(self.detail_url, etag).status_code, status.HTTP_200_OK)
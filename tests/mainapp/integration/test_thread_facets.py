@@ -0,0 +1,74 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from tests.base import BaseAPITestCase
+from tests.factories import ThreadFactory, LecturerFactory
+from mainapp.models import Thread, ThreadFacetCount
+from mainapp.facets import rebuild_facet_counts
+
+
+class TestThreadFacetCounts(BaseAPITestCase):
+    """Tests for the cached forum facet counts"""
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('mainapp:thread-facet-counts')
+        ThreadFactory(category='exams', visible_for_teachers=True, can_be_answered=True)
+        ThreadFactory(category='exams', visible_for_teachers=False, can_be_answered=True)
+        self.thread = ThreadFactory(category='general', visible_for_teachers=False, can_be_answered=False)
+
+    def _stored_counts(self):
+        return {
+            (row.category, row.visible_for_teachers, row.can_be_answered): row.thread_count
+            for row in ThreadFacetCount.objects.filter(thread_count__gt=0)
+        }
+
+    @BaseAPITestCase.doc
+    def test_counts_follow_thread_changes(self):
+        """
+        Test incremental maintenance
+
+        Verifies:
+        - Creating, editing and deleting threads updates the counters
+        - The counters match a full rebuild
+        """
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total'], 3)
+        self.assertEqual(response.data['categories'], {'exams': 2, 'general': 1})
+        self.assertEqual(response.data['can_be_answered'], {'true': 2, 'false': 1})
+
+        thread = Thread.objects.get(id=self.thread.id)
+        thread.category = 'exams'
+        thread.visible_for_teachers = True
+        thread.save()
+        ThreadFactory(category='general', visible_for_teachers=True).delete()
+
+        data = self.client.get(self.url).data
+        self.assertEqual(data['categories'], {'exams': 3})
+        self.assertEqual(data['visible_for_teachers'], {'true': 2, 'false': 1})
+
+        expected = self._stored_counts()
+        rebuild_facet_counts()
+        self.assertEqual(self._stored_counts(), expected)
+
+    @BaseAPITestCase.doc
+    def test_lecturers_only_count_teacher_threads(self):
+        """
+        Test role-aware counts
+
+        Verifies:
+        - Lecturers only see counts of threads visible for teachers
+        - Counts are read without counting over the thread table
+        """
+        self.authenticate(LecturerFactory())
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(self.url).data
+        self.assertFalse([q for q in queries if 'FROM "mainapp_thread"' in q['sql']])
+        self.assertEqual(data['total'], 1)
+        self.assertEqual(data['categories'], {'exams': 1})
+        self.assertEqual(data['visible_for_teachers'], {'true': 1, 'false': 0})
+        self.assertEqual(data['combinations'], [
+            {'category': 'exams', 'visible_for_teachers': True, 'can_be_answered': True, 'count': 1},
+        ])
@@ -0,0 +1,92 @@
+from django.urls import reverse
+from rest_framework import status
+from tests.base import BaseAPITestCase
+from tests.factories import ThreadFactory
+from mainapp.models import Thread
+
+
+class TestThreadKeysetPagination(BaseAPITestCase):
+    """Integration tests for cursor-based paging of the thread list"""
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('mainapp:thread-list-create')
+        # Few distinct vote values so that ties on the sort field are common
+        for i in range(23):
+            thread = ThreadFactory()
+            Thread.objects.filter(id=thread.id).update(vote_count_cache=i % 4, post_count=i % 3)
+
+    def _collect(self, params):
+        ids = []
+        response = self.client.get(self.url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            data = response.json()
+            self.assertNotIn('count', data)
+            ids.extend(item['id'] for item in data['results'])
+            if not data['next']:
+                return ids
+            response = self.client.get(data['next'])
+
+    @BaseAPITestCase.doc
+    def test_pages_follow_ordering_with_id_tie_breaker(self):
+        """
+        Test walking every page with each supported ordering
+
+        Verifies:
+        - All threads are returned exactly once
+        - Order matches (sort field, id) in the requested direction
+        """
+        for ordering, field in [('-votes', 'vote_count_cache'), ('posts', 'post_count'),
+                                ('-activity', 'last_activity_date'), ('created', 'created_date')]:
+            sign = '-' if ordering.startswith('-') else ''
+            expected = list(
+                Thread.objects.order_by(f'{sign}{field}', f'{sign}id').values_list('id', flat=True)
+            )
+            ids = self._collect({'pagination': 'cursor', 'ordering': ordering, 'page_size': 5})
+            self.assertEqual(ids, expected, ordering)
+
+    @BaseAPITestCase.doc
+    def test_stable_under_concurrent_inserts(self):
+        """
+        Test inserting threads while a client is scrolling
+
+        Verifies:
+        - Rows inserted ahead of the cursor do not shift later pages
+        """
+        first = self.client.get(self.url, {'pagination': 'cursor', 'ordering': '-votes'}).json()
+        seen = [item['id'] for item in first['results']]
+
+        hot = ThreadFactory()
+        Thread.objects.filter(id=hot.id).update(vote_count_cache=100)
+
+        second = self.client.get(first['next']).json()
+        second_ids = [item['id'] for item in second['results']]
+
+        self.assertFalse(set(seen) & set(second_ids))
+        self.assertNotIn(hot.id, second_ids)
+
+    @BaseAPITestCase.doc
+    def test_rejects_unsupported_ordering_and_bad_cursor(self):
+        """
+        Test invalid cursor requests
+
+        Verifies:
+        - Orderings without a keyset index are rejected
+        - Tampered cursors are rejected
+        """
+        response = self.client.get(self.url, {'pagination': 'cursor', 'ordering': 'title'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @BaseAPITestCase.doc
+    def test_page_number_mode_unchanged(self):
+        """
+        Test default pagination
+
+        Verifies:
+        - Without the cursor mode the list keeps page-number pagination
+        """
+        self.assertPaginatedResponse(self.client.get(self.url), expected_count=23)
@@ -0,0 +1,132 @@
+import warnings
+from datetime import timedelta
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from tests.base import BaseAPITestCase
+from tests.factories import ThreadFactory, PostFactory
+from mainapp.models import Post
+
+
+class TestThreadPostWindow(BaseAPITestCase):
+    """Tests for windowed post loading in the thread detail endpoint"""
+
+    def setUp(self):
+        super().setUp()
+        self.thread = ThreadFactory()
+        start = timezone.now() - timedelta(days=1)
+        self.posts = PostFactory.create_batch(25, thread=self.thread)
+        # Distinct, increasing dates, with one tie to exercise the id tie-breaker
+        for index, post in enumerate(self.posts):
+            Post.objects.filter(id=post.id).update(date=start + timedelta(minutes=min(index, 20)))
+        self.url = reverse('mainapp:thread-detail', kwargs={'pk': self.thread.id})
+        self.ids = [post.id for post in self.posts]
+
+    def _get(self, url=None, **params):
+        response = self.client.get(url or self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    @BaseAPITestCase.doc
+    def test_without_window_all_posts_are_returned(self):
+        """
+        Test backwards compatibility
+
+        Verifies:
+        - The plain detail request still inlines every post
+        """
+        data = self._get()
+        self.assertEqual(len(data['posts']), 25)
+        self.assertNotIn('posts_window', data)
+
+    @BaseAPITestCase.doc
+    def test_cursors_walk_the_whole_thread(self):
+        """
+        Test forward and backward cursors
+
+        Verifies:
+        - Windows follow (date, id) order without gaps or duplicates
+        - Posts sharing a date are split correctly across windows
+        - The previous link returns to the preceding window
+        """
+        first = self._get(posts_limit=10)
+        self.assertEqual(first['title'], self.thread.title)
+        self.assertIsNone(first['posts_window']['previous'])
+
+        seen, data = [], first
+        while True:
+            seen += [post['id'] for post in data['posts']]
+            if not data['posts_window']['next']:
+                break
+            data = self._get(data['posts_window']['next'])
+        self.assertEqual(seen, self.ids)
+
+        back = self._get(data['posts_window']['previous'])
+        self.assertEqual([post['id'] for post in back['posts']], self.ids[10:20])
+
+    @BaseAPITestCase.doc
+    def test_window_around_a_post(self):
+        """
+        Test jumping to a post
+
+        Verifies:
+        - The window is centred on the requested post
+        - Posts of other threads are rejected
+        """
+        data = self._get(around=self.ids[12], posts_limit=6)
+        self.assertEqual([post['id'] for post in data['posts']], self.ids[9:15])
+        self.assertIsNotNone(data['posts_window']['previous'])
+        self.assertIsNotNone(data['posts_window']['next'])
+
+        foreign = PostFactory()
+        response = self.client.get(self.url, {'around': foreign.id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @BaseAPITestCase.doc
+    def test_posts_since_timestamp(self):
+        """
+        Test incremental refresh
+
+        Verifies:
+        - Only posts newer than the timestamp are returned
+        """
+        since = Post.objects.get(id=self.ids[18]).date
+        data = self._get(since=since.isoformat())
+        self.assertEqual([post['id'] for post in data['posts']], self.ids[19:])
+        self.assertIsNotNone(data['posts_window']['previous'])
+        self.assertIsNone(data['posts_window']['next'])
+
+    @BaseAPITestCase.doc
+    def test_naive_since_is_read_in_the_server_time_zone(self):
+        """
+        Test timestamps without an offset
+
+        Verifies:
+        - A naive timestamp is taken as local time without a naive datetime warning
+        """
+        since = timezone.localtime(Post.objects.get(id=self.ids[18]).date).replace(tzinfo=None)
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', RuntimeWarning)
+            data = self._get(since=since.isoformat())
+        self.assertEqual([post['id'] for post in data['posts']], self.ids[19:])
+
+    @BaseAPITestCase.doc
+    def test_window_query_count_does_not_grow_with_thread(self):
+        """
+        Test bounded cost
+
+        Verifies:
+        - A window of a huge thread costs the same queries as of a small one
+        """
+        self._get(posts_limit=5)
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as small:
+            self._get(posts_limit=5)
+        PostFactory.create_batch(50, thread=self.thread)
+        with CaptureQueriesContext(connection) as large:
+            data = self._get(posts_limit=5)
+
+        self.assertEqual(len(data['posts']), 5)
+        self.assertEqual(len(large.captured_queries), len(small.captured_queries))
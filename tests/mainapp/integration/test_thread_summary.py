@@ -0,0 +1,101 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from tests.base import BaseAPITestCase
+from tests.factories import UserFactory, ThreadFactory, PostFactory, VoteFactory
+from mainapp.models import Vote
+
+
+class TestThreadSummaryList(BaseAPITestCase):
+    """Tests for the compact thread representation used by the list endpoint"""
+
+    def _list_query_count(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('mainapp:thread-list-create'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(ctx.captured_queries), response.json()
+
+    @BaseAPITestCase.doc
+    def test_list_returns_summary_without_posts(self):
+        """
+        Test list payload shape
+
+        Verifies:
+        - Nested posts are not serialized in the list
+        - post_count and the requesting user's vote are exposed instead
+        """
+        thread = ThreadFactory(is_anonymous=False)
+        PostFactory.create_batch(3, thread=thread)
+        VoteFactory(thread=thread, user=self.test_user, vote_type='upvote')
+
+        response = self.client.get(reverse('mainapp:thread-list-create'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        result = response.json()['results'][0]
+
+        self.assertNotIn('posts', result)
+        self.assertEqual(result['post_count'], 3)
+        self.assertEqual(result['user_vote'], 'upvote')
+        self.assertTrue(result['can_vote'])
+
+    @BaseAPITestCase.doc
+    def test_list_query_count_does_not_grow_with_page(self):
+        """
+        Test list query count
+
+        Verifies:
+        - A full page costs the same number of queries as a single thread
+        """
+        thread = ThreadFactory()
+        PostFactory.create_batch(2, thread=thread)
+        # The first request also registers the endpoint in analytics
+        self._list_query_count()
+        single_count, _ = self._list_query_count()
+
+        for _ in range(9):
+            busy_thread = ThreadFactory(author=UserFactory())
+            PostFactory.create_batch(3, thread=busy_thread)
+            VoteFactory(thread=busy_thread, user=self.test_user)
+        page_count, data = self._list_query_count()
+
+        self.assertEqual(len(data['results']), 10)
+        self.assertEqual(single_count, page_count)
+
+    @BaseAPITestCase.doc
+    def test_detail_still_nests_posts(self):
+        """
+        Test detail payload shape
+
+        Verifies:
+        - The thread detail endpoint keeps the full nested form
+        """
+        thread = ThreadFactory()
+        PostFactory.create_batch(2, thread=thread)
+
+        response = self.client.get(reverse('mainapp:thread-detail', kwargs={'pk': thread.id}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()['posts']), 2)
+
+    @BaseAPITestCase.doc
+    def test_detail_query_count_does_not_grow_with_posts(self):
+        """
+        Test detail query count
+
+        Verifies:
+        - Votes, authors and reply links of nested posts are batched
+        """
+        thread = ThreadFactory()
+        url = reverse('mainapp:thread-detail', kwargs={'pk': thread.id})
+        PostFactory(thread=thread)
+        self.client.get(url)
+
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(url)
+
+        for post in PostFactory.create_batch(10, thread=thread):
+            Vote.objects.create(post=post, user=self.test_user, vote_type='upvote')
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(url)
+
+        self.assertEqual(len(response.json()['posts']), 11)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
@@ -0,0 +1,64 @@
+from tests.base import BaseTestCase
+from tests.factories import ThreadFactory
+from mainapp.models import Thread
+from mainapp.blacklist import compile_blacklist, exclude_blacklisted_threads
+
+
+class TestBlacklistFiltering(BaseTestCase):
+    """Test compiled blacklist filtering of thread lists"""
+
+    @BaseTestCase.doc
+    def test_compiled_pattern_is_cached_per_phrase_list(self):
+        """
+        Test blacklist compilation
+
+        Verifies:
+        - The same phrase list reuses the compiled pattern
+        - Special characters are matched literally
+        - An empty phrase list compiles to nothing
+        """
+        compile_blacklist.cache_clear()
+        first = compile_blacklist(('c++', 'egzamin'))
+        second = compile_blacklist(('c++', 'egzamin'))
+
+        self.assertIs(first, second)
+        self.assertEqual(compile_blacklist.cache_info().hits, 1)
+        self.assertIsNone(compile_blacklist(()))
+        self.assertIsNone(compile_blacklist(('',)))
+
+    @BaseTestCase.doc
+    def test_threads_matching_any_phrase_are_excluded(self):
+        """
+        Test blacklist exclusion
+
+        Verifies:
+        - Matching is case-insensitive on title and content
+        - Regex metacharacters in phrases are not interpreted
+        - The whole blacklist is applied by a single query
+        """
+        hidden_title = ThreadFactory(title="Party tonight", content="Bring snacks")
+        hidden_content = ThreadFactory(title="Question", content="Is C++ required?")
+        visible = ThreadFactory(title="Cpp homework", content="Due on Monday")
+
+        self.test_user.blacklist = ['PARTY', 'c++', 'a.b', '(unclosed']
+
+        with self.assertNumQueries(1):
+            ids = set(exclude_blacklisted_threads(Thread.objects.all(), self.test_user)
+                      .values_list('id', flat=True))
+
+        self.assertIn(visible.id, ids)
+        self.assertNotIn(hidden_title.id, ids)
+        self.assertNotIn(hidden_content.id, ids)
+
+    @BaseTestCase.doc
+    def test_empty_blacklist_leaves_queryset_untouched(self):
+        """
+        Test users without a blacklist
+
+        Verifies:
+        - No exclusion is added when there is nothing to filter
+        """
+        queryset = Thread.objects.all()
+        self.test_user.blacklist = []
+
+        self.assertIs(exclude_blacklisted_threads(queryset, self.test_user), queryset)
@@ -0,0 +1,192 @@
+from email.message import EmailMessage
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from tests.base import BaseTestCase, BaseAPITestCase
+from mainapp.models import Thread, EmailImportCheckpoint
+from mainapp.email_import import import_mailbox, create_threads_from_email_data
+from mainapp.facets import get_facet_counts
+
+
+class FakeMailbox:
+    """Local stand-in for an imaplib.IMAP4 connection to a single mailbox"""
+
+    def __init__(self, messages, uidvalidity=1):
+        self.messages = dict(messages)
+        self.uidvalidity = uidvalidity
+        self.deleted = set()
+        self.commands = []
+
+    def select(self, mailbox):
+        return 'OK', [str(len(self.messages)).encode()]
+
+    def response(self, code):
+        return code, [str(self.uidvalidity).encode()]
+
+    def _uids(self, spec):
+        if spec.endswith(':*'):
+            low = int(spec[:-2])
+            uids = [uid for uid in sorted(self.messages) if uid >= low]
+            return uids or sorted(self.messages)[-1:]
+        return [int(uid) for uid in spec.split(',')]
+
+    def uid(self, command, *args):
+        self.commands.append(command)
+        if command == 'SEARCH':
+            return 'OK', [' '.join(map(str, self._uids(args[1].split()[1]))).encode()]
+        if command == 'FETCH':
+            data = []
+            for uid in self._uids(args[0]):
+                raw = self.messages[uid]
+                data.append((f'{uid} (UID {uid} RFC822 {{{len(raw)}}}'.encode(), raw))
+                data.append(b')')
+            return 'OK', data
+        if command == 'STORE':
+            self.deleted.update(self._uids(args[0]))
+            return 'OK', []
+        raise AssertionError(command)
+
+    def expunge(self):
+        for uid in self.deleted:
+            self.messages.pop(uid, None)
+        self.deleted.clear()
+
+
+def make_message(subject, sender='Jan Kowalski <jan.kowalski@p.lodz.pl>'):
+    message = EmailMessage()
+    message['Subject'] = subject
+    message['From'] = sender
+    message.set_content(f'Body of {subject}\n_______________________________\nFooter')
+    return message.as_bytes()
+
+
+class TestEmailImport(BaseTestCase):
+    """Test the batched import of forum threads from the mailbox"""
+
+    @BaseTestCase.doc
+    def test_imports_in_batches_and_resumes_from_checkpoint(self):
+        """
+        Test batched import
+
+        Verifies:
+        - Messages are fetched and flagged with one command per batch
+        - Only university senders become threads
+        - A second run only imports messages newer than the checkpoint
+        """
+        mailbox = FakeMailbox({
+            3: make_message('First'),
+            5: make_message('Second'),
+            8: make_message('Spam', sender='Someone <someone@example.com>'),
+            9: make_message('Third'),
+            10: b'not really an email',
+        })
+        totals = import_mailbox(mailbox, batch_size=2, workers=2)
+
+        self.assertEqual(totals, {'fetched': 5, 'created': 3, 'last_uid': 10})
+        self.assertEqual(mailbox.commands.count('FETCH'), 3)
+        self.assertEqual(mailbox.commands.count('STORE'), 3)
+        self.assertEqual(mailbox.messages, {})
+        self.assertEqual(
+            set(Thread.objects.values_list('title', flat=True)), {'First', 'Second', 'Third'}
+        )
+        self.assertEqual(Thread.objects.get(title='First').content, 'Body of First')
+        self.assertEqual(EmailImportCheckpoint.objects.get(mailbox='INBOX').last_uid, 10)
+
+        mailbox.messages = {10: make_message('Old'), 11: make_message('Fourth')}
+        totals = import_mailbox(mailbox, batch_size=2, delete=False)
+        self.assertEqual(totals, {'fetched': 1, 'created': 1, 'last_uid': 11})
+        self.assertFalse(Thread.objects.filter(title='Old').exists())
+
+    @BaseTestCase.doc
+    def test_uidvalidity_change_restarts_from_the_beginning(self):
+        """
+        Test UIDVALIDITY handling
+
+        Verifies:
+        - A renumbered mailbox is imported from its first UID
+        - Threads that were already imported are not duplicated
+        """
+        import_mailbox(FakeMailbox({7: make_message('First')}), delete=False)
+        totals = import_mailbox(FakeMailbox({1: make_message('First'), 2: make_message('Second')}, uidvalidity=2))
+
+        self.assertEqual(totals, {'fetched': 2, 'created': 1, 'last_uid': 2})
+        self.assertEqual(Thread.objects.filter(title='First').count(), 1)
+
+    @BaseTestCase.doc
+    def test_batch_deduplicates_by_fingerprint_in_constant_queries(self):
+        """
+        Test fingerprint dedupe
+
+        Verifies:
+        - Imported threads store their content fingerprint
+        - Duplicates within the batch and of earlier imports are skipped
+        - A batch takes the same number of queries whatever its size
+        """
+        def emails(*subjects):
+            return [
+                {'subject': subject, 'from': 'Jan <jan@p.lodz.pl>',
+                 'body': f'About {subject}\n_______________________________'}
+                for subject in subjects
+            ]
+
+        created = create_threads_from_email_data(emails('A', 'B', 'A'))
+        self.assertEqual([thread.title for thread in created], ['A', 'B'])
+        thread = Thread.objects.get(id=created[0].id)
+        self.assertEqual(thread.content_hash, Thread.fingerprint('A', 'About A', 'Jan <jan@p.lodz.pl>'))
+
+        with self.assertNumQueries(3):
+            created = create_threads_from_email_data(emails('B', 'C'))
+        self.assertEqual([thread.title for thread in created], ['C'])
+        with self.assertNumQueries(3):
+            create_threads_from_email_data(emails(*'DEFGHIJKLM'))
+        self.assertEqual(Thread.objects.count(), 13)
+        self.assertEqual(get_facet_counts(AnonymousUser())['categories'], {'other': 13})
+
+    @BaseTestCase.doc
+    @override_settings(FORUM_EMAIL_IMAP_USER='', FORUM_EMAIL_IMAP_PASSWORD='')
+    def test_missing_credentials_fail_clearly(self):
+        """
+        Test importing without mailbox credentials
+
+        Verifies:
+        - The command fails naming the environment variables to set
+        """
+        with self.assertRaisesMessage(CommandError, 'FORUM_EMAIL_IMAP_PASSWORD'):
+            call_command('import_emails')
+
+
+class TestEmailThreadEndpoint(BaseAPITestCase):
+    """Test the endpoint creating threads from fetched emails"""
+
+    def post_emails(self, subjects):
+        emails = [
+            {'subject': subject, 'from': 'Jan <jan@p.lodz.pl>',
+             'body': f'About {subject}\n_______________________________'}
+            for subject in subjects
+        ]
+        return self.client.post(reverse('mainapp:create-threads-from-emails'), {'emails': emails}, format='json')
+
+    @BaseAPITestCase.doc
+    def test_endpoint_creates_threads_in_constant_queries(self):
+        """
+        Test the thread creation endpoint
+
+        Verifies:
+        - The created threads are returned as summaries without nested posts
+        - Batches of 2 and 10 emails take the same number of queries
+        """
+        # The first request of a user also records analytics state
+        self.post_emails('Z')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.post_emails('AB')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([thread['title'] for thread in response.data['created_threads']], ['A', 'B'])
+        self.assertNotIn('posts', response.data['created_threads'][0])
+
+        with self.assertNumQueries(len(ctx.captured_queries)):
+            response = self.post_emails('CDEFGHIJKL')
+        self.assertEqual(len(response.data['created_threads']), 10)
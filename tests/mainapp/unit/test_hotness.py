@@ -0,0 +1,83 @@
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from tests.base import BaseAPITestCase
+from tests.factories import UserFactory, ThreadFactory, PostFactory, VoteFactory
+from mainapp.models import Thread
+from mainapp.hotness import POST_WEIGHT, bump_hot_scores
+
+
+@override_settings(FORUM_HOT_HALF_LIFE_HOURS=24)
+class TestHotScore(BaseAPITestCase):
+    """Test the time-decayed trending score of threads"""
+
+    def _score(self, thread):
+        return Thread.objects.values_list('hot_score', flat=True).get(id=thread.id)
+
+    @BaseAPITestCase.doc
+    def test_events_bump_the_score(self):
+        """
+        Test incremental maintenance
+
+        Verifies:
+        - New threads start at 1
+        - Votes and new posts add their weight
+        - Withdrawn votes remove it again
+        """
+        thread = ThreadFactory()
+        self.assertAlmostEqual(self._score(thread), 1.0, places=3)
+
+        vote = VoteFactory(thread=thread, user=UserFactory(), vote_type='upvote')
+        PostFactory(thread=thread)
+        self.assertAlmostEqual(self._score(thread), 2.0 + POST_WEIGHT, places=3)
+
+        vote.delete()
+        self.assertAlmostEqual(self._score(thread), 1.0 + POST_WEIGHT, places=3)
+
+    @BaseAPITestCase.doc
+    def test_scores_halve_every_half_life(self):
+        """
+        Test decay
+
+        Verifies:
+        - A bump decays the stored score before adding its weight
+        - The sweep command decays every score to the present
+        """
+        day_ago = timezone.now() - timedelta(hours=24)
+        bumped, swept = ThreadFactory.create_batch(2)
+        Thread.objects.update(hot_score=8.0, hot_score_updated=day_ago)
+
+        bump_hot_scores({bumped.id: 1})
+        self.assertAlmostEqual(self._score(bumped), 5.0, places=3)
+
+        out = StringIO()
+        call_command('decay_hot_scores', stdout=out)
+        self.assertIn('Decayed hot scores of 2 threads', out.getvalue())
+        self.assertAlmostEqual(self._score(swept), 4.0, places=3)
+        self.assertAlmostEqual(self._score(bumped), 5.0, places=3)
+
+    @BaseAPITestCase.doc
+    def test_trending_ordering(self):
+        """
+        Test the hot ordering of the thread list
+
+        Verifies:
+        - ordering=-hot ranks by score
+        - Cursor requests fall back to offset pages, since scores keep changing
+        """
+        quiet, busy, medium = ThreadFactory.create_batch(3)
+        for thread, score in ((quiet, 0.5), (busy, 9.0), (medium, 3.0)):
+            Thread.objects.filter(id=thread.id).update(hot_score=score)
+        expected = [busy.id, medium.id, quiet.id]
+
+        url = reverse('mainapp:thread-list-create')
+        response = self.client.get(url, {'ordering': '-hot', 'blacklist': 'off'})
+        self.assertEqual([t['id'] for t in response.json()['results']], expected)
+
+        response = self.client.get(url, {'ordering': '-hot', 'pagination': 'cursor', 'blacklist': 'off'})
+        data = response.json()
+        self.assertEqual(data['count'], 3)
+        self.assertEqual([t['id'] for t in data['results']], expected)
@@ -0,0 +1,129 @@
+import asyncio
+import threading
+from unittest import mock
+from asgiref.sync import sync_to_async
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+from tests.base import BaseAPITestCase
+from tests.factories import UserFactory, LecturerFactory, ThreadFactory, PostFactory
+from mainapp.models import PinnedThread
+from mainapp.live import LocalBackend, Subscription, get_broadcaster
+from mainapp.post import vote_on_post
+
+
+class TestLiveUpdates(BaseAPITestCase):
+    """Test the live update broadcaster and its event sources"""
+
+    @BaseAPITestCase.doc
+    def test_local_backend_delivers_across_threads(self):
+        """
+        Test the in-process broadcaster
+
+        Verifies:
+        - Messages published from a worker thread reach async subscribers
+        - Only subscribed topics are delivered, and closing unsubscribes
+        """
+        backend = LocalBackend()
+
+        async def scenario():
+            subscription = Subscription(backend, ['thread:1'])
+            publisher = threading.Thread(target=lambda: (
+                backend.publish('thread:2', {'type': 'ignored'}),
+                backend.publish('thread:1', {'type': 'post'}),
+            ))
+            publisher.start()
+            received = await subscription.get(timeout=2)
+            subscription.close()
+            backend.publish('thread:1', {'type': 'late'})
+            late = await subscription.get(timeout=0.05)
+            return received, late
+
+        received, late = asyncio.run(scenario())
+        self.assertEqual(received, ('thread:1', {'type': 'post'}))
+        self.assertIsNone(late)
+
+    @BaseAPITestCase.doc
+    def test_post_and_vote_events_are_published_on_commit(self):
+        """
+        Test event sources
+
+        Verifies:
+        - New posts and vote changes are published to the thread topic
+        - Nothing is published before the transaction commits
+        """
+        thread = ThreadFactory()
+        with mock.patch('mainapp.live.get_broadcaster') as get_broadcaster:
+            with self.captureOnCommitCallbacks(execute=True):
+                post = PostFactory(thread=thread)
+                self.assertFalse(get_broadcaster.return_value.publish.called)
+            with self.captureOnCommitCallbacks(execute=True):
+                vote_on_post(self.test_user, post.id, 'downvote')
+
+        published = [call.args for call in get_broadcaster.return_value.publish.call_args_list]
+        self.assertIn((f'thread:{thread.id}', {
+            'type': 'post', 'action': 'created', 'thread': thread.id, 'post': post.id,
+        }), published)
+        self.assertIn((f'thread:{thread.id}', {
+            'type': 'vote', 'thread': thread.id, 'post': post.id, 'delta': -1,
+        }), published)
+
+
+class TestLiveUpdatesStream(BaseAPITestCase):
+    """Test the server-sent events endpoint"""
+
+    @BaseAPITestCase.doc
+    def test_requires_authentication(self):
+        """
+        Test stream authentication
+
+        Verifies:
+        - Requests without a token are rejected with 401
+        """
+        self.client.credentials()
+        response = self.client.get(reverse('mainapp:live-updates'))
+        self.assertEqual(response.status_code, 401)
+
+    @BaseAPITestCase.doc
+    def test_hidden_threads_are_not_streamed(self):
+        """
+        Test stream visibility
+
+        Verifies:
+        - Lecturers get 404 for threads not visible for teachers
+        - Unknown threads are answered with 404
+        """
+        hidden = ThreadFactory(visible_for_teachers=False)
+        url = reverse('mainapp:live-updates')
+        self.authenticate(LecturerFactory())
+        self.assertEqual(self.client.get(url, {'threads': str(hidden.id)}).status_code, 404)
+        self.assertEqual(self.client.get(url, {'threads': str(hidden.id + 1000)}).status_code, 404)
+
+    async def test_stream_opens_with_unread_counts_and_relays_events(self):
+        """
+        Test the event stream
+
+        Verifies:
+        - The stream opens with the unread counts of pinned threads
+        - Thread events are relayed and bump the unread count
+        """
+        user = await sync_to_async(UserFactory)()
+        thread = await sync_to_async(ThreadFactory)()
+        await PinnedThread.objects.acreate(user=user, thread=thread, unread_posts=3)
+        refresh = await sync_to_async(RefreshToken.for_user)(user)
+        token = str(refresh.access_token)
+
+        response = await self.async_client.get(
+            reverse('mainapp:live-updates'), {'access_token': token}
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+
+        first = (await anext(stream)).decode()
+        self.assertIn('event: unread', first)
+        self.assertIn(f'"{thread.id}": 3', first)
+
+        get_broadcaster().publish(f'thread:{thread.id}', {
+            'type': 'post', 'action': 'created', 'thread': thread.id, 'post': 99,
+        })
+        self.assertIn('event: post', (await anext(stream)).decode())
+        self.assertIn('"unread_count": 4', (await anext(stream)).decode())
@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from tests.base import BaseAPITestCase
+from tests.factories import UserFactory, EventFactory
+from mainapp.recurrence import Recurrence
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def at(*args):
+    return timezone.make_aware(datetime(*args))
+
+
+class TestRecurrence(BaseAPITestCase):
+    """Tests for the lazy expansion of recurring calendar events"""
+
+    @BaseAPITestCase.doc
+    def test_rules_expand_only_the_window(self):
+        """
+        Test recurrence rules
+
+        Verifies:
+        - Weekly events repeat every 7 days, also far from their first occurrence
+        - Monthly events repeat on the same weekday of the same week
+        - Months without that weekday are skipped
+        - Occurrences running into the window are included
+        """
+        weekly = Recurrence(at(2024, 10, 7, 10), at(2024, 10, 7, 11, 30), 'weekly')
+        self.assertEqual(
+            [start.day for start, end in weekly.between(at(2024, 11, 1), at(2024, 12, 1))], [4, 11, 18, 25]
+        )
+        starts = [start for start, end in weekly.between(at(2030, 1, 1), at(2030, 1, 15))]
+        self.assertEqual(starts, [at(2030, 1, 7, 10), at(2030, 1, 14, 10)])
+
+        second_tuesday = Recurrence(at(2024, 10, 8, 9), at(2024, 10, 8, 10), 'monthly')
+        self.assertEqual(
+            [start.date().isoformat() for start, end in second_tuesday.between(at(2024, 10, 1), at(2025, 1, 1))],
+            ['2024-10-08', '2024-11-12', '2024-12-10'],
+        )
+        fifth_tuesday = Recurrence(at(2024, 10, 29, 9), at(2024, 10, 29, 10), 'monthly')
+        self.assertEqual(
+            [start.date().isoformat() for start, end in fifth_tuesday.between(at(2024, 11, 1), at(2025, 2, 1))],
+            ['2024-12-31'],
+        )
+
+        overnight = Recurrence(at(2024, 10, 6, 22), at(2024, 10, 7, 2), 'weekly')
+        self.assertEqual(list(overnight.between(at(2024, 10, 14), at(2024, 10, 15))),
+                         [(at(2024, 10, 13, 22), at(2024, 10, 14, 2))])
+        self.assertEqual(list(Recurrence(at(2024, 10, 6), at(2024, 10, 7)).between(at(2024, 11, 1), at(2024, 12, 1))), [])
+
+    @override_settings(CACHES=LOCMEM_CACHE)
+    @BaseAPITestCase.doc
+    def test_occurrences_endpoint_is_memoized_per_user(self):
+        """
+        Test the occurrences endpoint
+
+        Verifies:
+        - A month lists the user's one-off events and every occurrence of their series
+        - Past one-off events and other users' events are left out
+        - Repeated requests are served from the cache until an event changes
+        """
+        cache.clear()
+        lecture = EventFactory(user=self.test_user, title='Lecture', repeat_type='weekly',
+                               start_date=at(2024, 9, 2, 8), end_date=at(2024, 9, 2, 10))
+        EventFactory(user=self.test_user, title='Exam', repeat_type='none',
+                     start_date=at(2024, 11, 20, 12), end_date=at(2024, 11, 20, 14))
+        EventFactory(user=self.test_user, title='Old', repeat_type='none',
+                     start_date=at(2024, 9, 20, 12), end_date=at(2024, 9, 20, 14))
+        EventFactory(user=UserFactory(), repeat_type='weekly',
+                     start_date=at(2024, 9, 2, 8), end_date=at(2024, 9, 2, 10))
+        url = reverse('mainapp:event-occurrences')
+
+        response = self.client.get(url, {'year': 2024, 'month': 11})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['title'] for item in response.data], ['Lecture'] * 3 + ['Exam', 'Lecture'])
+        self.assertEqual(response.data[0]['start_date'], '2024-11-04T08:00:00Z')
+        self.assertEqual(response.data[0]['id'], lecture.id)
+        self.assertEqual(response.data[0]['recurrence_id'], f'{lecture.id}:20241104T080000Z')
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(url, {'year': 2024, 'month': 11})
+        self.assertFalse([q for q in ctx.captured_queries if 'mainapp_event' in q['sql']])
+
+        lecture.repeat_type = 'none'
+        lecture.save()
+        response = self.client.get(url, {'start': '2024-11-01', 'end': '2024-12-01'})
+        self.assertEqual([item['title'] for item in response.data], ['Exam'])
+
+        self.assertEqual(self.client.get(url, {'start': '2024-11-01', 'end': '2026-01-01'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'start': 'soon', 'end': '2024-12-01'}).status_code, 400)
+
+    @BaseAPITestCase.doc
+    def test_event_list_window_uses_range_predicates(self):
+        """
+        Test window filtering of the event list
+
+        Verifies:
+        - Events overlapping the window and series started before it are listed
+        - The query filters on start_date and end_date ranges, not on date parts
+        """
+        series = EventFactory(user=self.test_user, repeat_type='monthly',
+                              start_date=at(2024, 1, 9, 8), end_date=at(2024, 1, 9, 10))
+        spanning = EventFactory(user=self.test_user, repeat_type='none',
+                                start_date=at(2024, 10, 30), end_date=at(2024, 11, 2))
+        EventFactory(user=self.test_user, repeat_type='none',
+                     start_date=at(2024, 10, 1), end_date=at(2024, 10, 1) + timedelta(hours=1))
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('mainapp:event-list'), {'start': '2024-11-01', 'end': '2024-12-01'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({item['id'] for item in response.data['results']}, {series.id, spanning.id})
+        event_sql = [q['sql'] for q in ctx.captured_queries if 'mainapp_event' in q['sql']]
+        self.assertTrue(event_sql)
+        self.assertFalse([sql for sql in event_sql if 'EXTRACT' in sql])
@@ -0,0 +1,111 @@
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from unittest import mock
+from django.test import override_settings
+from django.utils import timezone
+from tests.base import BaseTestCase
+from tests.factories import UserFactory, ThreadFactory, PostFactory
+from mainapp.models import PinnedThread
+from mainapp import unread
+
+
+class TestUnreadCounters(BaseTestCase):
+    """Test fan-out maintenance of pinned thread unread counters"""
+
+    def setUp(self):
+        super().setUp()
+        self.thread = ThreadFactory()
+        past = timezone.now() - timedelta(hours=1)
+        self.pins = [
+            PinnedThread.objects.create(user=user, thread=self.thread, last_viewed=past)
+            for user in UserFactory.create_batch(5)
+        ]
+
+    def _counts(self):
+        return sorted(PinnedThread.objects.filter(thread=self.thread).values_list('unread_posts', flat=True))
+
+    @BaseTestCase.doc
+    def test_new_post_increments_every_pin_in_one_update(self):
+        """
+        Test synchronous fan-out
+
+        Verifies:
+        - Every pin of the thread is incremented
+        - The fan-out costs a bounded number of queries
+        - Viewing resets the counter of that user only
+        """
+        post = PostFactory(thread=self.thread)
+        self.assertEqual(self._counts(), [1] * 5)
+
+        PinnedThread.objects.update(unread_posts=0)
+        with self.assertNumQueries(2):
+            unread.fan_out_new_post(post)
+        self.assertEqual(self._counts(), [1] * 5)
+
+        self.pins[0].mark_as_viewed()
+        PostFactory(thread=self.thread)
+        self.assertEqual(self._counts(), [1, 2, 2, 2, 2])
+
+    @BaseTestCase.doc
+    def test_large_fan_out_is_deferred_and_batched(self):
+        """
+        Test asynchronous fan-out
+
+        Verifies:
+        - Threads with more pins than the batch size are updated after commit
+        - The batched update reaches every pin exactly once
+        """
+        with override_settings(FORUM_UNREAD_FANOUT_BATCH_SIZE=2), \
+                mock.patch.object(unread._executor, 'submit') as submit:
+            with self.captureOnCommitCallbacks(execute=True):
+                post = PostFactory(thread=self.thread)
+            self.assertEqual(self._counts(), [0] * 5)
+            submit.assert_called_once()
+
+            unread.fan_out_in_batches(self.thread.id, post.date)
+
+        self.assertEqual(self._counts(), [1] * 5)
+
+    @BaseTestCase.doc
+    def test_pins_viewed_after_the_post_are_not_incremented(self):
+        """
+        Test fan-out racing with a view
+
+        Verifies:
+        - A user who viewed the thread after the post keeps a zero counter
+        - Deleting a post withdraws it from unread counters
+        """
+        post = PostFactory(thread=self.thread)
+        self.pins[0].mark_as_viewed()
+        PinnedThread.objects.filter(id=self.pins[0].id).update(unread_posts=0)
+
+        unread.fan_out_in_batches(self.thread.id, post.date, batch_size=2)
+        self.assertEqual(self._counts(), [0, 2, 2, 2, 2])
+
+        post.delete()
+        self.assertEqual(self._counts(), [0, 1, 1, 1, 1])
+
+    @BaseTestCase.doc
+    def test_lost_fan_out_is_reconciled(self):
+        """
+        Test unread counter reconciliation
+
+        Verifies:
+        - A fan-out lost before it ran leaves the counters behind
+        - The reconcile command restores the posts written since the last view
+        """
+        with override_settings(FORUM_UNREAD_FANOUT_BATCH_SIZE=2), \
+                mock.patch.object(unread._executor, 'submit'):
+            with self.captureOnCommitCallbacks(execute=True):
+                PostFactory(thread=self.thread)
+        self.pins[0].mark_as_viewed()
+        self.assertEqual(self._counts(), [0] * 5)
+
+        out = StringIO()
+        call_command('reconcile_unread_counts', '--dry-run', stdout=out)
+        self.assertIn('Found 4 drifted unread counters', out.getvalue())
+        self.assertEqual(self._counts(), [0] * 5)
+
+        call_command('reconcile_unread_counts', stdout=StringIO())
+        self.assertEqual(self._counts(), [0, 1, 1, 1, 1])
@@ -0,0 +1,176 @@
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import mock
+from django.test import override_settings
+from django.urls import reverse
+from tests.base import BaseAPITestCase
+from tests.factories import UserFactory, ThreadFactory, PostFactory
+from mainapp.models import Vote
+from mainapp import vote_buffer
+from mainapp.vote_buffer import VoteBuffer
+
+
+@override_settings(FORUM_VOTE_WRITE_BEHIND=True)
+class TestVoteBuffer(BaseAPITestCase):
+    """Test the write-behind vote buffer"""
+
+    def setUp(self):
+        super().setUp()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir, ignore_errors=True)
+        # A long interval keeps the background flusher out of the test
+        self.buffer = VoteBuffer(Path(self.tmp_dir) / 'votes.sqlite3', flush_interval=3600)
+        patcher = mock.patch.object(vote_buffer, '_buffer', self.buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.thread = ThreadFactory()
+        self.post = PostFactory(thread=self.thread)
+
+    @BaseAPITestCase.doc
+    def test_burst_of_clicks_is_toggled_in_the_buffer(self):
+        """
+        Test buffered voting through the API
+
+        Verifies:
+        - Repeated clicks toggle like synchronous voting
+        - Votes and counts are visible immediately, before any flush
+        - Nothing is written to the database until a flush
+        """
+        url = reverse('mainapp:vote-thread', kwargs={'thread_id': self.thread.id})
+
+        first = self.client.post(url, {'vote_type': 'upvote'}, format='json')
+        self.assertEqual((first.data['vote_count'], first.data['user_vote']), (1, 'upvote'))
+        second = self.client.post(url, {'vote_type': 'downvote'}, format='json')
+        self.assertEqual((second.data['vote_count'], second.data['user_vote']), (-1, 'downvote'))
+        self.assertEqual(second.data['message'], 'Vote changed to downvote')
+
+        self.assertFalse(Vote.objects.exists())
+
+        detail = self.client.get(reverse('mainapp:thread-detail', kwargs={'pk': self.thread.id}))
+        self.assertEqual(detail.data['vote_count'], -1)
+        self.assertEqual(detail.data['user_vote'], 'downvote')
+
+        self.assertEqual(self.buffer.flush(), 1)
+        self.thread.refresh_from_db()
+        self.assertEqual(self.thread.vote_count_cache, -1)
+        self.assertEqual(Vote.objects.get(thread=self.thread).vote_type, 'downvote')
+
+    @BaseAPITestCase.doc
+    def test_flush_applies_final_state_in_bulk(self):
+        """
+        Test flushing many pending votes
+
+        Verifies:
+        - New, changed and withdrawn votes are all written
+        - Counters match the real net count after the flush
+        - Flushing again is a no-op
+        """
+        voters = UserFactory.create_batch(3)
+        Vote.objects.create(user=voters[0], post=self.post, vote_type='upvote')
+        Vote.objects.create(user=voters[1], post=self.post, vote_type='upvote')
+
+        self.buffer.vote(voters[0], 'post', self.post.id, 'downvote')
+        self.buffer.vote(voters[1], 'post', self.post.id, 'upvote')
+        self.buffer.vote(voters[2], 'post', self.post.id, 'upvote')
+        for voter in voters:
+            self.buffer.vote(voter, 'thread', self.thread.id, 'upvote')
+
+        self.assertEqual(self.buffer.flush(), 6)
+
+        self.post.refresh_from_db()
+        self.thread.refresh_from_db()
+        self.assertEqual(self.post.vote_count_cache, 0)
+        self.assertEqual(self.thread.vote_count_cache, 3)
+        self.assertEqual(
+            dict(Vote.objects.filter(post=self.post).values_list('user_id', 'vote_type')),
+            {voters[0].id: 'downvote', voters[2].id: 'upvote'}
+        )
+        self.assertEqual(self.buffer.flush(), 0)
+
+    @BaseAPITestCase.doc
+    def test_replayed_flush_is_idempotent(self):
+        """
+        Test recovery after a crash between the two commits
+
+        Verifies:
+        - Replaying a buffer already written to the database changes nothing
+        """
+        voter = UserFactory()
+        self.buffer.vote(voter, 'thread', self.thread.id, 'upvote')
+
+        conn = self.buffer._connection()
+        rows = conn.execute('SELECT * FROM pending_vote').fetchall()
+        self.buffer.flush()
+        # Simulate the SQLite delete being lost after the database commit
+        conn.executemany('INSERT INTO pending_vote VALUES (?, ?, ?, ?, ?)', rows)
+
+        self.buffer.flush()
+
+        self.thread.refresh_from_db()
+        self.assertEqual(self.thread.vote_count_cache, 1)
+        self.assertEqual(Vote.objects.filter(thread=self.thread).count(), 1)
+
+    @BaseAPITestCase.doc
+    def test_votes_on_deleted_content_do_not_block_the_flush(self):
+        """
+        Test flushing votes whose target or voter was deleted
+
+        Verifies:
+        - Votes on a thread deleted while pending are dropped
+        - Votes of a deleted user are dropped
+        - The remaining votes are flushed and the buffer is emptied
+        """
+        voter, leaver = UserFactory.create_batch(2)
+        doomed = ThreadFactory()
+        self.buffer.vote(voter, 'thread', doomed.id, 'upvote')
+        self.buffer.vote(leaver, 'post', self.post.id, 'upvote')
+        self.buffer.vote(voter, 'thread', self.thread.id, 'upvote')
+        doomed.delete()
+        leaver.delete()
+
+        self.assertEqual(self.buffer.flush(), 3)
+
+        self.assertEqual(list(Vote.objects.values_list('user_id', 'thread_id')), [(voter.id, self.thread.id)])
+        self.thread.refresh_from_db()
+        self.post.refresh_from_db()
+        self.assertEqual((self.thread.vote_count_cache, self.post.vote_count_cache), (1, 0))
+        self.assertEqual(self.buffer._connection().execute('SELECT COUNT(*) FROM pending_vote').fetchone()[0], 0)
+
+    @BaseAPITestCase.doc
+    def test_snapshot_reads_only_the_requested_targets(self):
+        """
+        Test scoped buffer reads
+
+        Verifies:
+        - A snapshot of given targets leaves out other buffered votes
+        - Deltas and the user's votes are reported for the requested targets
+        """
+        voter = UserFactory()
+        other = ThreadFactory()
+        self.buffer.vote(voter, 'thread', self.thread.id, 'upvote')
+        self.buffer.vote(voter, 'thread', other.id, 'downvote')
+        self.buffer.vote(voter, 'post', self.post.id, 'upvote')
+
+        deltas, votes = self.buffer.snapshot(voter.id, {('thread', self.thread.id), ('post', self.post.id)})
+        self.assertEqual(deltas, {('thread', self.thread.id): 1, ('post', self.post.id): 1})
+        self.assertEqual(votes, {('thread', self.thread.id): 'upvote', ('post', self.post.id): 'upvote'})
+        self.assertEqual(self.buffer.snapshot(voter.id, set()), ({}, {}))
+
+    @BaseAPITestCase.doc
+    def test_own_content_is_rejected_without_buffering(self):
+        """
+        Test voting on one's own thread
+
+        Verifies:
+        - The same error as synchronous voting is returned
+        - Nothing is buffered
+        """
+        own = ThreadFactory(author=self.test_user)
+        url = reverse('mainapp:vote-thread', kwargs={'thread_id': own.id})
+
+        response = self.client.post(url, {'vote_type': 'upvote'}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.buffer.snapshot(), ({}, {}))
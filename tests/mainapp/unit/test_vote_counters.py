@@ -0,0 +1,117 @@
+from io import StringIO
+from django.core.management import call_command
+from tests.base import BaseTestCase
+from tests.factories import UserFactory, ThreadFactory, PostFactory, VoteFactory
+from mainapp.models import Thread, Post, Vote
+from mainapp.post import vote_on_thread, vote_on_post
+
+
+class TestIncrementalVoteCounters(BaseTestCase):
+    """Test delta-based maintenance of vote_count_cache"""
+
+    def setUp(self):
+        super().setUp()
+        self.thread = ThreadFactory()
+        self.post = PostFactory(thread=self.thread)
+
+    @BaseTestCase.doc
+    def test_vote_transitions_apply_deltas(self):
+        """
+        Test vote, change and withdrawal on a thread
+
+        Verifies:
+        - Every transition leaves the counter equal to the real net count
+        - The returned vote count reflects the change
+        """
+        other = UserFactory()
+        VoteFactory(thread=self.thread, user=other, vote_type='upvote')
+
+        success, _, count, user_vote = vote_on_thread(self.test_user, self.thread.id, 'downvote')
+        self.assertTrue(success)
+        self.assertEqual((count, user_vote), (0, 'downvote'))
+
+        _, message, count, user_vote = vote_on_thread(self.test_user, self.thread.id, 'upvote')
+        self.assertEqual((count, user_vote), (2, 'upvote'))
+        self.assertEqual(message, 'Vote changed to upvote')
+
+        _, message, count, user_vote = vote_on_thread(self.test_user, self.thread.id, 'upvote')
+        self.assertEqual((count, user_vote), (1, None))
+        self.assertEqual(message, 'Vote withdrawn')
+
+        self.thread.refresh_from_db()
+        self.assertEqual(self.thread.vote_count_cache, 1)
+
+    @BaseTestCase.doc
+    def test_vote_does_not_recount(self):
+        """
+        Test vote cost
+
+        Verifies:
+        - Casting a vote runs no COUNT query
+        """
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as ctx:
+            vote_on_post(self.test_user, self.post.id, 'upvote')
+
+        self.assertFalse(any('COUNT(' in q['sql'] for q in ctx.captured_queries))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.vote_count_cache, 1)
+
+    @BaseTestCase.doc
+    def test_reconcile_repairs_drift(self):
+        """
+        Test the reconciliation command
+
+        Verifies:
+        - --dry-run reports drift without changing data
+        - A normal run restores counters to the real net count
+        """
+        VoteFactory(thread=self.thread, user=UserFactory(), vote_type='upvote')
+        Thread.objects.filter(id=self.thread.id).update(vote_count_cache=42)
+        Post.objects.filter(id=self.post.id).update(vote_count_cache=-3)
+
+        out = StringIO()
+        call_command('reconcile_vote_counts', '--dry-run', stdout=out)
+        self.assertIn('Found 1 drifted threads', out.getvalue())
+        self.thread.refresh_from_db()
+        self.assertEqual(self.thread.vote_count_cache, 42)
+
+        call_command('reconcile_vote_counts', stdout=StringIO())
+        self.thread.refresh_from_db()
+        self.post.refresh_from_db()
+        self.assertEqual(self.thread.vote_count_cache, 1)
+        self.assertEqual(self.post.vote_count_cache, 0)
+
+    @BaseTestCase.doc
+    def test_populate_rebuilds_counters_in_chunks(self):
+        """
+        Test the set-based rebuild command
+
+        Verifies:
+        - --dry-run reports drift across chunks without changing data
+        - A normal run restores vote and post counters
+        - The statement count depends on the number of chunks, not rows
+        """
+        VoteFactory(thread=self.thread, user=UserFactory(), vote_type='upvote')
+        others = ThreadFactory.create_batch(4)
+        Thread.objects.filter(id=self.thread.id).update(vote_count_cache=7, post_count=0)
+        Thread.objects.filter(id=others[-1].id).update(post_count=9)
+
+        out = StringIO()
+        call_command('populate_vote_counts', '--dry-run', '--batch-size', '2', stdout=out)
+        self.assertIn('Found 2 with drifted counters', out.getvalue())
+        self.assertIn('rows/s', out.getvalue())
+        self.assertEqual(Thread.objects.get(id=self.thread.id).vote_count_cache, 7)
+
+        call_command('populate_vote_counts', '--batch-size', '2', stdout=StringIO())
+        self.thread.refresh_from_db()
+        self.assertEqual((self.thread.vote_count_cache, self.thread.post_count), (1, 1))
+        self.assertEqual(Thread.objects.get(id=others[-1].id).post_count, 0)
+
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as ctx:
+            call_command('populate_vote_counts', '--batch-size', '1000', stdout=StringIO())
+        self.assertLessEqual(len(ctx.captured_queries), 12)
@@ -0,0 +1,82 @@
+from tests.base import BaseTestCase
+from tests.factories import UserFactory, ThreadFactory, PostFactory, VoteFactory
+from mainapp.models import Vote
+from mainapp.vote_state import VoteStateResolver
+
+
+class TestVoteStateResolver(BaseTestCase):
+    """Test batched resolution of the requesting user's votes"""
+
+    def setUp(self):
+        super().setUp()
+        self.thread = ThreadFactory()
+        self.posts = PostFactory.create_batch(5, thread=self.thread)
+        VoteFactory(thread=self.thread, user=self.test_user, vote_type='upvote')
+        Vote.objects.create(user=self.test_user, post=self.posts[0], vote_type='downvote')
+        Vote.objects.create(user=self.test_user, post=self.posts[1], vote_type='upvote')
+
+    @BaseTestCase.doc
+    def test_thread_tree_resolved_in_one_query(self):
+        """
+        Test resolving a thread with all of its posts
+
+        Verifies:
+        - Votes of the thread and every post are loaded by a single query
+        - Unvoted posts resolve to None
+        """
+        resolver = VoteStateResolver(self.test_user)
+        resolver.add(self.thread, include_posts=True)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(resolver.user_vote(self.thread), 'upvote')
+            votes = [resolver.user_vote(post) for post in self.posts]
+
+        self.assertEqual(votes, ['downvote', 'upvote', None, None, None])
+
+    @BaseTestCase.doc
+    def test_unregistered_objects_fall_back(self):
+        """
+        Test objects that were not registered with the resolver
+
+        Verifies:
+        - The resolver falls back to a per-object lookup instead of guessing
+        """
+        resolver = VoteStateResolver(self.test_user)
+        resolver.add(ThreadFactory())
+
+        self.assertEqual(resolver.user_vote(self.posts[0]), 'downvote')
+
+    @BaseTestCase.doc
+    def test_can_vote_uses_foreign_key_ids(self):
+        """
+        Test can_vote computation
+
+        Verifies:
+        - Users cannot vote on their own threads and posts
+        - No query is needed to decide
+        """
+        own_thread = ThreadFactory(author=self.test_user)
+        own_post = PostFactory(thread=self.thread, user=self.test_user)
+        resolver = VoteStateResolver(self.test_user)
+
+        with self.assertNumQueries(0):
+            self.assertFalse(resolver.can_vote(own_thread))
+            self.assertFalse(resolver.can_vote(own_post))
+            self.assertTrue(resolver.can_vote(self.thread))
+            self.assertTrue(resolver.can_vote(self.posts[0]))
+
+    @BaseTestCase.doc
+    def test_anonymous_user_never_queries(self):
+        """
+        Test resolver for unauthenticated requests
+
+        Verifies:
+        - Anonymous users have no vote and cannot vote
+        """
+        from django.contrib.auth.models import AnonymousUser
+        resolver = VoteStateResolver(AnonymousUser())
+        resolver.add(self.thread, include_posts=True)
+
+        with self.assertNumQueries(0):
+            self.assertIsNone(resolver.user_vote(self.thread))
+            self.assertFalse(resolver.can_vote(self.posts[0]))